@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.models.question import Question
+from app.models.question import Question, question_knowledge_point
+from app.services.knowledge_graph_snapshot import graph_snapshots
 
 from app.core.auth import get_current_user
-import networkx as nx
 from typing import List
 
 router = APIRouter()
@@ -28,32 +28,32 @@ async def get_knowledge_map(
         if not await check_subject_exists(subject_id, db):
             raise HTTPException(status_code=404, detail="Subject not found")
 
-        # 构建知识点网络
-        G = nx.Graph()
-        
-        # 获取所有知识点
-        query = select(KnowledgePoint).filter(KnowledgePoint.subject_id == subject_id)
-        result = await db.execute(query)
-        knowledge_points = result.scalars().all()
-        
-        # 添加节点和边
-        for kp in knowledge_points:
-            G.add_node(kp.id, name=kp.name)
-            
-        # 分析知识点关联
-        for q in await get_related_questions(subject_id, db):
-            for kp1 in q.knowledge_points:
-                for kp2 in q.knowledge_points:
-                    if kp1.id != kp2.id:
-                        G.add_edge(kp1.id, kp2.id)
-        
-        # 添加错误处理
-        if not knowledge_points:
+        # 知识点取自学科图谱内存快照
+        graph = await graph_snapshots.get(subject_id, db)
+        if not graph.node_count:
             return {"nodes": [], "edges": [], "message": "No knowledge points found"}
-            
+
+        # 分析知识点关联：同一题目考查的知识点两两相连，在数据库中聚合去重
+        qkp_a = question_knowledge_point.alias("qkp_a")
+        qkp_b = question_knowledge_point.alias("qkp_b")
+        pairs = await db.execute(
+            select(qkp_a.c.knowledge_point_id, qkp_b.c.knowledge_point_id)
+            .join(qkp_b, and_(
+                qkp_a.c.question_id == qkp_b.c.question_id,
+                qkp_a.c.knowledge_point_id < qkp_b.c.knowledge_point_id,
+            ))
+            .join(Question, Question.id == qkp_a.c.question_id)
+            .where(Question.subject_id == subject_id)
+            .distinct()
+        )
+
         return {
-            "nodes": [{"id": n, "name": G.nodes[n]["name"]} for n in G.nodes()],
-            "edges": [{"source": u, "target": v} for u, v in G.edges()]
+            "nodes": [{"id": node["id"], "name": node["name"]} for node in graph.nodes()],
+            "edges": [
+                {"source": u, "target": v}
+                for u, v in pairs.all()
+                if u in graph and v in graph
+            ]
         }
 
     except Exception as e:
@@ -11,6 +11,7 @@ from app.schemas.application import (
 )
 from app.crud.application import crud_application
 from app.core.permissions import check_subject_owner, check_class_owner
+from app.core.principals import invalidate_principals
 
 router = APIRouter()
 
@@ -98,6 +99,7 @@ async def update_subject_application(
                 subject_id=application.subject_id
             ))
             await db.commit()
+            await invalidate_principals([application.applicant_id])
 
     return updated_app
 
@@ -206,6 +208,7 @@ async def update_class_application(
                 class_id=application.class_id
             ))
             await db.commit()
+            await invalidate_principals([application.applicant_id])
 
     return updated_app
 
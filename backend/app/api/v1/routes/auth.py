@@ -5,6 +5,7 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.core.password import verify_password, get_password_hash
 from app.core.security import create_access_token
+from app.core.principals import invalidate_principals
 from app.models.user import User, UserRole  # 确保导入UserRole
 from app.schemas.user import Token, UserCreate, UserResponse  # <-- 修改这里
 from typing import List
@@ -71,6 +72,7 @@ async def login(
     # 更新最后登录时间
     user.last_login = datetime.utcnow()
     await db.commit()
+    await invalidate_principals([user.id])
     
     access_token = create_access_token(subject=user.id, scopes=[user.role.value])
     return {"access_token": access_token, "token_type": "bearer"}
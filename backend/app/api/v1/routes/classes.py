@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_
 from typing import List, Optional
 from app.db.session import get_db
+from app.crud.base import fetch_page
+from app.utils.pagination import set_next_cursor
 from app.models.class_model import Class
 from app.schemas.class_schema import ClassCreate, ClassUpdate, ClassResponse, ClassDetailResponse
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.core.permissions import check_class_owner, check_class_member
+from app.core.principals import invalidate_principals, invalidate_class_principals
 
 router = APIRouter()
 
@@ -25,40 +28,30 @@ async def create_class(
     db.add(db_class)
     await db.commit()
     await db.refresh(db_class)
+    await invalidate_principals([current_user.id])
     return db_class
 
 @router.get("/", response_model=List[ClassResponse])
 async def get_classes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取当前用户相关的所有班级（创建的或加入的）"""
-    # 获取用户创建的班级
-    owned_query = select(Class).where(Class.teacher_id == current_user.id)
-    owned_result = await db.execute(owned_query)
-    owned_classes = owned_result.scalars().all()
-
-    # 获取用户加入的班级
+    """获取当前用户相关的所有班级（创建的或加入的），按班级ID排序"""
     from app.models.class_model import class_student
-    joined_query = select(Class).join(
-        class_student,
-        Class.id == class_student.c.class_id
-    ).where(class_student.c.student_id == current_user.id)
-    joined_result = await db.execute(joined_query)
-    joined_classes = joined_result.scalars().all()
-
-    # 合并并去重
-    all_classes = list(owned_classes) + list(joined_classes)
-    unique_classes = []
-    seen_ids = set()
-    for cls in all_classes:
-        if cls.id not in seen_ids:
-            seen_ids.add(cls.id)
-            unique_classes.append(cls)
-
-    return unique_classes[skip:skip + limit]
+    # 用户加入的班级
+    joined_ids = select(class_student.c.class_id).where(class_student.c.student_id == current_user.id)
+    # 创建的或加入的班级，一条查询完成去重与分页
+    query = select(Class).where(or_(Class.teacher_id == current_user.id, Class.id.in_(joined_ids)))
+    try:
+        classes, next_cursor = await fetch_page(db, query, Class, cursor=cursor, skip=skip, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return classes
 
 @router.get("/{class_id}", response_model=ClassDetailResponse)
 async def get_class(
@@ -145,6 +138,7 @@ async def delete_class(
     # 删除班级
     await db.delete(db_class)
     await db.commit()
+    await invalidate_class_principals(class_id)
 
 @router.get("/{class_id}/students", response_model=List[dict])
 async def get_class_students(
@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Backgro
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
+import logging
 import os
 import shutil
 import tempfile
-from app.db.session import get_db, AsyncSessionLocal
+from app.db.session import get_db, BackgroundSessionLocal
 from app.core.auth import get_current_user
 from app.models.user import User
 from app.models.knowledge_point import KnowledgePoint, KnowledgePointRelationship
@@ -13,9 +14,12 @@ from app.services.document_splitter import split_exam_paper # 复用文档加载
 from app.services.knowledge_extraction import KnowledgeExtractionService
 from app.services.knowledge_graph_builder import KnowledgeGraphBuilder
 from app.core.config import settings
-from app.db.neo4j_utils import create_typed_relation
+from app.db.neo4j_utils import create_knowledge_points_bulk, create_typed_relations_bulk
+from app.services.knowledge_graph_snapshot import graph_snapshots
+from app.core.cache import cache, subject_tag
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 async def process_knowledge_extraction(
     file_path: str,
@@ -23,7 +27,7 @@ async def process_knowledge_extraction(
     user_id: int
 ):
     """后台任务：处理知识点提取和图谱构建"""
-    async with AsyncSessionLocal() as db:
+    async with BackgroundSessionLocal() as db:
         try:
             # 1. 加载和切分文档
             # 注意：split_exam_paper 返回的是 Document 对象列表
@@ -35,6 +39,7 @@ async def process_knowledge_extraction(
             
             # 3. 保存知识点到数据库
             name_to_id_map = {}
+            new_points = []
             for kp_data in extracted_points_data:
                 # 检查是否存在
                 stmt = select(KnowledgePoint).where(
@@ -63,6 +68,16 @@ async def process_knowledge_extraction(
                 await db.flush() # 获取 ID
                 await db.refresh(new_kp)
                 name_to_id_map[kp_data['name']] = new_kp.id
+                new_points.append({
+                    "id": new_kp.id,
+                    "name": new_kp.name,
+                    "description": new_kp.description,
+                    "difficulty": kp_data['difficulty'],
+                    "subject_id": subject_id,
+                    "creator_id": user_id,
+                    "code": new_kp.code,
+                    "slug": new_kp.slug,
+                })
                 
             # 4. 构建关系
             builder = KnowledgeGraphBuilder()
@@ -70,6 +85,8 @@ async def process_knowledge_extraction(
             optimized_rels = builder.optimize_graph(relationships)
             
             # 5. 保存关系到数据库 (PG & Neo4j)
+            graph_relations = []
+            pg_relations = {}  # (source, target, type) -> 关系型行，Neo4j 跳过的关系需一并删除
             for rel in optimized_rels:
                 source_id = name_to_id_map.get(rel['source'])
                 target_id = name_to_id_map.get(rel['target'])                
@@ -82,17 +99,45 @@ async def process_knowledge_extraction(
                         weight=rel['weight']
                     )
                     db.add(new_rel)
+                    pg_relations.setdefault((source_id, target_id, rel['type'].value), []).append(new_rel)
                     
-                    # Neo4j (同步调用，可能需要优化)
-                    try:
-                        create_typed_relation(source_id, target_id, rel['type'].value, rel['weight'])
-                    except Exception as e:
-                        print(f"Neo4j sync failed: {e}")
+                    graph_relations.append({
+                        "source_id": source_id,
+                        "target_id": target_id,
+                        "rel_type": rel['type'].value,
+                        "strength": rel['weight'],
+                    })
 
             await db.commit()
+
+            # Neo4j：关系型提交后再同步，节点与关系分块批量写入，防环在内存中对整批完成
+            try:
+                await create_knowledge_points_bulk(new_points)
+                skipped = await create_typed_relations_bulk(graph_relations)
+                if skipped:
+                    # 会形成环而未写入 Neo4j 的关系，从关系型表中删除，保持两边一致
+                    logger.warning("学科 %s 的 Neo4j 同步跳过 %s 条会形成环的关系", subject_id, len(skipped))
+                    for key in {(rel["source_id"], rel["target_id"], rel["rel_type"]) for rel in skipped}:
+                        for row in pg_relations.pop(key, ()):
+                            await db.delete(row)
+                    await db.commit()
+                for point in new_points:
+                    graph_snapshots.knowledge_point_created(subject_id, point["id"], point["name"])
+                skipped_keys = {(rel["source_id"], rel["target_id"], rel["rel_type"]) for rel in skipped}
+                graph_snapshots.relations_created(
+                    rel for rel in graph_relations
+                    if (rel["source_id"], rel["target_id"], rel["rel_type"]) not in skipped_keys
+                )
+                await cache.invalidate_tags(subject_tag(subject_id))
+                logger.info(
+                    "学科 %s 的 Neo4j 同步完成：%s 个知识点，%s 条关系",
+                    subject_id, len(new_points), len(graph_relations) - len(skipped),
+                )
+            except Exception as e:
+                logger.warning("学科 %s 的 Neo4j 同步失败: %s", subject_id, e)
             
         except Exception as e:
-            print(f"Extraction task failed: {e}")
+            logger.error("知识点提取任务失败: %s", e)
             await db.rollback()
         finally:
             # 清理临时文件
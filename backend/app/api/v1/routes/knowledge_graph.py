@@ -1,54 +1,19 @@
 from fastapi import APIRouter, Depends
-from app.db.neo4j_utils import get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
 from app.core.auth import get_current_user
+from app.core.cache import cached_response, subject_tag
+from app.services.knowledge_graph_snapshot import graph_snapshots
 
 router = APIRouter()
 
 @router.get("/{subject_id}")
+@cached_response(vary_user=False, tags=lambda p: [subject_tag(p["subject_id"])])
 async def get_knowledge_graph(
     subject_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """生成知识点关联图谱"""
-    with get_session() as session:
-        # 获取节点
-        nodes_result = session.run("MATCH (kp:KnowledgePoint {subject_id: $subj_id}) RETURN kp.id AS id, kp.name AS name", subj_id=subject_id)
-        nodes = [{"id": record["id"], "name": record["name"]} for record in nodes_result]
-        
-        # 获取关系（假设有 RELATES_TO 关系）
-        edges_result = session.run("MATCH (a:KnowledgePoint {subject_id: $subj_id})-[r:RELATES_TO]->(b:KnowledgePoint {subject_id: $subj_id}) RETURN a.id AS source, b.id AS target, r.strength AS strength", subj_id=subject_id)
-        edges = [{"source": record["source"], "target": record["target"], "strength": record["strength"]} for record in edges_result]
-        
-        return {"nodes": nodes, "edges": edges}
-        edges = [{"source": record["source"], "target": record["target"], "strength": record["strength"]} for record in edges_result]
-        
-        # 计算重要性（使用 PageRank）
-        pagerank_result = session.run("CALL gds.pageRank.stream('knowledgeGraph') YIELD nodeId, score RETURN nodeId, score")
-        centrality = {record["nodeId"]: record["score"] for record in pagerank_result}
-        
-        # 更新节点重要性
-        for node in nodes:
-            node["importance"] = centrality.get(node["id"], 0)
-        
-        return {"nodes": nodes, "edges": edges}
-    # 计算中心性和重要程度
-    centrality = nx.pagerank(G)
-    
-    return {
-        "nodes": [
-            {
-                "id": n,
-                "name": G.nodes[n]["name"],
-                "importance": centrality[n]
-            }
-            for n in G.nodes()
-        ],
-        "edges": [
-            {
-                "source": u,
-                "target": v,
-                "strength": G.edges[u, v]["weight"]
-            }
-            for u, v in G.edges()
-        ]
-    }
+    """生成知识点关联图谱（读取学科图谱内存快照）"""
+    graph = await graph_snapshots.get(subject_id, db)
+    return graph.to_dict(rel_types=("RELATES_TO",))
@@ -1,18 +1,21 @@
-import asyncio
-
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Path, Query
+from fastapi.responses import JSONResponse
+from typing import List, Optional
+from sqlalchemy import select
 from app.db.neo4j_utils import (
-    create_knowledge_point as sync_create_knowledge_point,
+    create_knowledge_point as neo4j_create_knowledge_point,
     get_knowledge_points_by_subject,
-    get_session,
     get_knowledge_point as get_kp_by_id,
+    update_knowledge_point as neo4j_update_knowledge_point,
+    delete_knowledge_point as neo4j_delete_knowledge_point,
     create_typed_relation,
+    delete_typed_relation,
     search_knowledge_points,
+    ALLOWED_REL_TYPES,
 )
 from app.schemas.knowledge_point import KnowledgePointCreate, KnowledgePointUpdate, KnowledgePointResponse
 from app.core.auth import get_current_user
-from app.core.permissions import check_subject_member
+from app.core.permissions import check_subject_member, require_subject_member
 from app.models.user import User
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
@@ -26,18 +29,22 @@ from app.services.knowledge_point_validator import (
     validate_update,
 )
 from app.services.knowledge_point_audit import record_audit_event
-from app.utils.simple_cache import cache_get, cache_set, cache_invalidate
+from app.core.cache import cache, cached_response, etag_matches, subject_tag
+from app.services.knowledge_graph_snapshot import graph_snapshots
 from app.core.config import settings
 from app.services.knowledge_point_service import (
-    get_subtree as svc_get_subtree,
+    TreeResult,
+    load_tree,
+    load_children,
+    load_subtree,
     get_ancestors as svc_get_ancestors,
-    build_tree as svc_build_tree,
     move_knowledge_point as svc_move_kp,
     add_closure_for_insert,
 )
 
 router = APIRouter()
 
+
 async def verify_subject_membership(subject_id: int, current_user: User, db: AsyncSession) -> None:
     """验证用户是否是学科成员（用于知识点管理）"""
     await check_subject_member(subject_id, current_user, db)
@@ -73,10 +80,8 @@ async def create_knowledge_point_route(
     await db.commit()
     await db.refresh(new_kp)
 
-    # 2) 同步到 Neo4j（异步执行同步函数）
-    kp_data = await asyncio.get_event_loop().run_in_executor(
-        None,
-        sync_create_knowledge_point,
+    # 2) 同步到 Neo4j
+    kp_data = await neo4j_create_knowledge_point(
         new_kp.id,
         knowledge_point.name,
         knowledge_point.description,
@@ -111,40 +116,32 @@ async def create_knowledge_point_route(
         # 审计失败不影响主流程
         await db.rollback()
     # 失效缓存
-    cache_invalidate(f"kp:subject:{subject_id}:")
+    await cache.invalidate_tags(subject_tag(subject_id))
+    graph_snapshots.knowledge_point_created(subject_id, new_kp.id, new_kp.name, new_kp.parent_id)
     return kp_data
 
 @router.get("/subjects/{subject_id}/knowledge-points", response_model=List[KnowledgePointResponse])
+@cached_response(
+    vary_user=False,
+    tags=lambda p: [subject_tag(p["subject_id"])],
+    response_model=List[KnowledgePointResponse],
+)
 async def get_knowledge_points_by_subject_route(
     subject_id: int = Path(..., description="学科ID"),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = require_subject_member(),
 ):
-    await verify_subject_membership(subject_id, current_user, db)
-    # 读取缓存
-    cache_key = f"kp:subject:{subject_id}:list"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
-    kps = get_knowledge_points_by_subject(subject_id)
-    # 写入缓存
-    try:
-        cache_set(cache_key, kps, settings.CACHE_TTL)
-    except Exception:
-        pass
-    return kps
+    # 成员校验在依赖中完成，缓存命中时同样生效；同一学科的成员共享缓存
+    return await get_knowledge_points_by_subject(subject_id)
 
 @router.get("/knowledge-points/{knowledge_point_id}", response_model=KnowledgePointResponse)
 async def get_knowledge_point(
     knowledge_point_id: int = Path(..., description="知识点ID"),
     current_user: User = Depends(get_current_user)
 ):
-    with get_session() as session:
-        result = session.run("MATCH (kp:KnowledgePoint {id: $id}) RETURN kp", id=knowledge_point_id)
-        record = result.single()
-        if not record:
-            raise HTTPException(status_code=404, detail="知识点不存在")
-        return record["kp"]
+    kp = await get_kp_by_id(knowledge_point_id)
+    if not kp:
+        raise HTTPException(status_code=404, detail="知识点不存在")
+    return kp
 
 @router.put("/knowledge-points/{knowledge_point_id}", response_model=KnowledgePointResponse)
 async def update_knowledge_point(
@@ -153,13 +150,10 @@ async def update_knowledge_point(
     current_user: User = Depends(get_current_user)
 ):
     # 先查询 Neo4j 获取 subject_id 以便校验与缓存失效
-    with get_session() as session:
-        result_pre = session.run("MATCH (kp:KnowledgePoint {id: $id}) RETURN kp", id=knowledge_point_id)
-        pre = result_pre.single()
-        if not pre:
-            raise HTTPException(status_code=404, detail="知识点不存在")
-        pre_kp = pre["kp"]
-        subject_id = pre_kp.get("subject_id") if hasattr(pre_kp, "get") else pre_kp["subject_id"]
+    pre_kp = await get_kp_by_id(knowledge_point_id)
+    if not pre_kp:
+        raise HTTPException(status_code=404, detail="知识点不存在")
+    subject_id = pre_kp.get("subject_id") if hasattr(pre_kp, "get") else pre_kp["subject_id"]
 
     # 校验名称唯一（如有修改）
     update_data = knowledge_point_update.dict(exclude_unset=True)
@@ -182,17 +176,9 @@ async def update_knowledge_point(
                 await db.refresh(obj)
 
     # 同步到 Neo4j
-    with get_session() as session:
-        set_clause = ", ".join([f"kp.{k} = ${k}" for k in update_data.keys()])
-        result = session.run(
-            f"MATCH (kp:KnowledgePoint {{id: $id}}) SET {set_clause} RETURN kp",
-            id=knowledge_point_id,
-            **update_data,
-        )
-        record = result.single()
-        if not record:
-            raise HTTPException(status_code=404, detail="知识点不存在")
-        updated = record["kp"]
+    updated = await neo4j_update_knowledge_point(knowledge_point_id, update_data)
+    if not updated:
+        raise HTTPException(status_code=404, detail="知识点不存在")
 
     # 审计记录（更新）
     try:
@@ -213,7 +199,9 @@ async def update_knowledge_point(
         pass
 
     # 失效缓存
-    cache_invalidate(f"kp:subject:{subject_id}:")
+    await cache.invalidate_tags(subject_tag(subject_id))
+    if "name" in update_data:
+        graph_snapshots.knowledge_point_updated(knowledge_point_id, name=update_data["name"], subject_id=subject_id)
     return updated
 
 # 删除知识点
@@ -224,15 +212,14 @@ async def delete_knowledge_point(
     current_user: User = Depends(get_current_user)
 ):
     # 从 Neo4j 获取知识点
-    kp = get_kp_by_id(knowledge_point_id)
+    kp = await get_kp_by_id(knowledge_point_id)
     if not kp:
         raise HTTPException(status_code=404, detail="知识点不存在")    
     # 验证用户是否是该知识点所属学科的成员
     subject_id = kp["subject_id"] if hasattr(kp, '__getitem__') else getattr(kp, 'subject_id')
     await verify_subject_membership(subject_id, current_user, db)
     # 删除知识点：先删 Neo4j，再删关系型
-    with get_session() as session:
-        session.run("MATCH (kp:KnowledgePoint {id: $id}) DELETE kp", id=knowledge_point_id)
+    await neo4j_delete_knowledge_point(knowledge_point_id)
     # 删除关系型数据库记录（若存在）
     obj = await db.get(SQLKnowledgePoint, knowledge_point_id)
     if obj:
@@ -240,9 +227,10 @@ async def delete_knowledge_point(
         await db.commit()
     # 失效缓存
     try:
-        cache_invalidate(f"kp:subject:{subject_id}:")
+        await cache.invalidate_tags(subject_tag(subject_id))
     except Exception:
         pass
+    graph_snapshots.knowledge_point_deleted(knowledge_point_id, subject_id)
     return {"message": "知识点删除成功"}
 
 @router.post("/knowledge-points/{id1}/relate/{id2}", status_code=status.HTTP_201_CREATED)
@@ -254,24 +242,53 @@ async def create_relation(
     current_user: User = Depends(get_current_user)
 ):
     # 验证知识点存在（可选）
-    kp1 = get_kp_by_id(id1)
-    kp2 = get_kp_by_id(id2)
+    kp1 = await get_kp_by_id(id1)
+    kp2 = await get_kp_by_id(id2)
     if not kp1 or not kp2:
         raise HTTPException(status_code=404, detail="知识点不存在")
+    subject_id = kp1.get("subject_id") if hasattr(kp1, "get") else kp1["subject_id"]
+    rt = rel_type.strip().upper()
+    if rt not in ALLOWED_REL_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported relationship type: {rel_type}")
     try:
-        # 支持带类型的关系创建并做简单防环
-        create_typed_relation(id1, id2, rel_type=rel_type, strength=strength)
+        # 防环检查与写入在同一个 Neo4j 事务内完成
+        await create_typed_relation(id1, id2, rel_type=rt, strength=strength)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    graph_snapshots.relations_created([
+        {"source_id": id1, "target_id": id2, "rel_type": rt, "strength": strength}
+    ])
     # 失效缓存（根据 kp1 所属学科）
     try:
-        subject_id = kp1.get("subject_id") if hasattr(kp1, "get") else kp1["subject_id"]
-        cache_invalidate(f"kp:subject:{subject_id}:")
+        await cache.invalidate_tags(subject_tag(subject_id))
     except Exception:
         pass
     return {"message": "关系创建成功", "type": rel_type}
 
 
+@router.delete("/knowledge-points/{id1}/relate/{id2}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_relation(
+    id1: int = Path(..., description="知识点1 ID"),
+    id2: int = Path(..., description="知识点2 ID"),
+    rel_type: str = Query("RELATES_TO", description="关系类型，默认RELATES_TO"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    kp1 = await get_kp_by_id(id1)
+    if not kp1:
+        raise HTTPException(status_code=404, detail="知识点不存在")
+    subject_id = kp1.get("subject_id") if hasattr(kp1, "get") else kp1["subject_id"]
+    await verify_subject_membership(subject_id, current_user, db)
+    try:
+        deleted = await delete_typed_relation(id1, id2, rel_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="关系不存在")
+    graph_snapshots.relations_deleted([{"source_id": id1, "target_id": id2, "rel_type": rel_type}])
+    await cache.invalidate_tags(subject_tag(subject_id))
+
+
 @router.get("/knowledge-points/search", response_model=List[KnowledgePointResponse])
 async def search_kps(
     subject_id: int = Query(..., description="学科ID"),
@@ -280,30 +297,44 @@ async def search_kps(
     db: AsyncSession = Depends(get_db),
 ):
     await verify_subject_membership(subject_id, current_user, db)
-    key = f"kp:subject:{subject_id}:search:{(q or '').strip().lower()}"
-    cached = cache_get(key)
-    if cached is not None:
-        return cached
-    data = search_knowledge_points(subject_id, q)
-    try:
-        cache_set(key, data, settings.CACHE_TTL)
-    except Exception:
-        pass
-    return data
+    return await cache.get_or_load(
+        f"kp:subject:{subject_id}:search:{(q or '').strip().lower()}",
+        lambda: search_knowledge_points(subject_id, q),
+        settings.CACHE_TTL,
+        tags=(subject_tag(subject_id),),
+    )
+
+
+async def _verify_kp_access(knowledge_point_id: int, current_user: User, db: AsyncSession) -> None:
+    """只查询 subject_id 校验学科成员权限，不加载知识点实体"""
+    subject_id = await db.scalar(
+        select(SQLKnowledgePoint.subject_id).where(SQLKnowledgePoint.id == knowledge_point_id)
+    )
+    if subject_id is None:
+        raise HTTPException(status_code=404, detail="知识点不存在")
+    await verify_subject_membership(subject_id, current_user, db)
+
+
+def _etag_response(request: Request, result: Optional[TreeResult]) -> Response:
+    """If-None-Match 与当前 ETag 一致时返回 304，否则返回数据并附带 ETag"""
+    if result is None:
+        raise HTTPException(status_code=404, detail="知识点不存在")
+    headers = {"ETag": result.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), result.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(result.data, headers=headers)
 
 
 @router.get("/knowledge-points/{knowledge_point_id}/subtree")
 async def get_kp_subtree(
+    request: Request,
     knowledge_point_id: int = Path(..., description="知识点ID"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # 验证学科成员权限
-    obj = await db.get(SQLKnowledgePoint, knowledge_point_id)
-    if obj is None:
-        raise HTTPException(status_code=404, detail="知识点不存在")
-    await verify_subject_membership(obj.subject_id, current_user, db)
-    return await svc_get_subtree(db, knowledge_point_id)
+    await _verify_kp_access(knowledge_point_id, current_user, db)
+    return _etag_response(request, await load_subtree(db, knowledge_point_id))
 
 
 @router.get("/knowledge-points/{knowledge_point_id}/ancestors")
@@ -312,24 +343,32 @@ async def get_kp_ancestors(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    obj = await db.get(SQLKnowledgePoint, knowledge_point_id)
-    if obj is None:
-        raise HTTPException(status_code=404, detail="知识点不存在")
-    await verify_subject_membership(obj.subject_id, current_user, db)
+    await _verify_kp_access(knowledge_point_id, current_user, db)
     return await svc_get_ancestors(db, knowledge_point_id)
 
 
 @router.get("/knowledge-points/{knowledge_point_id}/tree")
 async def get_kp_tree(
+    request: Request,
     knowledge_point_id: int = Path(..., description="知识点ID"),
+    max_depth: Optional[int] = Query(None, ge=0, description="返回的最大层数（0 只返回根），限制层数时节点带 has_children"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    obj = await db.get(SQLKnowledgePoint, knowledge_point_id)
-    if obj is None:
-        raise HTTPException(status_code=404, detail="知识点不存在")
-    await verify_subject_membership(obj.subject_id, current_user, db)
-    return await svc_build_tree(db, knowledge_point_id)
+    await _verify_kp_access(knowledge_point_id, current_user, db)
+    return _etag_response(request, await load_tree(db, knowledge_point_id, max_depth))
+
+
+@router.get("/knowledge-points/{knowledge_point_id}/children")
+async def get_kp_children(
+    request: Request,
+    knowledge_point_id: int = Path(..., description="知识点ID"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """直接子节点，用于按需展开知识点树"""
+    await _verify_kp_access(knowledge_point_id, current_user, db)
+    return _etag_response(request, await load_children(db, knowledge_point_id))
 
 
 @router.post("/knowledge-points/{knowledge_point_id}/move")
@@ -364,5 +403,6 @@ async def move_kp(
     if moved is None:
         raise HTTPException(status_code=500, detail="移动知识点失败")
     # 失效缓存
-    cache_invalidate(f"kp:subject:{obj.subject_id}:")
+    await cache.invalidate_tags(subject_tag(obj.subject_id))
+    graph_snapshots.knowledge_point_moved(moved.id, moved.parent_id, obj.subject_id)
     return {"id": moved.id, "parent_id": moved.parent_id, "path": moved.path, "depth": moved.depth}
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_
 from typing import List, Optional
 import aiofiles
 import uuid
@@ -9,7 +9,9 @@ import io
 import os
 import tempfile
 from pathlib import Path
-from app.db.session import get_db
+from app.db.session import get_db, BackgroundSessionLocal
+from app.crud.base import fetch_page
+from app.utils.pagination import set_next_cursor
 from app.models.question import Question, QuestionComment
 from app.schemas.question import QuestionCreate, QuestionResponse, CommentCreate, QuestionUpdate
 from app.core.auth import get_current_user, get_current_active_user
@@ -17,19 +19,41 @@ from app.core.permissions import user_required
 from app.models.user import User
 from app.models.knowledge import KnowledgePoint
 # 导入exam_parser
-from app.services.exam_parser import parse_pdf, parse_docx, parse_image
+from app.services.exam_parser import aiter_questions
 # 导入向量化服务
 from app.services.question_vectorization import vectorize_questions_batch, search_similar_questions
-from app.models.VectorStore import QuestionVectorResponse
+from app.services.hybrid_search import hybrid_search_questions
+from app.services.text_search import keyword_condition
+from app.models.VectorStore import QuestionVectorResponse, HybridSearchResponse
 
 router = APIRouter()
 
+# 批量导入时每解析出多少道题目就提交一次向量化
+IMPORT_VECTORIZE_CHUNK = 16
+
+# 题目列表按创建时间倒序分页，游标为最后一条的 (created_at, id)
+QUESTION_PAGE_ORDER = {"order_by": "created_at", "descending": True}
+
+
+async def _question_page(db: AsyncSession, query, response: Response, cursor: Optional[str], skip: int, limit: int):
+    """执行题目列表分页查询，下一页游标写入 X-Next-Cursor 响应头"""
+    try:
+        questions, next_cursor = await fetch_page(
+            db, query, Question, cursor=cursor, skip=skip, limit=limit, **QUESTION_PAGE_ORDER
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return questions
+
 @router.get("/public", response_model=List[QuestionResponse])
 async def get_public_questions(
+    response: Response,
     subject_id: Optional[int] = None,
     difficulty: Optional[int] = None,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: AsyncSession = Depends(get_db)
 ):
     """获取公开题目列表（不需要认证）"""
@@ -40,12 +64,11 @@ async def get_public_questions(
     if subject_id:
         query = query.filter(Question.subject_id == subject_id)
     
-    result = await db.execute(query.offset(skip).limit(limit))
-    questions = result.scalars().all()
-    return questions
+    return await _question_page(db, query, response, cursor, skip, limit)
 
 @router.get("/", response_model=List[QuestionResponse])
 async def get_questions(
+    response: Response,
     subject_id: Optional[int] = None,
     keyword: Optional[str] = None,
     type: Optional[str] = None,
@@ -53,6 +76,7 @@ async def get_questions(
     difficulty: Optional[int] = None,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -67,15 +91,8 @@ async def get_questions(
     if type:
         query = query.filter(Question.type == type)
     if keyword:
-        query = query.filter(
-            or_(
-                Question.title.ilike(f"%{keyword}%"),
-                Question.content.ilike(f"%{keyword}%")
-            )
-        )
-    result = await db.execute(query.offset(skip).limit(limit))
-    questions = result.scalars().all()
-    return questions
+        query = query.filter(keyword_condition(Question, keyword))
+    return await _question_page(db, query, response, cursor, skip, limit)
 
 @router.post("/", response_model=QuestionResponse)
 async def create_question(
@@ -102,12 +119,14 @@ async def create_question(
 
 @router.get("/search", response_model=List[QuestionResponse])
 async def search_questions(
+    response: Response,
     keyword: Optional[str] = None,
     subject_id: Optional[int] = None,
     knowledge_point_id: Optional[int] = None,
     difficulty: Optional[int] = None,
     page: int = Query(1, gt=0),
     per_page: int = Query(10, gt=0, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值，优先于 page"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
@@ -115,12 +134,7 @@ async def search_questions(
     query = select(Question)
     filters = []    
     if keyword:
-        filters.append(
-            or_(
-                Question.title.ilike(f"%{keyword}%"),
-                Question.content.ilike(f"%{keyword}%")
-            )
-        )
+        filters.append(keyword_condition(Question, keyword))
     if subject_id:
         filters.append(Question.subject_id == subject_id)
     if knowledge_point_id:
@@ -130,12 +144,14 @@ async def search_questions(
     if filters:
         query = query.filter(and_(*filters))    
     # 分页
-    query = query.offset((page - 1) * per_page).limit(per_page)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _question_page(db, query, response, cursor, (page - 1) * per_page, per_page)
 
-async def process_file_import(file_path: str, file_type: str, user_id: int, subject_id: Optional[int], db: AsyncSession):
-    """处理文件导入的后台任务"""
+async def process_file_import(file_path: str, file_type: str, user_id: int, subject_id: Optional[int], db: Optional[AsyncSession] = None):
+    """处理文件导入的后台任务（未传入会话时使用 background 连接池）"""
+    if db is None:
+        # 请求的会话在响应返回后即关闭，后台任务需要自己的会话
+        async with BackgroundSessionLocal() as session:
+            return await process_file_import(file_path, file_type, user_id, subject_id, session)
     img_dir = None
     try:
         print(f"Processing {file_type} import for user {user_id}...")        
@@ -150,18 +166,11 @@ async def process_file_import(file_path: str, file_type: str, user_id: int, subj
         timestamp = int(time.time())
         img_dir = uploads_dir / f"user_{user_id}_{timestamp}"
         img_dir.mkdir(exist_ok=True)        
-        # 根据文件类型调用相应的解析器
-        if file_type == 'pdf':
-            questions = parse_pdf(file_path, str(img_dir))
-        elif file_type in ['docx', 'doc']:
-            questions = parse_docx(file_path, str(img_dir))
-        elif file_type in ['png', 'jpg', 'jpeg']:
-            questions = parse_image(file_path, str(img_dir))
-        else:
+        if file_type not in ['pdf', 'docx', 'doc', 'png', 'jpg', 'jpeg', 'image']:
             raise ValueError(f"Unsupported file type: {file_type}")
-        
-        # 处理题目内容中的图片路径
-        for question in questions:
+
+        def relativize_images(question) -> None:
+            """将题目配图及内容中的图片路径转换为/uploads相对路径"""
             if question.配图:  # 配图是图片路径列表
                 # 将绝对路径转换为相对路径（相对于uploads目录）
                 relative_images = []
@@ -196,15 +205,29 @@ async def process_file_import(file_path: str, file_type: str, user_id: int, subj
                 
                 question.内容 = re.sub(r"<img src='([^']+)'", replace_img_src, question.内容)
                 question.内容 = re.sub(r'<img src="([^"]+)"', replace_img_src, question.内容)
-        
-        # 将解析的题目进行向量化并存储到向量数据库
-        question_vectors = await vectorize_questions_batch(
-            parsed_questions=questions,
-            user_id=user_id,
-            subject_id=subject_id,
-            db=db
-        )
-        
+
+        # 流式解析：每解析出一批题目就立即向量化入库，无需等待整份文件解析完成
+        question_vectors = []
+        pending = []
+        async for question in aiter_questions(file_path, str(img_dir)):
+            relativize_images(question)
+            pending.append(question)
+            if len(pending) >= IMPORT_VECTORIZE_CHUNK:
+                question_vectors.extend(await vectorize_questions_batch(
+                    parsed_questions=pending,
+                    user_id=user_id,
+                    subject_id=subject_id,
+                    db=db
+                ))
+                pending = []
+        if pending:
+            question_vectors.extend(await vectorize_questions_batch(
+                parsed_questions=pending,
+                user_id=user_id,
+                subject_id=subject_id,
+                db=db
+            ))
+
         await db.commit()
         
         print(f"Successfully vectorized and imported {len(question_vectors)} questions from {file_type} file.")        
@@ -262,7 +285,6 @@ async def batch_import_questions(
         file_type,
         current_user.id,
         subject_id,
-        db
     )
     
     return {"message": f"{file.filename} 导入已开始", "status": "processing"}
@@ -341,6 +363,9 @@ async def get_question(
 async def search_question_vectors(
     query: str = Query(..., description="搜索查询"),
     subject_id: Optional[int] = None,
+    question_type: Optional[str] = Query(None, description="题型过滤"),
+    difficulty: Optional[int] = Query(None, description="难度过滤"),
+    strategy: str = Query("auto", pattern="^(auto|pre|post)$", description="过滤策略"),
     limit: int = Query(10, ge=1, le=50, description="返回结果数量"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -352,27 +377,48 @@ async def search_question_vectors(
             user_id=current_user.id,
             subject_id=subject_id,
             limit=limit,
-            db=db
+            db=db,
+            question_type=question_type,
+            difficulty=difficulty,
+            strategy=strategy
         )
         
-        # 转换为响应格式
-        results = []
-        for q in similar_questions:
-            results.append(QuestionVectorResponse(
-                id=q.id,
-                content=q.content,
-                embedding=[],  # 不返回向量数据
-                title=q.title,
-                question_type=q.question_type,
-                difficulty=q.difficulty,
-                source=q.source,
-                subject_id=q.subject_id,
-                user_id=q.user_id,
-                tags=q.tags,
-                created_at=q.created_at
-            ))
+        # 转换为响应格式（结果行不含向量数据）
+        results = [QuestionVectorResponse(**row, embedding=[]) for row in similar_questions]
         
         return results
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@router.get("/hybrid/search", response_model=HybridSearchResponse)
+async def hybrid_search_question_vectors(
+    query: str = Query(..., min_length=1, description="搜索查询"),
+    subject_id: Optional[int] = None,
+    question_type: Optional[str] = Query(None, description="题型过滤"),
+    difficulty: Optional[int] = Query(None, description="难度过滤"),
+    limit: int = Query(10, ge=1, le=50, description="每页结果数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """关键词 + 语义混合搜索试题（倒数排名融合，游标分页）"""
+    try:
+        items, next_cursor = await hybrid_search_questions(
+            query=query,
+            user_id=current_user.id,
+            subject_id=subject_id,
+            limit=limit,
+            cursor=cursor,
+            db=db,
+            question_type=question_type,
+            difficulty=difficulty
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        # 向量后端不支持关键词召回（见 require_database_backend）
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    return HybridSearchResponse(items=items, next_cursor=next_cursor)
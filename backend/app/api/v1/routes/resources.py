@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
 from app.db.session import get_db
+from app.crud.base import fetch_page
+from app.utils.pagination import set_next_cursor
 from app.models.resource import Resource, ResourceType
 from app.schemas.resource import ResourceCreate, ResourceUpdate, ResourceResponse
 from app.core.auth import get_current_user
@@ -11,6 +13,19 @@ from app.core.permissions import check_subject_member
 
 router = APIRouter()
 
+
+async def _resource_page(db: AsyncSession, query, response: Response, cursor: Optional[str], limit: Optional[int]):
+    """资料列表分页：未指定 limit 且没有游标时返回全部（兼容旧客户端）"""
+    if limit is None and not cursor:
+        result = await db.execute(query.order_by(Resource.id))
+        return result.scalars().all()
+    try:
+        resources, next_cursor = await fetch_page(db, query, Resource, cursor=cursor, limit=limit or 50)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return resources
+
 @router.post("/knowledge-points/{knowledge_point_id}/resources", response_model=ResourceResponse, status_code=status.HTTP_201_CREATED)
 async def create_resource(
     resource: ResourceCreate,
@@ -42,7 +57,10 @@ async def create_resource(
 
 @router.get("/knowledge-points/{knowledge_point_id}/resources", response_model=List[ResourceResponse])
 async def get_resources(
+    response: Response,
     knowledge_point_id: int = Path(..., description="知识点ID"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="每页数量，不指定则返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -56,8 +74,7 @@ async def get_resources(
     await check_subject_member(knowledge_point.subject_id, current_user, db)
 
     query = select(Resource).where(Resource.knowledge_point_id == knowledge_point_id)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _resource_page(db, query, response, cursor, limit)
 
 @router.get("/resources/{resource_id}", response_model=ResourceResponse)
 async def get_resource(
@@ -125,8 +142,11 @@ async def delete_resource(
 
 @router.get("/subjects/{subject_id}/resources", response_model=List[ResourceResponse])
 async def get_subject_resources(
+    response: Response,
     subject_id: int = Path(..., description="学科ID"),
     resource_type: Optional[ResourceType] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="每页数量，不指定则返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -143,5 +163,4 @@ async def get_subject_resources(
     if resource_type:
         query = query.where(Resource.resource_type == resource_type)
 
-    result = await db.execute(query)
-    return result.scalars().all()
\ No newline at end of file
+    return await _resource_page(db, query, response, cursor, limit)
\ No newline at end of file
@@ -4,6 +4,8 @@ from sqlalchemy.future import select
 from app.db.session import get_db
 from app.core.auth.permissions import teacher_required
 from app.core.auth import get_current_user
+from app.core.cache import cached_response
+from app.core.config import settings
 from app.models.question import Question
 from app.models.subject import Subject
 from app.models.tag import Tag
@@ -15,6 +17,7 @@ from app.models.book import Book
 router = APIRouter()
 
 @router.get("/overview")
+@cached_response(ttl=settings.STATS_CACHE_TTL)
 async def get_stats(
     current_user = Depends(teacher_required),
     db: AsyncSession = Depends(get_db)
@@ -31,6 +34,7 @@ async def get_stats(
     return stats
 
 @router.get("/difficulty-analysis")
+@cached_response(ttl=settings.STATS_CACHE_TTL, vary_user=False)
 async def analyze_difficulty(
     subject_id: int,
     db: AsyncSession = Depends(get_db),
@@ -50,6 +54,7 @@ async def analyze_difficulty(
     return stats
 
 @router.get("/tag-analysis")
+@cached_response(ttl=settings.STATS_CACHE_TTL, vary_user=False)
 async def analyze_tags(
     subject_id: int,
     db: AsyncSession = Depends(get_db),
@@ -68,6 +73,7 @@ async def analyze_tags(
 
 
 @router.get("/subject/", summary="获取统计信息")
+@cached_response(ttl=settings.STATS_CACHE_TTL, vary_user=False)
 async def get_stats(db: AsyncSession = Depends(get_db),subject_id: int = None):
     """
     获取文档数量和问题数量。
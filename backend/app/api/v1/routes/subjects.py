@@ -6,6 +6,7 @@ from app.db.session import get_db
 from app.models.subject import Subject
 from app.schemas.subject import SubjectCreate, SubjectUpdate, SubjectResponse, SubjectDetailResponse
 from app.core.auth import get_current_user
+from app.core.principals import invalidate_principals, invalidate_subject_principals
 from app.models.user import User
 from app.models.knowledge import KnowledgePoint
 from app.schemas.knowledge import KnowledgePointCreate, KnowledgePointResponse
@@ -30,6 +31,7 @@ async def create_subject(
     db.add(db_subject)
     await db.commit()
     await db.refresh(db_subject)
+    await invalidate_principals([current_user.id])
     return db_subject
 
 @router.get("/", response_model=List[SubjectResponse])
@@ -153,6 +155,7 @@ async def delete_subject(
     # 删除学科
     await db.delete(db_subject)
     await db.commit()
+    await invalidate_subject_principals(subject_id)
 
 @router.get("/{subject_id}/recommendations")
 async def get_subject_recommendations(
@@ -5,10 +5,13 @@ from app.db.session import get_db
 from app.models.question import Question
 from app.models.subject import Subject
 from app.core.auth import get_current_user
+from app.core.cache import cached_response
+from app.core.config import settings
 
 router = APIRouter()
 
 @router.get("/subject-stats")
+@cached_response(ttl=settings.STATS_CACHE_TTL, vary_user=False)
 async def get_subject_statistics(
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -24,6 +27,7 @@ async def get_subject_statistics(
     return [dict(row) for row in result]
 
 @router.get("/difficulty-distribution")
+@cached_response(ttl=settings.STATS_CACHE_TTL, vary_user=False)
 async def get_difficulty_distribution(
     subject_id: int,
     db: AsyncSession = Depends(get_db),
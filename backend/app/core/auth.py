@@ -2,10 +2,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.db.session import get_db
 from app.models.user import User
 from app.core.config import settings
+from app.core.principals import load_current_user
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="/api/v1/auth/login",
@@ -35,10 +35,8 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
 
-    # 查询用户
-    query = select(User).filter(User.id == user_id)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    # 查询用户（优先使用进程内缓存）
+    user = await load_current_user(db, user_id)
 
     if not user:
         raise credentials_exception
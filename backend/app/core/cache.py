@@ -1,35 +1,541 @@
-from fastapi import Request, Response
-import aioredis
-from functools import wraps
+# 两级缓存
+"""
+进程内 L1（app.utils.simple_cache.L1Cache）+ Redis L2（settings.REDIS_URL）
+
+- 读：L1 -> L2 -> 加载函数；同一进程内并发未命中只加载一次（single-flight）
+- 写：L2 按标签登记键（cache:tag:<tag> 集合），L1 的保留时间不超过 CACHE_L1_TTL
+- 失效：删除本进程 L1 与 L2 中该标签下的键，并通过 Redis pub/sub 广播，
+  其他 worker 收到后清理各自的 L1
+- 序列化：优先 msgpack（未安装时退回 JSON），首字节标记格式，不同部署可互相读取
+
+未配置 REDIS_URL 或未安装 redis 时使用进程内的 LocalRedis 代替（单进程开发与测试）。
+Redis 不可用时缓存退化为仅 L1，不影响请求。
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
+import logging
+import time
+import uuid
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
 from app.core.config import settings
+from app.utils.simple_cache import L1Cache, l1_cache, render_prometheus as render_l1_prometheus
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import redis.asyncio as aioredis
+except Exception:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+L2_RETRY_SECONDS = 5.0  # L2 出错后暂停访问 Redis 的时间
+RECONNECT_SECONDS = 1.0  # 订阅断开后重连的间隔
+SUBSCRIBE_TIMEOUT_SECONDS = 2.0  # 启动时等待订阅成功的最长时间
+
+_FORMAT_MSGPACK = b"m"
+_FORMAT_JSON = b"j"
+
+
+def _to_primitive(value: Any) -> Any:
+    """
+    msgpack/JSON 不能直接编码的类型转为基本类型
+
+    日期时间（含 neo4j.time）转为 ISO 字符串，Mapping（含 Neo4j 节点）转为 dict，
+    未知类型直接报错，避免把 repr 字符串写进缓存
+    """
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Cannot encode {type(value).__name__} for the cache")
+
+
+def encode_value(value: Any) -> bytes:
+    if msgpack is not None:
+        return _FORMAT_MSGPACK + msgpack.packb(value, default=_to_primitive, use_bin_type=True)
+    return _FORMAT_JSON + json.dumps(value, default=_to_primitive, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def decode_value(data: bytes) -> Any:
+    fmt, payload = data[:1], data[1:]
+    if fmt == _FORMAT_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    if fmt == _FORMAT_JSON:
+        return json.loads(payload)
+    raise ValueError(f"Unknown cache payload format: {fmt!r}")
+
+
+class _LocalPubSub:
+    def __init__(self, server: "LocalRedis") -> None:
+        self._server = server
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self._channels.add(channel)
+            self._server._subscribers.setdefault(channel, set()).add(self)
+            self._queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels or tuple(self._channels):
+            self._channels.discard(channel)
+            self._server._subscribers.get(channel, set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        try:
+            message = await asyncio.wait_for(self._queue.get(), timeout) if timeout else self._queue.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            return None
+        if ignore_subscribe_messages and message["type"] != "message":
+            return None
+        return message
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def aclose(self) -> None:
+        await self.unsubscribe()
+
+
+class LocalRedis:
+    """
+    进程内的 Redis 替身，实现缓存用到的命令子集（与 redis.asyncio / fakeredis 接口一致）
+
+    值统一存为 bytes；过期在读取时判断。
+    """
+
+    def __init__(self) -> None:
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[_LocalPubSub]] = {}
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    @staticmethod
+    def _bytes(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._data.get(key) if self._alive(key) else None
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        self._data[key] = self._bytes(value)
+        if ex:
+            self._expires[key] = time.monotonic() + ex
+        else:
+            self._expires.pop(key, None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    async def sadd(self, key: str, *members: Any) -> int:
+        self._alive(key)
+        current = self._data.setdefault(key, set())
+        before = len(current)
+        current.update(self._bytes(m) for m in members)
+        return len(current) - before
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        return set(self._data.get(key, set())) if self._alive(key) else set()
+
+    async def publish(self, channel: str, message: Any) -> int:
+        subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._queue.put_nowait({"type": "message", "channel": channel, "data": self._bytes(message)})
+        return len(subscribers)
+
+    def pubsub(self) -> _LocalPubSub:
+        return _LocalPubSub(self)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self) -> None:
+        self._subscribers.clear()
+
+    async def flushdb(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+
+def create_redis_client(url: Optional[str] = None):
+    """按 REDIS_URL 创建客户端；未配置或未安装 redis 时返回 LocalRedis"""
+    url = url if url is not None else settings.REDIS_URL
+    if not url or aioredis is None:
+        if url:
+            logger.warning("未安装 redis，缓存 L2 使用进程内实现，多个 worker 之间不会同步失效")
+        return LocalRedis()
+    return aioredis.from_url(url)
+
 
-redis = aioredis.from_url(settings.REDIS_URL)
+class TwoTierCache:
+    """L1（进程内）+ L2（Redis）缓存，标签失效通过 pub/sub 同步到其他进程"""
 
-async def cache_response(
-    request: Request,
-    response: Response,
-    expire: int = 300
+    def __init__(
+        self,
+        l1: L1Cache,
+        redis: Any,
+        l1_ttl: float = 30.0,
+        channel: str = INVALIDATION_CHANNEL,
+    ) -> None:
+        self.l1 = l1
+        self.redis = redis
+        self.l1_ttl = l1_ttl
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self._l2_down_until = 0.0
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self.invalidations_received = 0
+        self._invalidation_listeners: List[Callable[[Optional[Sequence[str]]], None]] = []
+
+    def add_invalidation_listener(self, callback: Callable[[Optional[Sequence[str]]], None]) -> None:
+        """
+        登记其他进程发来的标签失效的回调（供缓存之外的进程内状态同步，如学科图谱快照）
+
+        回调参数为失效的标签；订阅中断、可能漏收消息时为 None，应丢弃全部相关状态
+        """
+        self._invalidation_listeners.append(callback)
+
+    def _notify_listeners(self, tags: Optional[Sequence[str]]) -> None:
+        for callback in self._invalidation_listeners:
+            try:
+                callback(tags)
+            except Exception as exc:
+                logger.warning("缓存失效回调执行失败: %s", exc)
+
+    # ------------------------------ L2 ------------------------------ #
+    def _l2_available(self) -> bool:
+        return time.monotonic() >= self._l2_down_until
+
+    def _l2_failed(self, action: str, exc: Exception) -> None:
+        self.l2_errors += 1
+        self._l2_down_until = time.monotonic() + L2_RETRY_SECONDS
+        logger.warning("缓存 L2 %s失败，%.0f 秒内仅使用 L1: %s", action, L2_RETRY_SECONDS, exc)
+
+    async def _l2_get(self, key: str) -> Any:
+        if not self._l2_available():
+            return _MISSING
+        try:
+            data = await self.redis.get(KEY_PREFIX + key)
+        except Exception as exc:
+            self._l2_failed("读取", exc)
+            return _MISSING
+        if data is None:
+            self.l2_misses += 1
+            return _MISSING
+        try:
+            value = decode_value(data)
+        except Exception as exc:
+            logger.warning("缓存 L2 数据无法解码 %s: %s", key, exc)
+            return _MISSING
+        self.l2_hits += 1
+        return value
+
+    async def _l2_set(self, key: str, value: Any, ttl: int, tags: Iterable[str]) -> None:
+        if not self._l2_available():
+            return
+        # 编码错误是调用方的问题（值类型无法缓存），直接抛出，不当作 Redis 故障
+        payload = encode_value(value)
+        try:
+            await self.redis.set(KEY_PREFIX + key, payload, ex=ttl or None)
+            for tag in tags:
+                # 标签集合的过期时间不短于其中的键，失效时只需读取该集合
+                await self.redis.sadd(TAG_PREFIX + tag, key)
+                if ttl:
+                    await self.redis.expire(TAG_PREFIX + tag, ttl)
+        except Exception as exc:
+            self._l2_failed("写入", exc)
+
+    # ----------------------------- 读写 ----------------------------- #
+    def _l1_ttl(self, ttl: Optional[int]) -> float:
+        # 本地条目只保留较短时间，即使漏收失效消息，过期数据也很快被替换
+        return min(ttl, self.l1_ttl) if ttl else self.l1_ttl
+
+    async def get(self, key: str) -> Any:
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await self._l2_get(key)
+        return None if value is _MISSING else value
+
+    async def set(self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        self.l1.set(key, value, self._l1_ttl(ttl), tags)
+        await self._l2_set(key, value, ttl, tags)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        tags = tuple(tags)
+
+        async def load_through_l2() -> Any:
+            value = await self._l2_get(key)
+            if value is not _MISSING:
+                return value
+            generations = self.l1.tag_generations(tags)
+            value = await loader()
+            # 加载期间标签被失效时，结果可能已过期，不写入 L2
+            if self.l1.tag_generations(tags) == generations:
+                await self._l2_set(key, value, ttl, tags)
+            return value
+
+        return await self.l1.get_or_load(key, load_through_l2, self._l1_ttl(ttl), tags)
+
+    # ----------------------------- 失效 ----------------------------- #
+    async def invalidate_tags(self, *tags: str) -> None:
+        """失效本进程 L1、L2 中的标签条目，并通知其他进程"""
+        self.l1.invalidate_tags(*tags)
+        if not tags:
+            return
+        try:
+            for tag in tags:
+                keys = await self.redis.smembers(TAG_PREFIX + tag)
+                names = [KEY_PREFIX + (k.decode() if isinstance(k, bytes) else k) for k in keys]
+                await self.redis.delete(*names, TAG_PREFIX + tag)
+            message = json.dumps({"origin": self.instance_id, "tags": list(tags)})
+            await self.redis.publish(self.channel, message)
+        except Exception as exc:
+            self._l2_failed("失效", exc)
+
+    def _apply_message(self, data: Any) -> None:
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning("无法解析缓存失效消息: %r", data)
+            return
+        if payload.get("origin") == self.instance_id:
+            return
+        self.invalidations_received += 1
+        tags = tuple(payload.get("tags", ()))
+        self.l1.invalidate_tags(*tags)
+        self._notify_listeners(tags)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # 断线期间可能漏掉失效消息，保守地清空本地缓存
+                logger.warning("缓存失效订阅中断，%.0f 秒后重连: %s", RECONNECT_SECONDS, exc)
+                self.l1.clear()
+                self._notify_listeners(None)
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                self._subscribed.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def start(self) -> None:
+        """开始订阅失效广播（在应用启动时调用），订阅成功或超时后返回"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("缓存失效广播订阅超时，将在后台继续重试")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "l1": self.l1.stats(),
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+            "invalidations_received": self.invalidations_received,
+        }
+
+
+_MISSING = object()
+
+
+def render_prometheus() -> str:
+    """两级缓存指标（Prometheus 文本格式）"""
+    lines = [render_l1_prometheus().rstrip("\n")]
+    for metric, value in (
+        ("cache_l2_hits_total", cache.l2_hits),
+        ("cache_l2_misses_total", cache.l2_misses),
+        ("cache_l2_errors_total", cache.l2_errors),
+        ("cache_invalidations_received_total", cache.invalidations_received),
+    ):
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+redis = create_redis_client()
+cache = TwoTierCache(l1_cache, redis, l1_ttl=settings.CACHE_L1_TTL)
+
+
+SUBJECT_TAG_PREFIX = "kp:subject:"
+
+
+def subject_tag(subject_id: int) -> str:
+    """学科内容（知识点列表、搜索、图谱）缓存的失效标签"""
+    return f"{SUBJECT_TAG_PREFIX}{subject_id}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中 ETag（支持逗号分隔的多个值、弱校验 W/ 前缀与 *）"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def cached_response(
+    ttl: Optional[int] = None,
+    vary_user: bool = True,
+    tags: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None,
+    response_model: Any = None,
+    namespace: Optional[str] = None,
+    user_param: str = "current_user",
 ):
-    """缓存响应数据"""
-    if request.method != "GET":
-        return response
-        
-    cache_key = f"cache:{request.url.path}:{request.query_params}"
-    
-    # 尝试从缓存获取
-    cached = await redis.get(cache_key)
-    if cached:
-        return Response(
-            content=cached,
-            media_type="application/json"
+    """
+    路由级响应缓存（仅 GET），缓存序列化后的 JSON 及其 ETag
+
+    - 键：namespace（默认为路由函数名）+ 路径 + 排序后的查询参数，vary_user 时再加上当前用户ID
+      （取自名为 user_param 的路由参数，签名中没有该参数时在装饰时报错）
+    - tags：根据路由参数生成失效标签，如 lambda p: [subject_tag(p["subject_id"])]
+    - ETag 为响应内容的哈希；请求带 If-None-Match 且一致时返回 304
+    - response_model：返回 Response 时 FastAPI 不再按 response_model 序列化，需在此传入；
+      与 FastAPI 相同，先按模型校验（支持 Mapping 与属性对象）再序列化
+
+    权限检查需放在依赖中（Depends），缓存命中时不会执行路由函数体。
+    用法（放在 @router.get 之下）：
+        @router.get("/{subject_id}")
+        @cached_response(ttl=60, tags=lambda p: [subject_tag(p["subject_id"])])
+        async def endpoint(subject_id: int, current_user=Depends(get_current_user)): ...
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(func)
+        if vary_user and user_param not in signature.parameters:
+            raise TypeError(
+                f"cached_response(vary_user=True): {func.__qualname__} has no '{user_param}' parameter"
+            )
+        request_param = next(
+            (name for name, param in signature.parameters.items() if param.annotation is Request), None
         )
-    
-    # 缓存新响应
-    await redis.set(
-        cache_key,
-        response.body,
-        expire=expire
-    )
-    
-    return response
+        parameters = list(signature.parameters.values())
+        if request_param is None:
+            request_param = "_cache_request"
+            parameters.append(inspect.Parameter(request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+        adapter = TypeAdapter(response_model) if response_model is not None else None
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+        expire = ttl if ttl is not None else settings.CACHE_TTL
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            request: Request = kwargs[request_param]
+            if request_param == "_cache_request":
+                kwargs.pop(request_param)
+            if request.method != "GET":
+                return await func(*args, **kwargs)
+
+            query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+            key = f"resp:{prefix}:{request.url.path}?{query}"
+            if vary_user:
+                key += f":u{kwargs[user_param].id}"
+
+            async def render() -> Dict[str, str]:
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    raise _Uncacheable(result)
+                if adapter is not None:
+                    data = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+                else:
+                    data = jsonable_encoder(result)
+                body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+                digest = hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+                return {"body": body, "etag": f'"{digest}"'}
+
+            try:
+                entry = await cache.get_or_load(key, render, expire, tags(kwargs) if tags else ())
+            except _Uncacheable as exc:
+                return exc.response
+            headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+            if etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+                return Response(status_code=304, headers=headers)
+            return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
+
+
+class _Uncacheable(Exception):
+    """路由函数自行返回了 Response（如错误或文件），原样返回且不缓存"""
+
+    def __init__(self, response: Response) -> None:
+        self.response = response
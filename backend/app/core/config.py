@@ -49,6 +49,16 @@ class Settings(BaseSettings):
     # 数据库连接配置
     DB_ECHO: bool = False  # SQL 语句日志输出
     CREATE_DB_TABLES: bool = True  # 是否在启动时自动创建数据库表（开发环境可用）
+
+    # 连接池配置（api 池服务交互请求，background 池服务后台任务与 Celery 任务）
+    DB_USE_NULLPOOL: bool = False  # 前置 PgBouncer 等外部连接池时设为 True，不在进程内保留连接
+    DB_POOL_SIZE: int = 10  # api 池常驻连接数
+    DB_MAX_OVERFLOW: int = 10  # api 池高峰时可额外创建的连接数
+    DB_BACKGROUND_POOL_SIZE: int = 3  # background 池常驻连接数
+    DB_BACKGROUND_MAX_OVERFLOW: int = 2  # background 池可额外创建的连接数
+    DB_POOL_TIMEOUT: int = 30  # 连接池耗尽时等待连接的秒数，超时抛出异常
+    DB_POOL_RECYCLE: int = 1800  # 连接最长使用秒数，超过后重建（避免被服务端/防火墙断开）
+    DB_POOL_PRE_PING: bool = True  # 取连接时检测连接是否可用
     
     @field_validator("DATABASE_URL")
     def validate_db_url(cls, v: PostgresDsn) -> PostgresDsn:
@@ -97,6 +107,13 @@ class Settings(BaseSettings):
     # ================== 缓存配置 ==================
     REDIS_URL: Optional[str] = "redis://localhost:6379/0"
     CACHE_TTL: int = 300  # 5 minutes
+    CACHE_MAX_ENTRIES: int = 10000  # 进程内缓存条目上限，超过后淘汰最久未使用的条目
+    CACHE_SWEEP_INTERVAL: float = 30.0  # 后台清理过期缓存条目的间隔（秒）
+    CACHE_L1_TTL: int = 30  # 两级缓存中进程内条目的最长保留秒数（漏收失效广播时的过期上限）
+    PRINCIPAL_CACHE_TTL: int = 60  # 已认证用户及其学科/班级关系的缓存秒数（撤销权限的最长生效延迟）
+    STATS_CACHE_TTL: int = 30  # 统计/可视化接口响应的缓存秒数（仪表盘轮询，允许短暂延迟）
+    KG_SNAPSHOT_TTL: int = 600  # 学科知识图谱内存快照的最长保留秒数，超过后重新加载
+    KG_SNAPSHOT_MAX_SUBJECTS: int = 64  # 同时缓存图谱快照的学科数上限
     
     # ================== 监控配置 ==================
     PROMETHEUS_ENABLED: bool = True
@@ -105,6 +122,9 @@ class Settings(BaseSettings):
     # ================== 任务队列 ==================
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    EXAM_PARSER_WARMUP: bool = True  # Celery worker 启动时预加载 OCR 模型
+    EXAM_PARSER_OCR_LANGS: List[str] = ["ch"]
+    EXAM_PARSER_USE_LAYOUT: bool = False
     
     # ================== 文件存储 ==================
     MEDIA_ROOT: str = str(ROOT_PATH / "media")
@@ -112,6 +132,24 @@ class Settings(BaseSettings):
     
     # ================== LLM 配置 ==================
     OLLAMA_BASE_URL: str = "http://localhost:11434"
+    EMBEDDING_BATCH_SIZE: int = 32  # 每次 embed_documents 请求的文本条数
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # 同时进行的嵌入请求数上限
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: Optional[str] = str(ROOT_PATH / "cache" / "embeddings")  # 为空则仅使用内存层
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000  # 内存 LRU 条目上限（1024 维 float32 约 4KB/条）
+    EMBEDDING_CACHE_MAX_MB: int = 1024  # 持久层大小上限（MB），0 表示不限
+
+    # ================== 向量索引 ==================
+    VECTOR_INDEX_M: int = 16  # HNSW 每个节点的邻居数
+    VECTOR_INDEX_EF_CONSTRUCTION: int = 64  # HNSW 建索引时的候选列表大小
+    VECTOR_EF_SEARCH: int = 40  # HNSW 查询时的候选列表大小（越大召回越高、越慢）
+    VECTOR_PREFILTER_MAX_ROWS: int = 5000  # 过滤后行数不超过该值时精确扫描候选行
+    VECTOR_POSTFILTER_OVERFETCH: int = 4  # 索引扫描后过滤时候选数相对 limit 的放大倍数
+    VECTOR_SEARCH_BACKEND: str = "pgvector"  # pgvector | numpy（进程内精确搜索，无需 pgvector；不支持关键词/混合搜索）
+    VECTOR_NUMPY_DIR: str = str(ROOT_PATH / "cache" / "vectors")  # numpy 后端的向量文件目录
+    VECTOR_NUMPY_DTYPE: str = "float32"  # numpy 后端的存储精度：float32 | float16
+    HYBRID_SEARCH_CANDIDATES: int = 100  # 混合搜索中关键词、语义两路各取的候选数
+    HYBRID_RRF_K: int = 60  # 倒数排名融合（RRF）的平滑常数
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_API_BASE: Optional[str] = None
     
@@ -119,6 +157,12 @@ class Settings(BaseSettings):
     NEO4J_URI: str = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     NEO4J_USER: str = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD: str = os.getenv("NEO4J_PASSWORD", "12345678")
+    NEO4J_MAX_POOL_SIZE: int = 50  # 每个驱动的最大连接数
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 30.0  # 连接池耗尽时等待连接的秒数
+    NEO4J_MAX_CONNECTION_LIFETIME: int = 3600  # 连接最长使用秒数
+    NEO4J_LIVENESS_CHECK_TIMEOUT: Optional[float] = 60.0  # 空闲超过该秒数的连接在使用前先检测
+    NEO4J_FETCH_SIZE: int = 2000  # 每批从服务端拉取的记录数
+    NEO4J_WRITE_BATCH_SIZE: int = 500  # 批量写入时每条 UNWIND 语句携带的行数
 
     # ================== 模型配置 ==================
     model_config = SettingsConfigDict(
@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.auth import get_current_user
+from app.core.principals import get_principal
 from app.db.session import get_db
 from app.schemas.user import UserRole
 from app.models.user import User
@@ -28,6 +29,11 @@ async def check_subject_owner(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """检查并返回学科所有者权限的用户"""
+    # 缓存显示有权限时直接放行；否则回到数据库判断（区分 404/403）
+    principal = await get_principal(db, current_user.id)
+    if principal and principal.is_subject_owner(subject_id):
+        return current_user
+
     from app.models.subject import Subject
     subject = await db.get(Subject, subject_id)
     if not subject:
@@ -44,6 +50,10 @@ async def check_subject_member(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """检查并返回学科成员权限的用户（所有者或已加入成员）"""
+    principal = await get_principal(db, current_user.id)
+    if principal and principal.is_subject_member(subject_id):
+        return current_user
+
     from app.models.subject import Subject
     subject = await db.get(Subject, subject_id)
     if not subject:
@@ -74,6 +84,10 @@ async def check_class_owner(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """检查并返回班级所有者权限的用户"""
+    principal = await get_principal(db, current_user.id)
+    if principal and principal.is_class_owner(class_id):
+        return current_user
+
     from app.models.class_model import Class
     class_obj = await db.get(Class, class_id)
     if not class_obj:
@@ -90,6 +104,10 @@ async def check_class_member(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """检查并返回班级成员权限的用户（所有者或已加入成员）"""
+    principal = await get_principal(db, current_user.id)
+    if principal and principal.is_class_member(class_id):
+        return current_user
+
     from app.models.class_model import Class
     class_obj = await db.get(Class, class_id)
     if not class_obj:
@@ -0,0 +1,155 @@
+# 当前用户（principal）缓存
+"""
+缓存已认证用户的用户行与其学科/班级关系，认证与权限检查不必每个请求都查询数据库
+
+- 缓存放在两级缓存的 L1（进程内），不写入 Redis；失效通过两级缓存的标签广播同步到所有 worker
+- 标签：principal:<user_id>，以及每个相关学科/班级的 principal:subject:<id> / principal:class:<id>，
+  删除学科或班级时可一次失效所有相关用户
+- 命中时用 merge(load=False) 把用户行挂到当前会话，不发出 SELECT，路由中对 current_user 的修改照常提交
+- 权限检查只在缓存显示"有权限"时走捷径；缓存中没有的关系仍回到数据库判断，
+  新授予的权限立即生效，撤销的权限最迟在 PRINCIPAL_CACHE_TTL 后生效（相关写操作会主动失效）
+"""
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.models.class_model import Class, class_student
+from app.models.subject import Subject, user_subject
+from app.models.user import User
+
+
+def principal_tag(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def subject_principals_tag(subject_id: int) -> str:
+    return f"principal:subject:{subject_id}"
+
+
+def class_principals_tag(class_id: int) -> str:
+    return f"principal:class:{class_id}"
+
+
+@dataclass(frozen=True, eq=False)
+class Principal:
+    user_id: int
+    row: Dict[str, Any]  # User 的列值
+    owned_subjects: FrozenSet[int] = field(default_factory=frozenset)
+    member_subjects: FrozenSet[int] = field(default_factory=frozenset)
+    owned_classes: FrozenSet[int] = field(default_factory=frozenset)
+    member_classes: FrozenSet[int] = field(default_factory=frozenset)
+
+    def is_subject_owner(self, subject_id: int) -> bool:
+        return subject_id in self.owned_subjects
+
+    def is_subject_member(self, subject_id: int) -> bool:
+        return subject_id in self.owned_subjects or subject_id in self.member_subjects
+
+    def is_class_owner(self, class_id: int) -> bool:
+        return class_id in self.owned_classes
+
+    def is_class_member(self, class_id: int) -> bool:
+        return class_id in self.owned_classes or class_id in self.member_classes
+
+    def tags(self) -> List[str]:
+        return (
+            [principal_tag(self.user_id)]
+            + [subject_principals_tag(s) for s in self.owned_subjects | self.member_subjects]
+            + [class_principals_tag(c) for c in self.owned_classes | self.member_classes]
+        )
+
+
+def _cache_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _user_row(user: User) -> Dict[str, Any]:
+    return {attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs}
+
+
+async def _load_memberships(db: AsyncSession, user_id: int) -> Dict[str, FrozenSet[int]]:
+    """一次查询取出用户拥有/加入的学科与班级"""
+    stmt = union_all(
+        select(literal("owned_subjects").label("kind"), Subject.id.label("id")).where(Subject.user_id == user_id),
+        select(literal("member_subjects"), user_subject.c.subject_id).where(user_subject.c.user_id == user_id),
+        select(literal("owned_classes"), Class.id).where(Class.teacher_id == user_id),
+        select(literal("member_classes"), class_student.c.class_id).where(class_student.c.student_id == user_id),
+    )
+    groups: Dict[str, set] = {
+        "owned_subjects": set(), "member_subjects": set(), "owned_classes": set(), "member_classes": set(),
+    }
+    for kind, object_id in (await db.execute(stmt)).all():
+        groups[kind].add(object_id)
+    return {kind: frozenset(ids) for kind, ids in groups.items()}
+
+
+async def _load(
+    db: AsyncSession, user_id: int, user: Optional[User] = None, generations: Optional[tuple] = None
+) -> Optional[Principal]:
+    key = _cache_key(user_id)
+    if generations is None:
+        generations = cache.l1.tag_generations([principal_tag(user_id)])
+    if user is None:
+        user = await db.get(User, user_id)
+        if user is None:
+            return None
+    principal = Principal(user_id, _user_row(user), **await _load_memberships(db, user_id))
+    # 加载期间该用户被失效时不写入缓存，避免覆盖为旧数据
+    if cache.l1.tag_generations([principal_tag(user_id)]) == generations:
+        cache.l1.set(key, principal, settings.PRINCIPAL_CACHE_TTL, principal.tags())
+    return principal
+
+
+async def get_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """取用户及其学科/班级关系（缓存未命中时查询数据库）"""
+    principal = cache.l1.get(_cache_key(user_id))
+    if principal is not None:
+        return principal
+    return await _load(db, user_id)
+
+
+async def _attach_user(db: AsyncSession, principal: Principal) -> User:
+    """由缓存的列值构造 User 并挂到当前会话（不查询数据库）"""
+    user = sa_inspect(User).class_manager.new_instance()
+    for key, value in principal.row.items():
+        # JSON 列为可变对象，复制一份，避免请求内的修改影响缓存
+        set_committed_value(user, key, copy.deepcopy(value) if isinstance(value, (dict, list)) else value)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def load_current_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """认证依赖使用：返回当前会话中的 User，缓存命中时不访问数据库"""
+    principal = cache.l1.get(_cache_key(user_id))
+    if principal is not None:
+        return await _attach_user(db, principal)
+    generations = cache.l1.tag_generations([principal_tag(user_id)])
+    user = await db.get(User, user_id)
+    if user is not None:
+        await _load(db, user_id, user, generations)
+    return user
+
+
+async def invalidate_principals(user_ids: Iterable[int]) -> None:
+    """用户资料或权限关系变化后调用（所有 worker 同步失效）"""
+    tags = [principal_tag(user_id) for user_id in user_ids]
+    if tags:
+        await cache.invalidate_tags(*tags)
+
+
+async def invalidate_subject_principals(subject_id: int) -> None:
+    """学科删除或所有者变化时，失效所有与该学科相关的用户"""
+    await cache.invalidate_tags(subject_principals_tag(subject_id))
+
+
+async def invalidate_class_principals(class_id: int) -> None:
+    """班级删除或所有者变化时，失效所有与该班级相关的用户"""
+    await cache.invalidate_tags(class_principals_tag(class_id))
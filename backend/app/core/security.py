@@ -223,7 +223,8 @@ async def get_current_user(
                     headers={"WWW-Authenticate": authenticate_value},
                 )
                 
-        user = await db.get(User, user_id)
+        from app.core.principals import load_current_user
+        user = await load_current_user(db, user_id)
         if user is None:
             raise credentials_exception
         return user
@@ -1,15 +1,120 @@
 # app/crud/base.py
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select
+from sqlalchemy import DateTime, Integer, Select, func, select, text, tuple_
 from sqlalchemy.orm import selectinload
 from app.models.base import Base
+from app.utils.pagination import decode_cursor, encode_cursor
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 FilterType = TypeVar("FilterType", bound=BaseModel)
+
+
+def _keyset_columns(model: Any, order_by: str) -> List[Any]:
+    """排序列：order_by 加上 id 作为唯一的决胜列"""
+    if order_by == "id":
+        return [model.id]
+    return [getattr(model, order_by), model.id]
+
+
+def _cursor_value(column: Any, value: Any) -> Any:
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    return value
+
+
+def apply_keyset(
+    query: Select,
+    model: Any,
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    order_by: str = "id",
+    descending: bool = False,
+) -> Select:
+    """
+    为查询加上 keyset（游标）分页条件
+
+    按 (order_by, id) 排序，游标之后的行通过行值比较 (order_by, id) > (:v, :id) 定位，
+    可直接使用 (order_by, id) 上的索引，深翻页不再随 OFFSET 线性变慢。
+    多取一行用于判断是否还有下一页，结果交给 keyset_page 处理。
+
+    Raises:
+        ValueError: 游标无效
+    """
+    columns = _keyset_columns(model, order_by)
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        try:
+            values = [_cursor_value(column, value) for column, value in zip(columns, values)]
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        key, after = tuple_(*columns), tuple_(*values)
+        query = query.where(key < after if descending else key > after)
+    return query.order_by(*[column.desc() if descending else column.asc() for column in columns]).limit(limit + 1)
+
+
+def keyset_page(
+    items: Sequence[Any], limit: int, order_by: str = "id"
+) -> Tuple[List[Any], Optional[str]]:
+    """截取 apply_keyset 多取的一行，返回 (当前页, 下一页游标)"""
+    page = list(items[:limit])
+    if len(items) <= limit or not page:
+        return page, None
+    last = page[-1]
+    values = [last.id] if order_by == "id" else [getattr(last, order_by), last.id]
+    return page, encode_cursor([value.isoformat() if isinstance(value, datetime) else value for value in values])
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    *,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    order_by: str = "id",
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    执行分页查询，返回 (当前页, 下一页游标)
+
+    优先使用游标；没有游标但指定了 skip 时退回 OFFSET 分页（兼容旧客户端），
+    两种方式排序一致，OFFSET 分页返回的游标同样可以继续翻页。
+    """
+    if cursor or not skip:
+        query = apply_keyset(query, model, cursor=cursor, limit=limit, order_by=order_by, descending=descending)
+    else:
+        columns = _keyset_columns(model, order_by)
+        query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+        query = query.offset(skip).limit(limit + 1)
+    result = await db.execute(query)
+    return keyset_page(result.scalars().all(), limit, order_by)
+
+
+async def estimated_count(db: AsyncSession, table_name: str) -> Optional[int]:
+    """
+    表行数估计值（pg_class.reltuples，由 VACUUM / ANALYZE 维护）
+
+    表从未被分析过时返回 None。
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table_name},
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -48,6 +153,39 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(query)
         return list(result.scalars().all())
 
+    async def get_multi_keyset(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        descending: bool = False,
+        load_relationships: Optional[List[str]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """按游标获取多个对象，返回 (对象列表, 下一页游标)；没有更多数据时游标为 None"""
+        query = select(self.model)
+        if load_relationships:
+            for relationship in load_relationships:
+                query = query.options(selectinload(getattr(self.model, relationship)))
+        query = apply_keyset(query, self.model, cursor=cursor, limit=limit, order_by=order_by, descending=descending)
+        result = await db.execute(query)
+        return keyset_page(result.scalars().all(), limit, order_by)
+
+    async def count_all(self, db: AsyncSession, *, estimated: bool = False) -> int:
+        """
+        对象总数
+
+        estimated=True 时使用 pg_class.reltuples 的估计值，避免在大表上执行 count(*)；
+        表尚未被分析时退回精确计数。
+        """
+        if estimated:
+            estimate = await estimated_count(db, self.model.__tablename__)
+            if estimate is not None:
+                return estimate
+        result = await db.execute(select(func.count(self.model.id)))
+        return result.scalar_one()
+
     async def get_multi_paginated(
         self,
         db: AsyncSession,
@@ -55,11 +193,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         skip: int = 0,
         limit: int = 100,
         load_relationships: Optional[List[str]] = None,
+        estimated_total: bool = False,
     ) -> tuple[List[ModelType], int]:
-        """获取带分页信息（总数）的多个对象"""
-        count_query = select(func.count(self.model.id))
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one()
+        """获取带分页信息（总数）的多个对象；estimated_total=True 时总数为估计值"""
+        total = await self.count_all(db, estimated=estimated_total)
 
         query = select(self.model)
         if load_relationships:
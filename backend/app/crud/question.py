@@ -7,7 +7,7 @@ from app.schemas.question import QuestionCreate, QuestionUpdate
 
 from typing import List, Optional
 from sqlalchemy import select, func, text
-from sqlalchemy.sql import or_
+from app.services.text_search import keyword_condition
 
 class QuestionCRUD(CRUDBase[Question, QuestionCreate, QuestionUpdate]):
     async def create_with_author(
@@ -40,12 +40,7 @@ class QuestionCRUD(CRUDBase[Question, QuestionCreate, QuestionUpdate]):
         
         # 添加搜索条件
         if keyword and keyword.strip():
-            query = query.where(
-                or_(
-                    self.model.title.ilike(f"%{keyword.strip()}%"),
-                    self.model.content.ilike(f"%{keyword.strip()}%")
-                )
-            )
+            query = query.where(keyword_condition(self.model, keyword.strip()))
         if type and type.strip():
             query = query.where(self.model.type == type.strip())
         if subject:
@@ -72,12 +67,7 @@ class QuestionCRUD(CRUDBase[Question, QuestionCreate, QuestionUpdate]):
         
         # 添加搜索条件
         if keyword:
-            query = query.where(
-                or_(
-                    self.model.title.ilike(f"%{keyword}%"),
-                    self.model.content.ilike(f"%{keyword}%")
-                )
-            )
+            query = query.where(keyword_condition(self.model, keyword))
         if type:
             query = query.where(self.model.type == type)
         if subject:
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.core.security import get_password_hash
+from app.core.principals import invalidate_principals
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -40,7 +41,10 @@ class UserCRUD(CRUDBase[User, UserCreate, UserUpdate]):
         if "password" in update_data and update_data["password"]:
             hashed_password = get_password_hash(update_data.pop("password"))
             update_data["hashed_password"] = hashed_password
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        updated = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        # 用户资料（角色、启用状态等）变化后失效认证缓存
+        await invalidate_principals([updated.id])
+        return updated
 
 
 user = UserCRUD(User)
\ No newline at end of file
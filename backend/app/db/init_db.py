@@ -1,6 +1,6 @@
 # 初始化数据库
 import logging
-from app.db.session import engine
+from app.db.session import engine, background_engine
 from app.db.base import Base
 from sqlalchemy import text
 
@@ -33,4 +33,5 @@ async def close_db() -> None:
     """
     logger.info("Closing database connection pool...")
     await engine.dispose()
+    await background_engine.dispose()
     logger.info("Database connection pool closed.")
@@ -1,21 +1,136 @@
-from neo4j import GraphDatabase
+"""
+Neo4j 访问层
+
+- 异步驱动 async_driver：FastAPI 路由与后台任务使用，Cypher 往返期间不阻塞事件循环
+- 同步驱动 driver：Celery 任务与脚本使用，*_sync 函数是同一组 Cypher 的同步薄封装
+
+两个驱动共用 NEO4J_* 连接池配置；驱动按需建立连接，导入本模块不会连接数据库。
+读写均使用托管事务（execute_read / execute_write），遇到可重试的错误时驱动会自动重试。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
 from app.core.config import settings
 
-driver = GraphDatabase.driver(
-    settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-)
 
+def _driver_config() -> Dict[str, Any]:
+    return {
+        "auth": (settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+        "max_connection_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+        "connection_acquisition_timeout": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        "max_connection_lifetime": settings.NEO4J_MAX_CONNECTION_LIFETIME,
+        "liveness_check_timeout": settings.NEO4J_LIVENESS_CHECK_TIMEOUT,
+        "fetch_size": settings.NEO4J_FETCH_SIZE,
+    }
+
+
+async_driver = AsyncGraphDatabase.driver(settings.NEO4J_URI, **_driver_config())
+driver = GraphDatabase.driver(settings.NEO4J_URI, **_driver_config())
+
+
+def get_async_session(**kwargs):
+    return async_driver.session(**kwargs)
 
-def get_session():
-    return driver.session()
+
+def get_session(**kwargs):
+    return driver.session(**kwargs)
+
+
+async def close_async_driver():
+    await async_driver.close()
 
 
 def close_driver():
     driver.close()
 
 
+async def _collect(tx, query: str, params: Dict[str, Any]) -> list:
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+
+def _collect_sync(tx, query: str, params: Dict[str, Any]) -> list:
+    return list(tx.run(query, params))
+
+
+async def read_query(query: str, **params) -> list:
+    """在读事务中执行查询，返回全部记录"""
+    async with get_async_session() as session:
+        return await session.execute_read(_collect, query, params)
+
+
+async def write_query(query: str, **params) -> list:
+    """在写事务中执行查询，返回全部记录"""
+    async with get_async_session() as session:
+        return await session.execute_write(_collect, query, params)
+
+
+def read_query_sync(query: str, **params) -> list:
+    with get_session() as session:
+        return session.execute_read(_collect_sync, query, params)
+
+
+def write_query_sync(query: str, **params) -> list:
+    with get_session() as session:
+        return session.execute_write(_collect_sync, query, params)
+
+
+def _first(records: list, key: str = "kp"):
+    return records[0][key] if records else None
+
+
+CREATE_KNOWLEDGE_POINT = """
+MERGE (kp:KnowledgePoint {id: $id})
+ON CREATE SET kp.name = $name,
+              kp.description = $desc,
+              kp.difficulty = coalesce($diff, 3),
+              kp.subject_id = $subj_id,
+              kp.creator_id = $creator_id,
+              kp.code = $code,
+              kp.slug = $slug
+ON MATCH SET kp.name = $name,
+             kp.description = $desc,
+             kp.difficulty = coalesce($diff, kp.difficulty),
+             kp.code = coalesce($code, kp.code),
+             kp.slug = coalesce($slug, kp.slug)
+RETURN kp
+"""
+
+GET_KNOWLEDGE_POINTS_BY_SUBJECT = (
+    "MATCH (kp:KnowledgePoint {subject_id: $subj_id}) RETURN kp ORDER BY coalesce(kp.name,'')"
+)
+
+GET_KNOWLEDGE_POINT = "MATCH (kp:KnowledgePoint {id: $id}) RETURN kp"
+
+DELETE_KNOWLEDGE_POINT = "MATCH (kp:KnowledgePoint {id: $id}) DETACH DELETE kp"
+
+# 使用 toLower 简单模糊匹配（生产可用 ES）
+SEARCH_KNOWLEDGE_POINTS = """
+MATCH (kp:KnowledgePoint {subject_id: $subj_id})
+WHERE toLower(kp.name) CONTAINS toLower($q)
+   OR toLower(coalesce(kp.description,'')) CONTAINS toLower($q)
+RETURN kp
+ORDER BY coalesce(kp.name,'')
+LIMIT 100
+"""
+
+
+def _create_params(id, name, description, difficulty, subject_id, creator_id, code, slug) -> Dict[str, Any]:
+    return {
+        "id": id,
+        "name": name,
+        "desc": description,
+        "diff": difficulty,
+        "subj_id": subject_id,
+        "creator_id": creator_id,
+        "code": code,
+        "slug": slug,
+    }
+
+
 # 创建知识点（节点）
-def create_knowledge_point(
+async def create_knowledge_point(
     id: int,
     name: str,
     description: str | None,
@@ -25,69 +140,53 @@ def create_knowledge_point(
     code: str | None = None,
     slug: str | None = None,
 ):
-    with get_session() as session:
-        result = session.run(
-            """
-            MERGE (kp:KnowledgePoint {id: $id})
-            ON CREATE SET kp.name = $name,
-                          kp.description = $desc,
-                          kp.difficulty = coalesce($diff, 3),
-                          kp.subject_id = $subj_id,
-                          kp.creator_id = $creator_id,
-                          kp.code = $code,
-                          kp.slug = $slug
-            ON MATCH SET kp.name = $name,
-                         kp.description = $desc,
-                         kp.difficulty = coalesce($diff, kp.difficulty),
-                         kp.code = coalesce($code, kp.code),
-                         kp.slug = coalesce($slug, kp.slug)
-            RETURN kp
-            """,
-            id=id,
-            name=name,
-            desc=description,
-            diff=difficulty,
-            subj_id=subject_id,
-            creator_id=creator_id,
-            code=code,
-            slug=slug,
-        )
-        record = result.single()
-        return record["kp"] if record else None
+    params = _create_params(id, name, description, difficulty, subject_id, creator_id, code, slug)
+    return _first(await write_query(CREATE_KNOWLEDGE_POINT, **params))
+
+
 # 查询：按学科ID
-def get_knowledge_points_by_subject(subject_id: int):
-    with get_session() as session:
-        result = session.run(
-            "MATCH (kp:KnowledgePoint {subject_id: $subj_id}) RETURN kp ORDER BY coalesce(kp.name,'')",
-            subj_id=subject_id,
-        )
-        return [record["kp"] for record in result]
+async def get_knowledge_points_by_subject(subject_id: int):
+    return [record["kp"] for record in await read_query(GET_KNOWLEDGE_POINTS_BY_SUBJECT, subj_id=subject_id)]
 
 
 # 查询：单个节点
-def get_knowledge_point(knowledge_point_id: int):
-    with get_session() as session:
-        result = session.run("MATCH (kp:KnowledgePoint {id: $id}) RETURN kp", id=knowledge_point_id)
-        record = result.single()
-        return record["kp"] if record else None
+async def get_knowledge_point(knowledge_point_id: int):
+    return _first(await read_query(GET_KNOWLEDGE_POINT, id=knowledge_point_id))
+
+
+# 更新：按字段设置属性，返回更新后的节点（不存在时为 None）
+async def update_knowledge_point(knowledge_point_id: int, update_data: Dict[str, Any]):
+    if not update_data:
+        return await get_knowledge_point(knowledge_point_id)
+    set_clause = ", ".join(f"kp.{key} = $props.{key}" for key in update_data)
+    records = await write_query(
+        f"MATCH (kp:KnowledgePoint {{id: $id}}) SET {set_clause} RETURN kp",
+        id=knowledge_point_id,
+        props=update_data,
+    )
+    return _first(records)
+
+
+# 删除：连同节点上的关系一起删除
+async def delete_knowledge_point(knowledge_point_id: int) -> None:
+    await write_query(DELETE_KNOWLEDGE_POINT, id=knowledge_point_id)
+
 
 # 模糊搜索（按名称/描述）
-def search_knowledge_points(subject_id: int, q: str):
-    with get_session() as session:
-        # 使用 toLower 简单模糊匹配（生产可用 ES）
-        result = session.run(
-            """
-            MATCH (kp:KnowledgePoint {subject_id: $subj_id})
-            WHERE toLower(kp.name) CONTAINS toLower($q)
-               OR toLower(coalesce(kp.description,'')) CONTAINS toLower($q)
-            RETURN kp
-            ORDER BY coalesce(kp.name,'')
-            LIMIT 100
-            """,
-            subj_id=subject_id, q=q,
-        )
-        return [record["kp"] for record in result]
-    
+async def search_knowledge_points(subject_id: int, q: str):
+    return [record["kp"] for record in await read_query(SEARCH_KNOWLEDGE_POINTS, subj_id=subject_id, q=q)]
+
+
+# 图谱：学科内知识点之间的全部关系（学科图谱快照的数据源）
+async def get_subject_relations(subject_id: int) -> List[Tuple[int, int, str, Optional[float]]]:
+    records = await read_query(
+        "MATCH (a:KnowledgePoint {subject_id: $subj_id})-[r]->(b:KnowledgePoint {subject_id: $subj_id}) "
+        "RETURN a.id AS source, b.id AS target, type(r) AS rel_type, r.strength AS strength",
+        subj_id=subject_id,
+    )
+    return [(record["source"], record["target"], record["rel_type"], record["strength"]) for record in records]
+
+
 ALLOWED_REL_TYPES = {
     "RELATES_TO",
     "CONTAINS",
@@ -109,35 +208,311 @@ def _validate_rel_type(rel_type: str) -> str:
         raise ValueError(f"Unsupported relationship type: {rel_type}")
     return rt
 
-def would_create_cycle(source_id: int, target_id: int, rel_type: str) -> bool:
-    """检测添加某类型关系是否会在同类型边上形成环（例如 CONTAINS、PREREQUISITE 等）。"""
-    rt = _validate_rel_type(rel_type)
-    with get_session() as session:
-        # 检测从目标到源是否已存在路径（同类型边），若存在则加边会形成环
-        query = f"""
-        MATCH (a:KnowledgePoint {{id: $target}}), (b:KnowledgePoint {{id: $source}})
-        MATCH p = (a)-[:{rt}*]->(b)
-        RETURN count(p) > 0 AS has_path
-        """
-        rec = session.run(query, source=source_id, target=target_id).single()
-        return bool(rec and rec.get("has_path"))
-
-def create_knowledge_point_relation(id1: int, id2: int, strength: float = 1.0):
+
+def _cycle_query(rt: str) -> str:
+    # 检测从目标到源是否已存在路径（同类型边），若存在则加边会形成环；
+    # shortestPath 按广度优先查找，不枚举全部路径（源与目标相同的自环由调用方先行判断）
+    return f"""
+    MATCH (a:KnowledgePoint {{id: $target}}), (b:KnowledgePoint {{id: $source}})
+    OPTIONAL MATCH p = shortestPath((a)-[:{rt}*]->(b))
+    RETURN p IS NOT NULL AS has_path
+    """
+
+
+def _relation_query(rt: str) -> str:
+    return f"""
+    MATCH (kp1:KnowledgePoint {{id: $id1}}), (kp2:KnowledgePoint {{id: $id2}})
+    MERGE (kp1)-[r:{rt}]->(kp2)
+    ON CREATE SET r.strength = $strength
+    ON MATCH SET r.strength = coalesce(r.strength, $strength)
+    RETURN r
+    """
+
+
+def _has_path(records: list) -> bool:
+    return bool(records and records[0].get("has_path"))
+
+
+async def create_knowledge_point_relation(id1: int, id2: int, strength: float = 1.0):
     """保持兼容：默认RELATES_TO类型。"""
-    return create_typed_relation(id1, id2, rel_type="RELATES_TO", strength=strength)
+    return await create_typed_relation(id1, id2, rel_type="RELATES_TO", strength=strength)
+
+
+async def _create_relation_tx(tx, rt: str, id1: int, id2: int, strength: float):
+    # 防环检查与写入在同一事务内完成（仅对层次/依赖类关系更常见，全部类型统一防御）
+    if id1 == id2 or _has_path(await _collect(tx, _cycle_query(rt), {"source": id1, "target": id2})):
+        raise ValueError("Creating this relationship would introduce a cycle")
+    await _collect(tx, _relation_query(rt), {"id1": id1, "id2": id2, "strength": strength})
+
+
+async def create_typed_relation(id1: int, id2: int, rel_type: str, strength: float = 1.0):
+    """创建带类型的关系（写入事务内做防环检查）"""
+    rt = _validate_rel_type(rel_type)
+    async with get_async_session() as session:
+        await session.execute_write(_create_relation_tx, rt, id1, id2, strength)
+
+
+async def delete_typed_relation(id1: int, id2: int, rel_type: str) -> bool:
+    """删除带类型的关系，返回是否存在并已删除"""
+    rt = _validate_rel_type(rel_type)
+    records = await write_query(
+        f"MATCH (:KnowledgePoint {{id: $id1}})-[r:{rt}]->(:KnowledgePoint {{id: $id2}}) "
+        "DELETE r RETURN count(r) AS deleted",
+        id1=id1,
+        id2=id2,
+    )
+    return bool(records and records[0]["deleted"])
+
+
+# ================== 批量写入 ==================
+# 逐条写入时每个节点/关系都要一次会话与往返，关系还要各做一次变长路径防环查询；
+# 批量版本按 NEO4J_WRITE_BATCH_SIZE 分块发送 UNWIND 语句，防环在内存中对整批一次完成。
+
+BULK_CREATE_KNOWLEDGE_POINTS = """
+UNWIND $rows AS row
+MERGE (kp:KnowledgePoint {id: row.id})
+ON CREATE SET kp.name = row.name,
+              kp.description = row.desc,
+              kp.difficulty = coalesce(row.diff, 3),
+              kp.subject_id = row.subj_id,
+              kp.creator_id = row.creator_id,
+              kp.code = row.code,
+              kp.slug = row.slug
+ON MATCH SET kp.name = row.name,
+             kp.description = row.desc,
+             kp.difficulty = coalesce(row.diff, kp.difficulty),
+             kp.code = coalesce(row.code, kp.code),
+             kp.slug = coalesce(row.slug, kp.slug)
+RETURN count(kp) AS written
+"""
+
+
+def _chunks(rows: Sequence[Any], size: Optional[int] = None) -> Iterable[Sequence[Any]]:
+    size = max(1, size or settings.NEO4J_WRITE_BATCH_SIZE)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _bulk_point_rows(points: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        _create_params(
+            point["id"],
+            point["name"],
+            point.get("description"),
+            point.get("difficulty"),
+            point["subject_id"],
+            point.get("creator_id"),
+            point.get("code"),
+            point.get("slug"),
+        )
+        for point in points
+    ]
+
+
+def _reachable_edges_query(rt: str) -> str:
+    # 从本批关系的终点出发、沿同类型边可达的全部边；新边 (u, v) 成环当且仅当 v 可达 u，
+    # 这样的路径只会经过这些边与本批新边。WITH DISTINCT 让规划器按节点剪枝展开，不枚举路径。
+    return f"""
+    MATCH (s:KnowledgePoint) WHERE s.id IN $ids
+    MATCH (s)-[:{rt}*0..]->(x:KnowledgePoint)
+    WITH DISTINCT x
+    MATCH (x)-[:{rt}]->(y:KnowledgePoint)
+    RETURN x.id AS source, y.id AS target
+    """
+
+
+def _bulk_relation_query(rt: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MATCH (kp1:KnowledgePoint {{id: row.id1}}), (kp2:KnowledgePoint {{id: row.id2}})
+    MERGE (kp1)-[r:{rt}]->(kp2)
+    ON CREATE SET r.strength = row.strength
+    ON MATCH SET r.strength = coalesce(r.strength, row.strength)
+    RETURN count(r) AS written
+    """
+
+
+def plan_acyclic_edges(
+    existing: Iterable[Tuple[int, int]], new_edges: Sequence[Tuple[int, int]]
+) -> Tuple[List[int], List[int]]:
+    """
+    按顺序决定哪些新边可以加入而不形成环
+
+    Args:
+        existing: 已存在的同类型边 (source, target)
+        new_edges: 待加入的边，按优先级排列
+
+    Returns:
+        (可加入的下标, 会形成环的下标)；自环视为成环
+    """
+    adjacency: Dict[int, Set[int]] = {}
+    for source, target in existing:
+        adjacency.setdefault(source, set()).add(target)
+
+    def reaches(start: int, goal: int) -> bool:
+        stack, seen = [start], {start}
+        while stack:
+            node = stack.pop()
+            if node == goal:
+                return True
+            for nxt in adjacency.get(node, ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return False
+
+    accepted: List[int] = []
+    rejected: List[int] = []
+    for index, (source, target) in enumerate(new_edges):
+        if reaches(target, source):
+            rejected.append(index)
+            continue
+        accepted.append(index)
+        adjacency.setdefault(source, set()).add(target)
+    return accepted, rejected
+
+
+def _group_relations(relations: Sequence[Dict[str, Any]]):
+    """按关系类型分组（类型不能作为参数传入 MERGE），同时记录各条在输入中的位置"""
+    groups: Dict[str, List[Tuple[int, int, float]]] = {}
+    positions: Dict[str, List[int]] = {}
+    for position, rel in enumerate(relations):
+        rt = _validate_rel_type(rel.get("rel_type") or "RELATES_TO")
+        groups.setdefault(rt, []).append((rel["source_id"], rel["target_id"], rel.get("strength", 1.0)))
+        positions.setdefault(rt, []).append(position)
+    return groups, positions
+
+
+def _plan_relation_rows(existing_records: list, edges: List[Tuple[int, int, float]]):
+    existing = [(record["source"], record["target"]) for record in existing_records]
+    accepted, rejected = plan_acyclic_edges(existing, [(source, target) for source, target, _ in edges])
+    rows = [{"id1": edges[i][0], "id2": edges[i][1], "strength": edges[i][2]} for i in accepted]
+    return rows, rejected
+
+
+async def _bulk_relations_tx(tx, rt: str, edges: List[Tuple[int, int, float]], chunk_size: Optional[int]):
+    # 读取已有边、防环与写入在同一事务内完成，写入按块分多条语句发送
+    ids = sorted({target for _, target, _ in edges})
+    rows, rejected = _plan_relation_rows(await _collect(tx, _reachable_edges_query(rt), {"ids": ids}), edges)
+    for chunk in _chunks(rows, chunk_size):
+        await _collect(tx, _bulk_relation_query(rt), {"rows": list(chunk)})
+    return rejected
+
+
+async def create_knowledge_points_bulk(points: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None) -> int:
+    """
+    批量创建/更新知识点节点
+
+    Args:
+        points: 含 id、name、subject_id，可选 description、difficulty、creator_id、code、slug
+
+    Returns:
+        写入的节点数
+    """
+    written = 0
+    async with get_async_session() as session:
+        for chunk in _chunks(_bulk_point_rows(points), chunk_size):
+            records = await session.execute_write(_collect, BULK_CREATE_KNOWLEDGE_POINTS, {"rows": list(chunk)})
+            written += records[0]["written"] if records else 0
+    return written
+
+
+async def create_typed_relations_bulk(
+    relations: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    批量创建带类型的关系，跳过会形成环的关系
 
+    Args:
+        relations: 含 source_id、target_id，可选 rel_type（默认 RELATES_TO）、strength（默认 1.0）；
+            同一类型内按输入顺序决定取舍，先出现的关系优先加入
 
-def create_typed_relation(id1: int, id2: int, rel_type: str, strength: float = 1.0):
+    Returns:
+        因会形成环而未写入的关系
+
+    Raises:
+        ValueError: 存在不支持的关系类型（此时不写入任何关系）
+    """
+    groups, positions = _group_relations(relations)
+    skipped: List[int] = []
+    async with get_async_session() as session:
+        for rt, edges in groups.items():
+            rejected = await session.execute_write(_bulk_relations_tx, rt, edges, chunk_size)
+            skipped.extend(positions[rt][i] for i in rejected)
+    return [relations[position] for position in sorted(skipped)]
+
+
+# ================== 同步封装（Celery 任务与脚本） ==================
+
+def create_knowledge_point_sync(
+    id: int,
+    name: str,
+    description: str | None,
+    difficulty: int | None,
+    subject_id: int,
+    creator_id: int,
+    code: str | None = None,
+    slug: str | None = None,
+):
+    params = _create_params(id, name, description, difficulty, subject_id, creator_id, code, slug)
+    return _first(write_query_sync(CREATE_KNOWLEDGE_POINT, **params))
+
+
+def get_knowledge_points_by_subject_sync(subject_id: int):
+    return [record["kp"] for record in read_query_sync(GET_KNOWLEDGE_POINTS_BY_SUBJECT, subj_id=subject_id)]
+
+
+def get_knowledge_point_sync(knowledge_point_id: int):
+    return _first(read_query_sync(GET_KNOWLEDGE_POINT, id=knowledge_point_id))
+
+
+def search_knowledge_points_sync(subject_id: int, q: str):
+    return [record["kp"] for record in read_query_sync(SEARCH_KNOWLEDGE_POINTS, subj_id=subject_id, q=q)]
+
+
+def would_create_cycle_sync(source_id: int, target_id: int, rel_type: str) -> bool:
+    rt = _validate_rel_type(rel_type)
+    if source_id == target_id:
+        return True
+    return _has_path(read_query_sync(_cycle_query(rt), source=source_id, target=target_id))
+
+
+def _create_relation_tx_sync(tx, rt: str, id1: int, id2: int, strength: float):
+    if id1 == id2 or _has_path(_collect_sync(tx, _cycle_query(rt), {"source": id1, "target": id2})):
+        raise ValueError("Creating this relationship would introduce a cycle")
+    _collect_sync(tx, _relation_query(rt), {"id1": id1, "id2": id2, "strength": strength})
+
+
+def create_typed_relation_sync(id1: int, id2: int, rel_type: str, strength: float = 1.0):
     rt = _validate_rel_type(rel_type)
     with get_session() as session:
-        # 防环（仅对层次/依赖类关系更常见，全部类型统一防御）
-        if would_create_cycle(id1, id2, rt):
-            raise ValueError("Creating this relationship would introduce a cycle")
-        query = f"""
-        MATCH (kp1:KnowledgePoint {{id: $id1}}), (kp2:KnowledgePoint {{id: $id2}})
-        MERGE (kp1)-[r:{rt}]->(kp2)
-        ON CREATE SET r.strength = $strength
-        ON MATCH SET r.strength = coalesce(r.strength, $strength)
-        RETURN r
-        """
-        session.run(query, id1=id1, id2=id2, strength=strength)
+        session.execute_write(_create_relation_tx_sync, rt, id1, id2, strength)
+
+
+def _bulk_relations_tx_sync(tx, rt: str, edges: List[Tuple[int, int, float]], chunk_size: Optional[int]):
+    ids = sorted({target for _, target, _ in edges})
+    rows, rejected = _plan_relation_rows(_collect_sync(tx, _reachable_edges_query(rt), {"ids": ids}), edges)
+    for chunk in _chunks(rows, chunk_size):
+        _collect_sync(tx, _bulk_relation_query(rt), {"rows": list(chunk)})
+    return rejected
+
+
+def create_knowledge_points_bulk_sync(points: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None) -> int:
+    written = 0
+    with get_session() as session:
+        for chunk in _chunks(_bulk_point_rows(points), chunk_size):
+            records = session.execute_write(_collect_sync, BULK_CREATE_KNOWLEDGE_POINTS, {"rows": list(chunk)})
+            written += records[0]["written"] if records else 0
+    return written
+
+
+def create_typed_relations_bulk_sync(
+    relations: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    groups, positions = _group_relations(relations)
+    skipped: List[int] = []
+    with get_session() as session:
+        for rt, edges in groups.items():
+            rejected = session.execute_write(_bulk_relations_tx_sync, rt, edges, chunk_size)
+            skipped.extend(positions[rt][i] for i in rejected)
+    return [relations[position] for position in sorted(skipped)]
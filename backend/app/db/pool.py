@@ -0,0 +1,171 @@
+# 数据库连接池
+"""
+按负载划分的连接池与取连接等待时间指标
+
+- api：处理交互请求的连接池
+- background：批量导入、知识点提取等后台任务与 Celery 任务的连接池
+
+两类负载使用独立的连接池，批量导入占满自己的连接池后只会在该池内排队，
+不会挤占交互请求的连接。每个连接池记录取连接（checkout）的等待时间，
+通过 render_prometheus 以 Prometheus 文本格式输出。
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# 等待时间直方图的桶上界（秒）
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """单个连接池的取连接等待时间统计（线程安全）"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.buckets: List[int] = [0] * len(WAIT_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+        self.pool: Optional[Any] = None
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            idx = bisect.bisect_left(WAIT_BUCKETS, seconds)
+            if idx < len(self.buckets):
+                self.buckets[idx] += 1
+
+    def timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = {
+                "checkouts": self.count,
+                "wait_seconds_total": round(self.total_seconds, 6),
+                "wait_seconds_max": round(self.max_seconds, 6),
+                "wait_seconds_avg": round(self.total_seconds / self.count, 6) if self.count else 0.0,
+                "timeouts": self.timeouts,
+                "buckets": list(self.buckets),
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(), idle=pool.checkedin())
+        return data
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    with _metrics_lock:
+        metrics = _metrics.get(name)
+        if metrics is None:
+            metrics = _metrics[name] = PoolMetrics(name)
+        return metrics
+
+
+class _TimedCheckoutMixin:
+    """
+    记录取连接耗时：包括连接池已满时排队等待的时间与新建连接的时间
+
+    统计按 pool_logging_name 归类；engine.dispose() 重建连接池后继续累计。
+    """
+
+    def _do_get(self):
+        metrics = get_pool_metrics(self._orig_logging_name or "default")
+        metrics.pool = self
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.timeout()
+            raise
+        finally:
+            metrics.observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """asyncpg 引擎使用的连接池"""
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """同步引擎（Celery 任务）使用的连接池"""
+
+
+def engine_pool_kwargs(settings: Any, workload: str = "api", is_async: bool = True) -> Dict[str, Any]:
+    """
+    根据 Settings 生成 create_engine / create_async_engine 的连接池参数
+
+    Args:
+        settings: 应用配置
+        workload: api | background
+        is_async: 是否用于异步引擎
+    """
+    if settings.DB_USE_NULLPOOL:
+        # 外部已有连接池（如 PgBouncer）时不在进程内保留连接
+        return {"poolclass": NullPool, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if workload == "background":
+        size, overflow = settings.DB_BACKGROUND_POOL_SIZE, settings.DB_BACKGROUND_MAX_OVERFLOW
+    elif workload == "api":
+        size, overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    else:
+        raise ValueError(f"Unknown database workload: {workload}")
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": size,
+        "max_overflow": overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": True,  # 优先复用最近归还的连接，空闲连接可被 recycle 回收
+        "pool_logging_name": workload,
+    }
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """各连接池的状态与等待时间统计"""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return {m.name: m.snapshot() for m in metrics}
+
+
+def render_prometheus() -> str:
+    """以 Prometheus 文本格式输出连接池指标"""
+    lines = [
+        "# HELP db_pool_checkout_wait_seconds Time spent waiting to check out a database connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    stats = pool_stats()
+    for name, data in stats.items():
+        cumulative = 0
+        for bound, count in zip(WAIT_BUCKETS, data["buckets"]):
+            cumulative += count
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="+Inf"}} {data["checkouts"]}')
+        lines.append(f'db_pool_checkout_wait_seconds_sum{{pool="{name}"}} {data["wait_seconds_total"]}')
+        lines.append(f'db_pool_checkout_wait_seconds_count{{pool="{name}"}} {data["checkouts"]}')
+    gauges = (
+        ("db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.", "timeouts"),
+        ("db_pool_size", "gauge", "Configured pool size.", "size"),
+        ("db_pool_checked_out", "gauge", "Connections currently checked out.", "checked_out"),
+        ("db_pool_overflow", "gauge", "Overflow connections currently open.", "overflow"),
+        ("db_pool_idle", "gauge", "Idle connections in the pool.", "idle"),
+    )
+    for metric, kind, help_text, key in gauges:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, data in stats.items():
+            if key in data:
+                lines.append(f'{metric}{{pool="{name}"}} {data[key]}')
+    return "\n".join(lines) + "\n"
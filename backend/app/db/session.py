@@ -6,18 +6,24 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
 )
-from sqlalchemy.pool import NullPool
 from app.core.config import Settings
+from app.db.pool import engine_pool_kwargs
 
 # 从配置中获取数据库 URL
 settings = Settings()
 
-# 创建异步数据库引擎
+# 创建异步数据库引擎（交互请求）
 engine = create_async_engine(
     str(settings.DATABASE_URL),
     echo=settings.DB_ECHO,
-    poolclass=NullPool,
-    pool_pre_ping=True,
+    **engine_pool_kwargs(settings, "api"),
+)
+
+# 后台任务使用独立的连接池，批量导入等长任务不会占用请求的连接
+background_engine = create_async_engine(
+    str(settings.DATABASE_URL),
+    echo=settings.DB_ECHO,
+    **engine_pool_kwargs(settings, "background"),
 )
 
 # 创建异步会话工厂
@@ -27,6 +33,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+BackgroundSessionLocal = async_sessionmaker(
+    background_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 # FastAPI 依赖函数
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
@@ -34,5 +46,3 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
-
-
@@ -0,0 +1,170 @@
+# 向量索引管理
+"""
+pgvector HNSW 索引的创建、重建与查询参数设置
+
+命令行用法（在 backend 目录下）：
+    python -m app.db.vector_index status
+    python -m app.db.vector_index build --table question_vectors --m 16 --ef-construction 64
+    python -m app.db.vector_index build --all --rebuild --maintenance-work-mem 2GB
+
+重建使用 CREATE INDEX CONCURRENTLY 先建新索引再替换旧索引，期间不阻塞读写。
+"""
+import argparse
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 表名 -> (向量列, 索引名)
+VECTOR_INDEXES: Dict[str, Dict[str, str]] = {
+    "question_vectors": {"column": "embedding", "index": "ix_question_vectors_embedding_hnsw"},
+    "document_chunks": {"column": "embedding", "index": "ix_document_chunks_embedding_hnsw"},
+}
+
+_MEMORY_RE = re.compile(r"^\d+\s*(kB|MB|GB)$")
+
+
+def hnsw_index_sql(
+    table: str,
+    index_name: str,
+    column: str = "embedding",
+    m: int = 16,
+    ef_construction: int = 64,
+    concurrently: bool = True,
+) -> str:
+    """生成 HNSW 余弦索引的建索引语句（标识符来自 VECTOR_INDEXES，参数强制为整数）"""
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} "
+        f"ON {table} USING hnsw ({column} vector_cosine_ops) "
+        f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+
+
+async def set_ef_search(db: AsyncSession, ef_search: Optional[int] = None) -> None:
+    """
+    设置当前事务的 hnsw.ef_search
+
+    SET LOCAL 只在当前事务内生效，不会泄漏到连接池中的其他请求。
+    """
+    ef = int(ef_search or settings.VECTOR_EF_SEARCH)
+    await db.execute(text(f"SET LOCAL hnsw.ef_search = {ef}"))
+
+
+async def index_status(conn: AsyncConnection) -> List[Dict[str, Any]]:
+    """各向量索引的定义、大小与有效性"""
+    result = await conn.execute(
+        text(
+            """
+            SELECT c.relname AS index_name,
+                   t.relname AS table_name,
+                   pg_get_indexdef(i.indexrelid) AS definition,
+                   pg_size_pretty(pg_relation_size(i.indexrelid)) AS size,
+                   i.indisvalid AS valid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            WHERE t.relname = ANY(:tables)
+              AND pg_get_indexdef(i.indexrelid) ILIKE '%USING hnsw%'
+            ORDER BY t.relname, c.relname
+            """
+        ),
+        {"tables": list(VECTOR_INDEXES)},
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def build_vector_index(
+    engine: AsyncEngine,
+    table: str,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    rebuild: bool = False,
+    maintenance_work_mem: Optional[str] = None,
+) -> str:
+    """
+    创建（或重建）某张表的 HNSW 索引
+
+    重建时先以临时名称并发创建新索引，成功后删除旧索引并改名，
+    新索引建好之前查询仍可使用旧索引。
+    """
+    if table not in VECTOR_INDEXES:
+        raise ValueError(f"不支持的向量表: {table}")
+    if maintenance_work_mem and not _MEMORY_RE.match(maintenance_work_mem):
+        raise ValueError(f"maintenance_work_mem 格式错误: {maintenance_work_mem}")
+    spec = VECTOR_INDEXES[table]
+    m = m or settings.VECTOR_INDEX_M
+    ef_construction = ef_construction or settings.VECTOR_INDEX_EF_CONSTRUCTION
+    index_name = spec["index"]
+    target_name = f"{index_name}_new" if rebuild else index_name
+
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        if maintenance_work_mem:
+            await conn.execute(text(f"SET maintenance_work_mem = '{maintenance_work_mem}'"))
+        if rebuild:
+            # 清理上次中断留下的无效索引
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {target_name}"))
+        logger.info("构建 HNSW 索引 %s (m=%s, ef_construction=%s)", target_name, m, ef_construction)
+        await conn.execute(text(hnsw_index_sql(table, target_name, spec["column"], m, ef_construction)))
+        if rebuild:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            await conn.execute(text(f"ALTER INDEX {target_name} RENAME TO {index_name}"))
+        await conn.execute(text(f"ANALYZE {table}"))
+    return index_name
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="pgvector HNSW 索引管理")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="查看向量索引状态")
+    build = sub.add_parser("build", help="创建或重建 HNSW 索引")
+    target = build.add_mutually_exclusive_group(required=True)
+    target.add_argument("--table", choices=sorted(VECTOR_INDEXES), help="向量表名")
+    target.add_argument("--all", action="store_true", help="处理所有向量表")
+    build.add_argument("--m", type=int, default=None, help=f"HNSW m，默认 {settings.VECTOR_INDEX_M}")
+    build.add_argument(
+        "--ef-construction",
+        type=int,
+        default=None,
+        help=f"HNSW ef_construction，默认 {settings.VECTOR_INDEX_EF_CONSTRUCTION}",
+    )
+    build.add_argument("--rebuild", action="store_true", help="以新参数重建已存在的索引")
+    build.add_argument("--maintenance-work-mem", default=None, help="建索引时的 maintenance_work_mem，如 1GB")
+    return parser
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from app.db.session import engine
+
+    try:
+        if args.command == "build":
+            tables = sorted(VECTOR_INDEXES) if args.all else [args.table]
+            for table in tables:
+                await build_vector_index(
+                    engine,
+                    table,
+                    m=args.m,
+                    ef_construction=args.ef_construction,
+                    rebuild=args.rebuild,
+                    maintenance_work_mem=args.maintenance_work_mem,
+                )
+        async with engine.connect() as conn:
+            for row in await index_status(conn):
+                print(f"{row['table_name']}.{row['index_name']} [{row['size']}, valid={row['valid']}]")
+                print(f"    {row['definition']}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    asyncio.run(_main(build_arg_parser().parse_args()))
@@ -3,9 +3,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import verify_token
+from app.core.principals import load_current_user
 from app.db.session import get_db
 from app.models.user import User
-from sqlalchemy import select
 
 # OAuth2PasswordBearer 会从请求的 "Authorization" 头中提取 Bearer Token
 # tokenUrl 指向用户登录以获取令牌的端点
@@ -29,9 +29,7 @@ async def get_current_user(
     if not user_id:
         raise credentials_exception
         
-    query = select(User).filter(User.id == int(user_id))
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    user = await load_current_user(db, int(user_id))
     
     if not user or not user.is_active:
         raise credentials_exception
@@ -7,16 +7,19 @@ from datetime import datetime
 from fastapi import FastAPI, Request, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings, setup_app_logging
 from app.core.security import setup_security_middleware # <-- 确认这个导入是正确的
 from app.db.init_db import init_db, close_db
+from app.db.pool import render_prometheus
+from app.core.cache import cache, render_prometheus as render_cache_prometheus
 from app.utils.exception_handlers import setup_exception_handlers # 导入异常处理器
 # 临时路由，直到我们创建实际的 API 路由
 from app.api.v1 import api_v1_router
 from fastapi_mcp import FastApiMCP
 # 导入所有模型确保它们被注册
 import app.models
-from app.db.neo4j_utils import driver, close_driver
+from app.db.neo4j_utils import async_driver, close_async_driver, close_driver
 # 配置日志 (在加载配置后立即设置)
 setup_app_logging(config=settings)
 logger = logging.getLogger(__name__)
@@ -35,17 +38,23 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error during startup: {str(e)}")
         raise    
 
-    # 检查 Neo4j 连接（如果使用异步驱动）
+    # 检查 Neo4j 连接
     try:
-        # 如果driver是异步的，使用await
-        # await driver.verify_connectivity()
-        driver.verify_connectivity()  # 假设同步
+        await async_driver.verify_connectivity()
         logger.info("Neo4j connected")
     except Exception as e:
         logger.error(f"Neo4j connection failed: {e}")
         # 可以选择不raise，让应用继续运行
 
+    # 进程内缓存：按配置限制条目数，后台线程定期清理过期条目；订阅其他 worker 的失效广播
+    cache.l1.configure(max_entries=settings.CACHE_MAX_ENTRIES, sweep_interval=settings.CACHE_SWEEP_INTERVAL)
+    cache.l1.start_sweeper()
+    await cache.start()
+
     yield  # 应用运行    
+    await cache.stop()
+    cache.l1.stop_sweeper()
+    await close_async_driver()
     close_driver()
     # 关闭时执行
     logger.info("Shutting down application...")
@@ -112,6 +121,14 @@ def create_application() -> FastAPI:
     async def health_check():
         """健康检查接口"""
         return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+
+    if settings.PROMETHEUS_ENABLED:
+        @application.get(settings.PROMETHEUS_METRICS_PATH, include_in_schema=False)
+        async def metrics():
+            """Prometheus 指标（数据库连接池状态与取连接等待时间、缓存命中情况）"""
+            return PlainTextResponse(
+                render_prometheus() + render_cache_prometheus(), media_type="text/plain; version=0.0.4"
+            )
     
     # 创建并挂载 MCP 服务器
     mcp_server = FastApiMCP(application)
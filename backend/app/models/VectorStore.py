@@ -1,5 +1,6 @@
 # 向量存储模型,使用pgvector存储向量数据
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Computed, Integer, String, ForeignKey, Text, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from app.models.subject import Subject
@@ -25,9 +26,26 @@ class QuestionVector(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # 用户ID
     tags = Column(String(500), nullable=True)  # 标签，JSON字符串格式
     created_at = Column(String(50), nullable=True)  # 创建时间戳
+    search_tokens = Column(Text, nullable=True)  # 标题与内容的 jieba 分词结果（空格分隔）
+    search_vector = Column(
+        TSVECTOR, Computed("to_tsvector('simple', coalesce(search_tokens, ''))", persisted=True)
+    )  # 全文检索向量，GIN 索引
     # 关系
     subject = relationship("Subject", backref="question_vectors")
     user = relationship("User", backref="question_vectors")
+    __table_args__ = (
+        # HNSW 余弦索引，参数可通过 python -m app.db.vector_index 重建调整
+        Index(
+            "ix_question_vectors_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # 向量搜索的先过滤策略按用户 / 学科取候选行
+        Index("ix_question_vectors_user_subject", "user_id", "subject_id"),
+        Index("ix_question_vectors_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 class QuestionVectorCreate(BaseModel):
     """
@@ -58,6 +76,34 @@ class QuestionVectorResponse(BaseModel):
     user_id: int
     tags: Optional[str] = None
     created_at: Optional[str] = None
+    similarity: Optional[float] = None  # 余弦相似度（仅搜索结果）
+
+class HybridSearchHit(BaseModel):
+    """
+    混合搜索结果
+    """
+    id: int
+    content: str
+    title: Optional[str] = None
+    question_type: Optional[str] = None
+    difficulty: Optional[int] = None
+    source: Optional[str] = None
+    subject_id: Optional[int] = None
+    user_id: int
+    tags: Optional[str] = None
+    created_at: Optional[str] = None
+    score: float  # RRF 融合得分
+    similarity: Optional[float] = None  # 余弦相似度（语义召回命中时）
+    lexical_score: Optional[float] = None  # 关键词相关度（关键词召回命中时）
+    semantic_rank: Optional[int] = None
+    lexical_rank: Optional[int] = None
+
+class HybridSearchResponse(BaseModel):
+    """
+    混合搜索分页响应
+    """
+    items: List[HybridSearchHit]
+    next_cursor: Optional[str] = None  # 下一页游标，None 表示没有更多结果
 
 class DocumentChunk(Base):
     """
@@ -74,6 +120,15 @@ class DocumentChunk(Base):
     chunk_index = Column(Integer, nullable=False)  # 切片索引，用于排序
     # 关系
     book = relationship("Book", back_populates="chunks")
+    __table_args__ = (
+        Index(
+            "ix_document_chunks_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
 
 class DocumentChunkCreate(BaseModel):
     """
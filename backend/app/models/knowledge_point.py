@@ -14,7 +14,7 @@ from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from sqlalchemy import (
     Column, String, Integer, Float, Text, Boolean, DateTime,
     ForeignKey, Enum as SQLEnum, JSON, Table, UniqueConstraint,
-    Index, CheckConstraint
+    Index, CheckConstraint, text
 )
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
@@ -313,6 +313,9 @@ class KnowledgePoint(Base):
         Index('idx_kp_subject_id', 'subject_id'),
         Index('idx_kp_status', 'status'),
         Index('idx_kp_grade_level', 'grade_level'),
+        # 子树按物化路径前缀做范围扫描，需按字节序（"C"）比较
+        Index('idx_kp_path', text('path COLLATE "C"')),
+        Index('idx_kp_parent_id', 'parent_id'),
         UniqueConstraint('subject_id', 'name', name='uq_kp_subject_name'),
         CheckConstraint('difficulty >= 1 AND difficulty <= 5', name='check_difficulty_range'),
     )
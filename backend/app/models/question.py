@@ -1,7 +1,8 @@
 #问题模型，题库，存储学生学科练习题，问题标题，类型，学科，内容，难度，标签等信息
 from typing import List, Optional, TYPE_CHECKING
 from enum import Enum
-from sqlalchemy import Column, String, Integer, JSON, Enum as SQLAlchemyEnum, Text, ForeignKey, DateTime, Table
+from sqlalchemy import Column, String, Integer, JSON, Enum as SQLAlchemyEnum, Text, ForeignKey, DateTime, Table, Computed, Index, event, inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 import datetime
@@ -84,6 +85,14 @@ class Question(Base):
     status: Mapped[QuestionStatus] = mapped_column(SQLAlchemyEnum(QuestionStatus, name="question_status_enum"), default=QuestionStatus.DRAFT, comment="题目状态")
     author_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), comment="创建者ID")
     author = relationship("User", back_populates="questions")    
+    # --- 全文检索（jieba 分词，见 app.services.text_search） ---
+    search_tokens: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True, comment="标题与题干的分词结果（空格分隔）")
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(search_tokens, ''))", persisted=True),
+        deferred=True,
+        comment="全文检索向量",
+    )
     # 关系：问题所属的作业
     assignments: Mapped[List["Assignment"]] = relationship(
         "Assignment",
@@ -107,9 +116,28 @@ class Question(Base):
     comments = relationship("QuestionComment", back_populates="question", cascade="all, delete-orphan")
     # 关系：问题的标签
     tag_objects = relationship("Tag", secondary=question_tags, back_populates="questions", lazy="selectin")  # 添加 lazy="selectin" 以预加载标签
+    __table_args__ = (
+        Index("ix_questions_search_vector", "search_vector", postgresql_using="gin"),
+        # 题目列表按 (created_at, id) 做游标分页
+        Index("ix_questions_created_at_id", "created_at", "id"),
+    )
     def __repr__(self) -> str:
         return f"<Question(id={self.id}, title='{self.title}')>"
 
+
+@event.listens_for(Question, "before_insert")
+@event.listens_for(Question, "before_update")
+def _refresh_search_tokens(mapper, connection, target: Question) -> None:
+    """标题或题干变化时重新分词"""
+    state = inspect(target)
+    if state.persistent and not (
+        state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes()
+    ):
+        return
+    from app.services.text_search import index_tokens
+
+    target.search_tokens = index_tokens(target.title, target.content)
+
 class QuestionComment(Base):
     """问题评论模型"""
     __tablename__ = "question_comments"
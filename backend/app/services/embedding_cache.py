@@ -0,0 +1,274 @@
+# 向量嵌入缓存服务
+# 以 (模型名, 归一化文本哈希) 为键缓存 bge-m3 向量：进程内 LRU + 本地文件持久层，
+# 重复导入同一试卷或重复搜索同一关键词时无需再次请求 Ollama。
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+import uuid
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, cast
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_embedding_text(text: str) -> str:
+    """归一化文本：全角/半角统一（NFKC）并压缩空白"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+class EmbeddingCache:
+    """
+    向量嵌入两级缓存
+
+    - 内存层：OrderedDict 实现的 LRU，向量以 float32 array 保存（1024 维约 4KB）
+    - 持久层：<cache_dir>/<key[:2]>/<key>.f32，原子写入，可被多个进程共享；
+      总大小超过 max_bytes 时按文件 mtime（命中时刷新）淘汰最久未用的条目
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 5000, max_bytes: int = 0) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))  # 0 表示持久层不限大小
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_size: Optional[int] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        normalized = normalize_embedding_text(text)
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key[:2] / f"{key}.f32"
+
+    def _remember(self, key: str, vector: array) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[array]:
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.debug("读取向量缓存失败 %s: %s", path, exc)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        vector = array("f")
+        vector.frombytes(data)
+        return vector
+
+    def _write_disk(self, key: str, vector: array) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        payload = vector.tobytes()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+            tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp_path, "wb") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.debug("写入向量缓存失败 %s: %s", path, exc)
+            return
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_size()
+            else:
+                self._disk_size += len(payload) - old_size
+            over_budget = self._disk_size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _disk_entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob("*/*.f32"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def evict(self) -> int:
+        """按最近使用时间淘汰持久层文件，直到总大小低于预算的 90%"""
+        entries = sorted(self._disk_entries(), key=lambda item: item[0])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_size = total
+            self.evictions += removed
+        return removed
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+        vector = self._read_disk(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, vector)
+        return vector.tolist()
+
+    def put(self, key: str, embedding: Sequence[float]) -> None:
+        vector = array("f", embedding)
+        self._remember(key, vector)
+        self._write_disk(key, vector)
+        with self._lock:
+            self.writes += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir is not None and self.cache_dir.exists():
+            for path in self.cache_dir.glob("*/*.f32"):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+        with self._lock:
+            self._disk_size = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class CachedEmbeddings:
+    """
+    带缓存的嵌入模型包装
+
+    与 langchain Embeddings 接口一致（embed_query / embed_documents），
+    未命中的文本合并为一次 embed_documents 请求。
+    """
+
+    def __init__(self, embeddings, model: str, cache: Optional[EmbeddingCache] = None) -> None:
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.embeddings.embed_documents(texts)
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        results: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+        # 同一批次内重复的文本只请求一次
+        missing: Dict[str, List[int]] = {}
+        for idx, (key, vector) in enumerate(zip(keys, results)):
+            if vector is None:
+                missing.setdefault(key, []).append(idx)
+        if missing:
+            positions = list(missing.values())
+            vectors = self.embeddings.embed_documents([texts[idxs[0]] for idxs in positions])
+            if len(vectors) != len(positions):
+                raise ValueError(f"嵌入模型返回 {len(vectors)} 个向量，期望 {len(positions)} 个")
+            for key, idxs, vector in zip(missing, positions, vectors):
+                self.cache.put(key, vector)
+                for idx in idxs:
+                    results[idx] = vector
+        return cast(List[List[float]], results)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        import asyncio
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        import asyncio
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取进程内共享的向量缓存（未启用时返回 None）"""
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _embedding_cache
+
+
+def get_cached_embeddings(model: str = "bge-m3") -> CachedEmbeddings:
+    """创建带缓存的 Ollama 嵌入模型"""
+    from langchain_ollama import OllamaEmbeddings
+
+    return CachedEmbeddings(
+        OllamaEmbeddings(model=model, base_url=settings.OLLAMA_BASE_URL),
+        model=model,
+        cache=get_embedding_cache(),
+    )
@@ -2,9 +2,12 @@
 
 __version__ = "0.1.0"
 
+from .batch import parse_directory, load_manifest
+from .cache import OCRResultCache, configure_ocr_cache, get_ocr_cache
 from .core import Question, LineBBox
-from .parsers import parse_pdf, parse_docx, parse_image
-from .utils import parse_path, export_results
+from .parsers import parse_pdf, iter_pdf, parse_docx, parse_image
+from .registry import ModelRegistry, model_registry, warm_up_models
+from .utils import QuestionStream, parse_path, iter_questions, aiter_questions, export_results
 
 __all__ = [
     "Question",
@@ -13,5 +16,17 @@ __all__ = [
     "parse_docx",
     "parse_image",
     "parse_path",
+    "parse_directory",
+    "load_manifest",
+    "iter_pdf",
+    "iter_questions",
+    "aiter_questions",
+    "QuestionStream",
     "export_results",
+    "OCRResultCache",
+    "configure_ocr_cache",
+    "get_ocr_cache",
+    "ModelRegistry",
+    "model_registry",
+    "warm_up_models",
 ]
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""Work-queue importer for large directories of exam files.
+
+The parent keeps a queue of pending files and hands one task at a time to each
+idle worker process over its own pipe.
+Each file is timed and parsed in isolation: an exception only fails that file,
+and a worker that dies (segfault in a native OCR library, OOM kill, ...) only
+fails the file it was working on before a replacement worker is started.
+
+Every finished file is appended to a JSONL manifest together with its parsed
+questions, so a crashed or interrupted run can be resumed with ``resume=True``
+and only re-parses files that are new, changed or previously failed.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from dataclasses import asdict
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .core import Question
+from .utils import (
+    IMAGE_SUFFIXES,
+    OCR_BATCH_SIZE,
+    iter_input_files,
+    ocr_images_to_text,
+    parse_document,
+)
+
+FileRecord = Dict[str, Any]
+# A task is a run of files parsed by one worker: a single document, or up to
+# ``ocr_batch_size`` consecutive images that share one batched OCR call.
+Task = List[str]
+
+WORKER_POLL_SECONDS = 1.0
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _build_tasks(files: List[str], ocr_batch_size: int) -> List[Task]:
+    tasks: List[Task] = []
+    images: Task = []
+    for fp in files:
+        if Path(fp).suffix.lower() in IMAGE_SUFFIXES:
+            images.append(fp)
+            if len(images) >= max(1, ocr_batch_size):
+                tasks.append(images)
+                images = []
+            continue
+        if images:
+            tasks.append(images)
+            images = []
+        tasks.append([fp])
+    if images:
+        tasks.append(images)
+    return tasks
+
+
+def _failed_record(path: str, error: str, seconds: float = 0.0) -> FileRecord:
+    return {"path": path, "status": "failed", "seconds": round(seconds, 3), "error": error, "questions": []}
+
+
+def _run_task(
+    paths: Task,
+    img_dir: str,
+    paddle_lang: str,
+    layout_model: Optional[Any],
+    page_workers: int,
+    ocr_batch_size: int,
+) -> List[FileRecord]:
+    """Parse the files of one task, returning one record per file."""
+    ocr_results: List[Optional[Tuple[str, List[Any]]]] = [None] * len(paths)
+    ocr_share = 0.0
+    if all(Path(fp).suffix.lower() in IMAGE_SUFFIXES for fp in paths):
+        started = time.perf_counter()
+        try:
+            ocr_results = list(ocr_images_to_text(paths, paddle_lang=paddle_lang, batch_size=ocr_batch_size))
+        except Exception as exc:
+            logging.warning("Batched OCR failed, falling back to per-image OCR: %s", exc)
+        ocr_share = (time.perf_counter() - started) / len(paths)
+
+    records: List[FileRecord] = []
+    for fp, ocr_result in zip(paths, ocr_results):
+        started = time.perf_counter()
+        try:
+            questions = parse_document(
+                fp,
+                img_dir,
+                paddle_lang=paddle_lang,
+                layout_model=layout_model,
+                page_workers=page_workers,
+                ocr_batch_size=ocr_batch_size,
+                ocr_result=ocr_result,
+            )
+        except Exception as exc:
+            logging.exception("Failed to parse %s", fp)
+            records.append(_failed_record(fp, f"{type(exc).__name__}: {exc}", time.perf_counter() - started + ocr_share))
+            continue
+        records.append({
+            "path": fp,
+            "status": "ok",
+            "seconds": round(time.perf_counter() - started + ocr_share, 3),
+            "error": None,
+            "questions": questions,
+        })
+    return records
+
+
+def _worker_loop(
+    conn: Any,
+    img_dir: str,
+    paddle_lang: str,
+    layout_key: Optional[Tuple[str, float]],
+    ocr_batch_size: int,
+) -> None:
+    """Worker process: parse tasks received on ``conn`` until the ``None`` sentinel.
+
+    Each worker has its own pipe and replies synchronously, so a worker that
+    dies mid-task cannot lose or block the results of the others.
+    """
+    from .parsers.pdf import get_layout_model
+
+    layout_model = get_layout_model(layout_key[0], threshold=layout_key[1]) if layout_key else None
+    while True:
+        paths = conn.recv()
+        if paths is None:
+            return
+        conn.send(_run_task(paths, img_dir, paddle_lang, layout_model, 1, ocr_batch_size))
+
+
+def _run_workers(
+    tasks: List[Task],
+    workers: int,
+    img_dir: str,
+    paddle_lang: str,
+    layout_model: Optional[Any],
+    ocr_batch_size: int,
+    on_records: Callable[[List[FileRecord]], None],
+) -> None:
+    """Dispatch ``tasks`` to ``workers`` processes, one task per idle worker."""
+    from .parsers.pdf import _layout_model_key
+
+    layout_key = _layout_model_key(layout_model) if layout_model is not None else None
+    if layout_model is not None and layout_key is None:
+        logging.warning("Layout model cannot be rebuilt in worker processes, parsing without it")
+
+    ctx = multiprocessing.get_context()
+    todo = deque(tasks)
+    # parent end of the pipe -> (process, task being processed or None)
+    running: Dict[Any, Tuple[Any, Optional[Task]]] = {}
+
+    def _dispatch(conn: Any, proc: Any) -> None:
+        task = todo.popleft() if todo else None
+        running[conn] = (proc, task)
+        conn.send(task)
+
+    def _spawn() -> None:
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(
+            target=_worker_loop,
+            args=(child_conn, img_dir, paddle_lang, layout_key, ocr_batch_size),
+            name="exam-parser-worker",
+        )
+        proc.start()
+        child_conn.close()
+        _dispatch(parent_conn, proc)
+
+    def _busy() -> bool:
+        return any(task is not None for _, task in running.values())
+
+    for _ in range(min(workers, len(tasks))):
+        _spawn()
+    try:
+        while _busy():
+            waitables: List[Any] = list(running)
+            waitables.extend(proc.sentinel for proc, _ in running.values())
+            ready = set(wait(waitables, timeout=WORKER_POLL_SECONDS))
+            for conn, (proc, task) in list(running.items()):
+                if task is None:
+                    continue
+                if conn in ready or conn.poll():
+                    try:
+                        records = conn.recv()
+                    except (EOFError, OSError):
+                        records = None
+                    if records is not None:
+                        on_records(records)
+                        _dispatch(conn, proc)
+                        continue
+                elif proc.sentinel not in ready and proc.is_alive():
+                    continue
+                proc.join(timeout=WORKER_POLL_SECONDS)
+                error = f"worker process exited with code {proc.exitcode}"
+                logging.error("Worker died while parsing %s: %s", task, error)
+                on_records([_failed_record(fp, error) for fp in task])
+                del running[conn]
+                conn.close()
+                if todo:
+                    _spawn()
+        for proc, _ in running.values():
+            proc.join(timeout=WORKER_POLL_SECONDS * 5)
+    finally:
+        for conn, (proc, _) in running.items():
+            if proc.is_alive():
+                proc.terminate()
+            conn.close()
+
+
+def load_manifest(manifest_path: str) -> Dict[str, FileRecord]:
+    """Read a manifest, keeping the latest record per file.
+
+    A truncated last line (the run was killed mid-write) is ignored.
+    """
+    records: Dict[str, FileRecord] = {}
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("Skipping malformed manifest line in %s", manifest_path)
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def parse_directory(
+    input_dir: str,
+    img_dir: str,
+    paddle_lang: str = "ch",
+    layout_model: Optional[Any] = None,
+    workers: int = 1,
+    manifest_path: Optional[str] = None,
+    resume: bool = False,
+    page_workers: int = 1,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> List[Question]:
+    """Parse every supported file under ``input_dir`` with ``workers`` processes.
+
+    Questions are returned in file order regardless of completion order. With
+    ``resume`` the manifest is read first and files whose size and mtime are
+    unchanged since a successful parse are restored instead of re-parsed.
+    Inside worker processes PDFs are parsed with a single page worker; the
+    parallelism is across files.
+    """
+    files = iter_input_files(input_dir)
+    done: Dict[str, FileRecord] = {}
+    if manifest_path and resume:
+        for path, record in load_manifest(manifest_path).items():
+            if record.get("status") != "ok" or not os.path.exists(path):
+                continue
+            if [record.get("size"), record.get("mtime_ns")] != list(_file_signature(path)):
+                continue
+            record["questions"] = [Question(**q) for q in record.get("questions", [])]
+            done[path] = record
+    todo = [fp for fp in files if fp not in done]
+    logging.info(
+        "Directory import: %d files, %d already done, %d to parse with %d worker(s)",
+        len(files), len(done), len(todo), max(1, workers),
+    )
+
+    manifest_fh = None
+    if manifest_path:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+        os.makedirs(manifest_dir, exist_ok=True)
+        manifest_fh = open(manifest_path, "a" if resume else "w", encoding="utf-8")
+
+    results: Dict[str, FileRecord] = dict(done)
+    started = time.perf_counter()
+
+    def _on_records(records: List[FileRecord]) -> None:
+        for record in records:
+            path = record["path"]
+            results[path] = record
+            if record["status"] == "ok":
+                logging.info("Parsed %s: %d questions in %.2fs", path, len(record["questions"]), record["seconds"])
+            else:
+                logging.warning("Failed %s after %.2fs: %s", path, record["seconds"], record["error"])
+            if manifest_fh is None:
+                continue
+            try:
+                size, mtime_ns = _file_signature(path)
+            except OSError:
+                size, mtime_ns = None, None
+            entry = dict(record, size=size, mtime_ns=mtime_ns)
+            entry["questions"] = [asdict(q) for q in record["questions"]]
+            manifest_fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            manifest_fh.flush()
+
+    try:
+        tasks = _build_tasks(todo, ocr_batch_size)
+        if workers > 1 and len(tasks) > 1:
+            _run_workers(tasks, workers, img_dir, paddle_lang, layout_model, ocr_batch_size, _on_records)
+        else:
+            for paths in tasks:
+                _on_records(_run_task(paths, img_dir, paddle_lang, layout_model, page_workers, ocr_batch_size))
+    finally:
+        if manifest_fh is not None:
+            manifest_fh.close()
+
+    failed = [path for path in todo if results.get(path, {}).get("status") != "ok"]
+    slowest = sorted(
+        (results[path] for path in todo if path in results and results[path]["status"] == "ok"),
+        key=lambda r: r["seconds"],
+        reverse=True,
+    )[:5]
+    logging.info(
+        "Directory import finished in %.1fs: %d parsed, %d failed, %d resumed",
+        time.perf_counter() - started, len(todo) - len(failed), len(failed), len(done),
+    )
+    if slowest:
+        logging.info("Slowest files: %s", ", ".join(f"{r['path']} ({r['seconds']:.2f}s)" for r in slowest))
+    for path in failed:
+        logging.warning("Not imported: %s (%s)", path, results.get(path, {}).get("error"))
+
+    questions: List[Question] = []
+    for fp in files:
+        record = results.get(fp)
+        if record and record["status"] == "ok":
+            questions.extend(record["questions"])
+    return questions
@@ -0,0 +1,238 @@
+"""Persistent on-disk cache for OCR and layout-analysis results.
+
+Entries are keyed by a hash of the page content (rendered pixels for PDF pages,
+file bytes for images) plus the parameters that influence recognition: render
+zoom, OCR language and model name.  Values are small JSON documents, so the
+cache survives process restarts and is shared by every worker that points at
+the same directory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .core import LineBBox
+
+CACHE_DIR_ENV = "EXAM_PARSER_CACHE_DIR"
+CACHE_MAX_MB_ENV = "EXAM_PARSER_CACHE_MAX_MB"
+CACHE_DISABLED_ENV = "EXAM_PARSER_CACHE_DISABLED"
+DEFAULT_CACHE_DIR = str(Path.home() / ".cache" / "exam_parser")
+DEFAULT_CACHE_MAX_MB = 512
+
+
+class OCRResultCache:
+    """Size-bounded LRU cache of OCR/layout results stored as JSON files.
+
+    Recency is tracked through file mtimes (refreshed on every hit), so
+    eviction order is shared across processes using the same directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def content_digest(content: Any) -> str:
+        """Hash raw bytes or an array of pixels (shape is part of the digest)."""
+        h = hashlib.sha256()
+        shape = getattr(content, "shape", None)
+        if shape is not None:
+            h.update(repr(tuple(shape)).encode("utf-8"))
+            h.update(str(getattr(content, "dtype", "")).encode("utf-8"))
+            content = content.tobytes()
+        h.update(bytes(content))
+        return h.hexdigest()
+
+    @staticmethod
+    def make_key(kind: str, digest: str, zoom: float = 1.0, lang: str = "", model: str = "") -> str:
+        raw = f"{kind}|{digest}|{float(zoom):.4f}|{lang}|{model}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                value = json.load(fh)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as exc:
+            logging.debug("Failed to read OCR cache entry %s: %s", path, exc)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+            tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp_path, "wb") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, path)
+        except Exception as exc:
+            logging.debug("Failed to write OCR cache entry %s: %s", path, exc)
+            return
+        with self._lock:
+            self.writes += 1
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(payload) - old_size
+            over_budget = self.max_bytes and self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache is below 90% of its budget."""
+        entries = sorted(self._entries(), key=lambda item: item[0])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                continue
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._size if self._size is not None else self._scan_size()
+            self._size = size
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_OCR_CACHE: Optional[OCRResultCache] = None
+_OCR_CACHE_LOCK = threading.Lock()
+
+
+def configure_ocr_cache(
+    cache_dir: Optional[str] = None,
+    max_mb: Optional[int] = None,
+    enabled: bool = True,
+) -> Optional[OCRResultCache]:
+    """(Re)configure the process-wide cache.
+
+    Settings are mirrored into environment variables so that process-pool
+    workers started afterwards pick up the same cache directory.
+    """
+    global _OCR_CACHE
+    with _OCR_CACHE_LOCK:
+        if not enabled:
+            os.environ[CACHE_DISABLED_ENV] = "1"
+            _OCR_CACHE = None
+            return None
+        os.environ.pop(CACHE_DISABLED_ENV, None)
+        if cache_dir:
+            os.environ[CACHE_DIR_ENV] = cache_dir
+        if max_mb is not None:
+            os.environ[CACHE_MAX_MB_ENV] = str(max_mb)
+        _OCR_CACHE = None
+    return get_ocr_cache()
+
+
+def get_ocr_cache() -> Optional[OCRResultCache]:
+    """Return the shared cache, or ``None`` when caching is disabled."""
+    global _OCR_CACHE
+    if os.getenv(CACHE_DISABLED_ENV):
+        return None
+    with _OCR_CACHE_LOCK:
+        if _OCR_CACHE is None:
+            cache_dir = os.getenv(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+            try:
+                max_mb = int(os.getenv(CACHE_MAX_MB_ENV, DEFAULT_CACHE_MAX_MB))
+            except ValueError:
+                max_mb = DEFAULT_CACHE_MAX_MB
+            _OCR_CACHE = OCRResultCache(cache_dir, max_bytes=max_mb * 1024 * 1024)
+        return _OCR_CACHE
+
+
+def entries_to_cache(entries: List[LineBBox]) -> List[List[Any]]:
+    return [[text, list(bbox)] for text, bbox in entries]
+
+
+def entries_from_cache(value: Any) -> List[LineBBox]:
+    entries: List[LineBBox] = []
+    for item in value or []:
+        text, bbox = item
+        x0, y0, x1, y1 = bbox
+        entries.append((str(text), (float(x0), float(y0), float(x1), float(y1))))
+    return entries
+
+
+def layout_blocks_to_cache(blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"bbox": list(block["bbox"]), "type": block.get("type", "text")} for block in blocks]
+
+
+def layout_blocks_from_cache(value: Any) -> List[Dict[str, Any]]:
+    blocks: List[Dict[str, Any]] = []
+    for item in value or []:
+        x0, y0, x1, y1 = item["bbox"]
+        blocks.append({"bbox": (float(x0), float(y0), float(x1), float(y1)), "type": item.get("type", "text")})
+    return blocks
@@ -12,11 +12,15 @@ if __name__ == "__main__" and __package__ is None:
     __package__ = "exam_parser"
 
 try:
-    from .utils import parse_path, export_results
+    from .cache import configure_ocr_cache
+    from .registry import model_registry
+    from .utils import OCR_BATCH_SIZE, parse_path, export_results
     from .parsers.pdf import get_layout_model
 except ImportError:
     # Fallback for direct execution
-    from utils import parse_path, export_results
+    from cache import configure_ocr_cache
+    from registry import model_registry
+    from utils import OCR_BATCH_SIZE, parse_path, export_results
     from parsers.pdf import get_layout_model
 
 
@@ -41,6 +45,33 @@ def build_arg_parser() -> argparse.ArgumentParser:
         default=0.5,
         help="版面检测置信度阈值（0~1），默认为0.5",
     )
+    p.add_argument(
+        "--page-workers",
+        type=int,
+        default=1,
+        help="PDF逐页提取（文本、渲染、OCR、版面）的并行进程数，默认为1（串行）",
+    )
+    p.add_argument(
+        "--ocr-batch-size",
+        type=int,
+        default=None,
+        help="每批送入OCR识别的页面/图像数量，默认为8（可用EXAM_PARSER_OCR_BATCH_SIZE设置）",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="目录模式下并行解析文件的工作进程数，默认为1（串行）",
+    )
+    p.add_argument(
+        "--manifest",
+        default=None,
+        help="目录模式的进度清单（JSONL）路径，默认为<输出文件>.manifest.jsonl（仅在--workers>1或--resume时使用）",
+    )
+    p.add_argument("--resume", action="store_true", help="根据进度清单续跑，跳过已成功解析且未修改的文件")
+    p.add_argument("--cache-dir", default=None, help="OCR/版面结果缓存目录，默认为~/.cache/exam_parser")
+    p.add_argument("--cache-size-mb", type=int, default=None, help="OCR/版面结果缓存容量上限（MB），默认为512")
+    p.add_argument("--no-cache", action="store_true", help="禁用OCR/版面结果缓存")
     return p
 
 
@@ -48,6 +79,7 @@ def main() -> None:
     parser = build_arg_parser()
     args = parser.parse_args()
     logging.basicConfig(level=getattr(logging, args.log.upper(), logging.INFO), format="%(levelname)s: %(message)s")
+    ocr_cache = configure_ocr_cache(args.cache_dir, args.cache_size_mb, enabled=not args.no_cache)
 
     layout_model = None
     if getattr(args, "use_layout", False):
@@ -55,11 +87,20 @@ def main() -> None:
         if layout_model is None:
             logging.warning("Layout analysis not enabled or model failed to load, using original order.")
 
+    manifest_path = args.manifest
+    if manifest_path is None and os.path.isdir(args.input) and (args.workers > 1 or args.resume):
+        manifest_path = f"{args.out}.manifest.jsonl"
+
     questions = parse_path(
         args.input,
         args.img_dir,
         paddle_lang=args.paddle_lang,
         layout_model=layout_model,
+        page_workers=args.page_workers,
+        ocr_batch_size=args.ocr_batch_size or OCR_BATCH_SIZE,
+        workers=args.workers,
+        manifest_path=manifest_path,
+        resume=args.resume,
     )
 
     if not questions:
@@ -67,6 +108,9 @@ def main() -> None:
         sys.exit(1)
     export_results(questions, args.out, args.format, include_number=args.include_number)
     logging.info("Completed, exported %d questions: %s", len(questions), args.out)
+    if ocr_cache is not None:
+        logging.info("OCR cache stats: %s", ocr_cache.stats())
+    logging.debug("Model registry: %s", model_registry.memory_report())
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 """Document parsers for different formats."""
 
-from .pdf import parse_pdf
+from .pdf import parse_pdf, iter_pdf
 from .docx import parse_docx
 from .image import parse_image
 
-__all__ = ["parse_pdf", "parse_docx", "parse_image"]
\ No newline at end of file
+__all__ = ["parse_pdf", "iter_pdf", "parse_docx", "parse_image"]
\ No newline at end of file
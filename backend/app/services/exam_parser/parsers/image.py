@@ -1,80 +1,25 @@
 """Image OCR parsing."""
 
 import logging
-import os
 import re
 import shutil
 import uuid
 from pathlib import Path
-from typing import Any, List, Optional, Set, Tuple
+from typing import List, Optional, Set, Tuple
 try:
     from PIL import Image
 except Exception:
     Image = None
 from ..core import LineBBox, Question
 from ..rules import FIGURE_LABEL_RE, FIGURE_REF_TEXT_RE, extract_figure_tokens, OPTION_FIGURE_RE, OPTION_RE
-from ..utils import ensure_dir, normalize_text, ocr_image_to_text, parse_text_to_questions, extract_paddle_ocr_entries, extract_title_from_text_lines, get_paddle_ocr
-
-
-def ocr_image_to_text(image_path: str, paddle_lang: str = "ch") -> Tuple[str, List[LineBBox]]:
-    def _load_sidecar() -> Optional[Any]:
-        candidates: List[Path] = []
-        base = Path(image_path)
-        candidates.append(base.with_name(f"{base.stem}_res.json"))
-        candidates.append(base.parent / "output" / f"{base.stem}_res.json")
-        candidates.append(Path("output") / f"{base.stem}_res.json")
-        extra_dir = os.getenv("PADDLE_OCR_OUTPUT_DIR")
-        if extra_dir:
-            candidates.append(Path(extra_dir) / f"{base.stem}_res.json")
-        for candidate in candidates:
-            try:
-                if candidate.exists():
-                    with open(candidate, "r", encoding="utf-8") as fh:
-                        import json
-                        return json.load(fh)
-            except Exception as exc:
-                logging.debug("Failed to load PaddleOCR JSON %s: %s", candidate, exc)
-        return None
-
-    entries: List[LineBBox] = []
-    result: Any = None
-    ocr = get_paddle_ocr(paddle_lang)
-    if ocr is not None:
-        try:
-            result = ocr.predict(image_path)
-        except TypeError:
-            try:
-                result = ocr.ocr(image_path)
-            except Exception as exc:
-                logging.warning("PaddleOCR recognition failed: %s", exc)
-                result = None
-        except Exception as exc:
-            logging.warning("PaddleOCR recognition failed: %s", exc)
-            result = None
-    else:
-        logging.warning("PaddleOCR not installed, trying to load exported JSON: %s", image_path)
-
-    if result is not None:
-        entries = extract_paddle_ocr_entries(result)
-        if not entries and ocr is not None and hasattr(ocr, "ocr"):
-            try:
-                legacy = ocr.ocr(image_path)
-                entries = extract_paddle_ocr_entries(legacy)
-            except Exception:
-                pass
-    if not entries:
-        sidecar = _load_sidecar()
-        if sidecar is not None:
-            entries = extract_paddle_ocr_entries(sidecar)
-
-    text = "\n".join(line for line, _ in entries) if entries else ""
-    return text, entries
+from ..utils import ensure_dir, normalize_text, ocr_image_to_text, parse_text_to_questions, extract_title_from_text_lines
 
 
 def parse_image(
     filepath: str,
     img_dir: str,
     paddle_lang: str = "ch",
+    ocr_result: Optional[Tuple[str, List[LineBBox]]] = None,
 ) -> List[Question]:
     ensure_dir(img_dir)
     src_path = Path(filepath)
@@ -87,7 +32,10 @@ def parse_image(
         logging.warning("Failed to copy image, using original path: %s", exc)
         out_path = src_path
 
-    raw_text, entries = ocr_image_to_text(filepath, paddle_lang=paddle_lang)
+    if ocr_result is not None:
+        raw_text, entries = ocr_result
+    else:
+        raw_text, entries = ocr_image_to_text(filepath, paddle_lang=paddle_lang)
 
     # Extract title as source - prioritize first line
     lines = raw_text.splitlines()
@@ -9,8 +9,9 @@ import os
 import re
 import uuid
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Set, cast
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Set, cast
 try:
     import fitz  # PyMuPDF
 except Exception:
@@ -27,7 +28,17 @@ try:
     from paddleocr import PPStructureV3 as PPStructure
 except Exception:
     PPStructure = None
+from ..cache import (
+    OCRResultCache,
+    get_ocr_cache,
+    entries_from_cache,
+    entries_to_cache,
+    layout_blocks_from_cache,
+    layout_blocks_to_cache,
+)
 from ..core import LineBBox, Question
+from ..registry import model_registry
+from ..spatial import SpatialIndex, center_index, expand
 from ..rules import (
     QUESTION_HEAD_RE,
     FIGURE_LABEL_RE,
@@ -37,28 +48,34 @@ from ..rules import (
     OPTION_RE,
 )
 from ..utils import (
+    OCR_BATCH_SIZE,
+    classify_pdf_doc,
     get_paddle_ocr,
+    run_ocr_batch,
     extract_paddle_ocr_entries,
     extract_title_from_text_lines,
     parse_text_to_questions,
+    QuestionStream,
     ensure_dir,
     normalize_text,
 )
 PAGE_RENDER_ZOOM = 2.0
-_LAYOUT_MODEL_CACHE: Dict[Tuple[str, float], Any] = {}
+LAYOUT_MODEL_KIND = "pp_structure_v3"
+
+
+def _load_layout_model() -> Optional[Any]:
+    try:
+        # PP-StructureV3 is the default model in paddleocr
+        return PPStructure(table=False, ocr=False)
+    except Exception as exc:
+        logging.warning("PP-StructureV3 模型加载失败：%s", exc)
+        return None
+
 
 def get_layout_model(model_name: Optional[str] = None, threshold: float = 0.5) -> Optional[Any]:
     if PPStructure is None:
         return None
-    cache_key = ("pp_structure_v3", threshold)
-    if cache_key not in _LAYOUT_MODEL_CACHE:
-        try:
-            # PP-StructureV3 is the default model in paddleocr
-            _LAYOUT_MODEL_CACHE[cache_key] = PPStructure(table=False, ocr=False)
-        except Exception as exc:
-            logging.warning("PP-StructureV3 模型加载失败：%s", exc)
-            return None
-    return _LAYOUT_MODEL_CACHE.get(cache_key)
+    return model_registry.get(LAYOUT_MODEL_KIND, _load_layout_model, threshold=float(threshold))
 
 def order_page_lines(lines: List[LineBBox], layout_blocks: Optional[List[Dict[str, Any]]] = None) -> List[LineBBox]:
     if not lines:
@@ -80,20 +97,11 @@ def order_page_lines(lines: List[LineBBox], layout_blocks: Optional[List[Dict[st
         textual_blocks.append(block)
     textual_blocks.sort(key=lambda blk: (blk["bbox"][1], blk["bbox"][0]))
     margin = 12.0
+    # Ids in the center index follow sorted_lines, so query results are already in reading order.
+    line_centers = center_index(bbox for _, bbox in sorted_lines)
     for block in textual_blocks:
-        bx0, by0, bx1, by1 = block["bbox"]
-        candidate_indices: List[int] = []
-        for idx, (_, bbox) in enumerate(sorted_lines):
-            if idx in used:
-                continue
-            x0, y0, x1, y1 = bbox
-            cx = (x0 + x1) / 2.0
-            cy = (y0 + y1) / 2.0
-            if (bx0 - margin) <= cx <= (bx1 + margin) and (by0 - margin) <= cy <= (by1 + margin):
-                candidate_indices.append(idx)
-        if not candidate_indices:
-            continue
-        candidate_indices.sort(key=lambda i: (sorted_lines[i][1][1], sorted_lines[i][1][0]))
+        bx0, by0, bx1, by1 = expand(block["bbox"], margin)
+        candidate_indices = [idx for idx in line_centers.query(bx0, by0, bx1, by1) if idx not in used]
         for idx in candidate_indices:
             ordered.append(sorted_lines[idx])
             used.add(idx)
@@ -140,14 +148,42 @@ def compute_question_regions(lines: List[LineBBox]) -> Dict[int, Tuple[float, fl
     return regions
 
 
-def assign_image_by_region(cx: float, cy: float, regions: Dict[int, Tuple[float, float, float, float]]) -> Optional[int]:
+REGION_PAD_X = 40.0
+REGION_PAD_Y = 80.0
+REGION_MAX_SCORE = 260.0
+
+
+class RegionIndex:
+    """Question regions of one page kept in a ``SpatialIndex`` for ``assign_image_by_region``."""
+
+    def __init__(self, regions: Dict[int, Tuple[float, float, float, float]]) -> None:
+        self.qnums = list(regions)
+        self.spatial = SpatialIndex(regions.values())
+
+
+def assign_image_by_region(
+    cx: float,
+    cy: float,
+    regions: Dict[int, Tuple[float, float, float, float]],
+    index: Optional[RegionIndex] = None,
+) -> Optional[int]:
     if not regions:
         return None
+    candidates: Iterable[Tuple[int, Tuple[float, float, float, float]]] = regions.items()
+    if index is not None:
+        inside = index.spatial.query(cx - REGION_PAD_X, cy - REGION_PAD_Y, cx + REGION_PAD_X, cy + REGION_PAD_Y)
+        if inside:
+            return index.qnums[inside[0]]
+        # Only regions with score < REGION_MAX_SCORE can win, which bounds dy and dx.
+        reach_x = REGION_MAX_SCORE / 0.3
+        reach_y = REGION_MAX_SCORE / 1.2
+        hits = index.spatial.query(cx - reach_x, cy - reach_y, cx + reach_x, cy + reach_y)
+        candidates = [(index.qnums[i], index.spatial.boxes[i]) for i in hits]
     best_qn: Optional[int] = None
     best_score = float("inf")
-    for qn, (x0, y0, x1, y1) in regions.items():
-        inside_x = (x0 - 40.0) <= cx <= (x1 + 40.0)
-        inside_y = (y0 - 80.0) <= cy <= (y1 + 80.0)
+    for qn, (x0, y0, x1, y1) in candidates:
+        inside_x = (x0 - REGION_PAD_X) <= cx <= (x1 + REGION_PAD_X)
+        inside_y = (y0 - REGION_PAD_Y) <= cy <= (y1 + REGION_PAD_Y)
         if inside_x and inside_y:
             return qn
         dy = 0.0
@@ -164,224 +200,415 @@ def assign_image_by_region(cx: float, cy: float, regions: Dict[int, Tuple[float,
         if score < best_score:
             best_score = score
             best_qn = qn
-    return best_qn if best_score < 260.0 else None
-def _parse_pdf_doc(
+    return best_qn if best_score < REGION_MAX_SCORE else None
+
+
+def _prepare_page(
+    page: Any,
+    page_index: int,
+    layout_model: Optional[Any] = None,
+    paddle_lang: str = "ch",
+    force_ocr: bool = False,
+) -> Dict[str, Any]:
+    """Per-page extraction up to OCR: text spans, render, layout blocks and OCR cache lookup.
+
+    Pages that still need recognition keep their rendered array under ``np_img``
+    so OCR can be run for several pages in one batch (see ``_run_page_ocr``).
+    """
+    raw = page.get_text("rawdict")
+    blocks = raw.get("blocks", []) if isinstance(raw, dict) else []
+    page_lines: List[LineBBox] = []
+    line_entries_raw: List[Dict[str, Any]] = []
+    image_blocks: List[Tuple[str, Tuple[float, float, float, float]]] = []
+    extracted_xrefs: Set[int] = set()
+    xref_to_path: Dict[int, str] = {}
+    for b in blocks:
+        if b.get("type") == 0:
+            for line in b.get("lines", []):
+                spans = line.get("spans", []) if isinstance(line, dict) else []
+                texts = []
+                bbox = None
+                sizes: List[float] = []
+                for span in spans:
+                    chars = span.get("chars", [])
+                    text = "".join(c.get("c", "") for c in chars if isinstance(c, dict))
+                    if text:
+                        texts.append(text)
+                    sbbox = span.get("bbox")
+                    if isinstance(sbbox, (list, tuple)) and len(sbbox) == 4:
+                        x0, y0, x1, y1 = sbbox
+                        bbox = (float(x0), float(y0), float(x1), float(y1))
+                    try:
+                        span_size = float(span.get("size"))
+                        if span_size > 0:
+                            sizes.append(span_size)
+                    except Exception:
+                        continue
+                if texts and bbox is not None:
+                    text_value = "".join(texts)
+                    max_size = max(sizes) if sizes else 0.0
+                    page_lines.append((text_value, bbox))
+                    line_entries_raw.append({
+                        "text": text_value,
+                        "bbox": bbox,
+                        "size": max_size,
+                    })
+        elif b.get("type") == 1:
+            # Image block - just collect bbox, extraction happens later
+            bbox = tuple(b.get("bbox", (0, 0, 0, 0)))  # type: ignore
+            image_blocks.append(("placeholder", bbox))  # placeholder path, will be replaced later
+    page_text_raw = cast(str, page.get_text("text") or "")
+    layout_blocks_scaled: List[Dict[str, Any]] = []
+    np_img = None
+    scale = 1.0
+    need_render_for_layout = layout_model is not None
+    need_render_for_ocr = force_ocr or not page_lines
+    if (need_render_for_layout or need_render_for_ocr) and Image is not None and fitz is not None:
+        try:
+            zoom = PAGE_RENDER_ZOOM
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            img_bytes = pix.tobytes("png")
+            pil_img = Image.open(io.BytesIO(img_bytes))
+            if pil_img.mode != "RGB":
+                pil_img = pil_img.convert("RGB")
+            pil_img.load()
+            if np is not None:
+                np_img = np.array(pil_img)
+            scale = 1.0 / zoom
+            page_width_pixels = pix.width
+        except Exception as exc:
+            logging.debug("页面渲染失败：%s", exc)
+            np_img = None
+            page_width_pixels = 2000
+    else:
+        page_width_pixels = 2000
+    cache = get_ocr_cache() if np_img is not None else None
+    page_digest = OCRResultCache.content_digest(np_img) if cache is not None else ""
+    layout_cache_key: Optional[str] = None
+    layout_cached = False
+    if cache is not None and layout_model is not None:
+        layout_cache_key = OCRResultCache.make_key(
+            "layout", page_digest, zoom=PAGE_RENDER_ZOOM, model=_layout_model_name(layout_model)
+        )
+        cached_layout = cache.get(layout_cache_key)
+        if cached_layout is not None:
+            layout_blocks_scaled = layout_blocks_from_cache(cached_layout)
+            layout_cached = True
+    if layout_model is not None and np_img is not None and not layout_cached:
+        try:
+            # PP-StructureV3 expects PIL Image, not numpy array
+            if Image is not None:
+                pil_img = Image.fromarray(np_img)
+                layout_result = layout_model(pil_img)
+            else:
+                layout_result = []
+
+            for block in layout_result:
+                # PP-StructureV3 returns dict with 'bbox' key
+                bbox = block.get("bbox")
+                if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
+                    x1, y1, x2, y2 = bbox
+                    layout_blocks_scaled.append(
+                        {
+                            "bbox": (
+                                float(x1) * scale,
+                                float(y1) * scale,
+                                float(x2) * scale,
+                                float(y2) * scale,
+                            ),
+                            "type": block.get("type", "text"),
+                        }
+                    )
+            if cache is not None and layout_cache_key is not None:
+                cache.put(layout_cache_key, layout_blocks_to_cache(layout_blocks_scaled))
+        except Exception as exc:
+            logging.debug("版面分析失败：%s", exc)
+            layout_blocks_scaled = []
+    needs_ocr = np_img is not None and (force_ocr or not page_lines)
+    ocr_cache_key: Optional[str] = None
+    ocr_entries: Optional[List[LineBBox]] = None
+    if needs_ocr and cache is not None:
+        ocr_cache_key = OCRResultCache.make_key(
+            "ocr", page_digest, zoom=PAGE_RENDER_ZOOM, lang=paddle_lang, model="paddleocr"
+        )
+        cached_value = cache.get(ocr_cache_key)
+        if cached_value is not None:
+            ocr_entries = entries_from_cache(cached_value)
+    return {
+        "index": page_index,
+        "page_lines": page_lines,
+        "line_entries_raw": line_entries_raw,
+        "images": image_blocks,
+        "page_text_raw": page_text_raw,
+        "extracted_xrefs": extracted_xrefs,
+        "xref_to_path": xref_to_path,
+        "layout_blocks": layout_blocks_scaled,
+        "page_width_pixels": page_width_pixels,
+        "np_img": np_img if needs_ocr and ocr_entries is None else None,
+        "ocr_cache_key": ocr_cache_key,
+        "ocr_entries": ocr_entries,
+    }
+
+
+def _run_page_ocr(prepared_pages: List[Dict[str, Any]], paddle_lang: str = "ch") -> None:
+    """Recognize every prepared page that still holds a rendered array, in one batch."""
+    pending = [p for p in prepared_pages if p.get("np_img") is not None]
+    if not pending:
+        return
+    ocr = get_paddle_ocr(paddle_lang)
+    results: List[Optional[Any]] = [None] * len(pending)
+    if ocr is not None:
+        results = run_ocr_batch(ocr, [p["np_img"] for p in pending], cls=True)
+    cache = get_ocr_cache()
+    for p, result in zip(pending, results):
+        p["np_img"] = None
+        if result is None:
+            continue
+        entries = extract_paddle_ocr_entries(result)
+        p["ocr_entries"] = entries
+        if cache is not None and p.get("ocr_cache_key"):
+            cache.put(p["ocr_cache_key"], entries_to_cache(entries))
+
+
+def _finish_page(prepared: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge OCR lines into a prepared page and order them into the final page record.
+
+    The result only holds plain Python data so it can cross a process boundary.
+    """
+    page_lines: List[LineBBox] = prepared["page_lines"]
+    line_entries_raw: List[Dict[str, Any]] = prepared["line_entries_raw"]
+    layout_blocks_scaled: List[Dict[str, Any]] = prepared["layout_blocks"]
+    page_text_raw: str = prepared["page_text_raw"]
+    page_width_pixels = prepared["page_width_pixels"]
+    for text, bbox in prepared.get("ocr_entries") or []:
+        page_lines.append((text, bbox))
+        line_entries_raw.append({
+            "text": text,
+            "bbox": bbox,
+            "size": 0.0,
+        })
+    ordered_lines = order_page_lines(page_lines, layout_blocks_scaled)
+    ordered_entries: List[Dict[str, Any]] = []
+    used_flags = [False] * len(line_entries_raw)
+    for text, bbox in ordered_lines:
+        matched = False
+        for idx, entry in enumerate(line_entries_raw):
+            if used_flags[idx]:
+                continue
+            if entry["text"] == text and entry["bbox"] == bbox:
+                ordered_entries.append(entry)
+                used_flags[idx] = True
+                matched = True
+                break
+        if not matched:
+            ordered_entries.append({
+                "text": text,
+                "bbox": bbox,
+                "size": 0.0,
+            })
+    if len(ordered_entries) < len(line_entries_raw):
+        for idx, entry in enumerate(line_entries_raw):
+            if not used_flags[idx]:
+                ordered_entries.append(entry)
+                used_flags[idx] = True
+    ordered_text_lines = [entry["text"] for entry in ordered_entries if entry["text"]]
+    page_text_final = "\n".join(ordered_text_lines).strip()
+
+    # Calculate dynamic threshold based on page size
+    dynamic_threshold = int(120 * (page_width_pixels / 2000.0))  # base 120 at 2000px
+    return {
+        "index": prepared["index"],
+        "line_entries": ordered_entries,
+        "lines": ordered_lines,
+        "images": prepared["images"],
+        "text": page_text_final if page_text_final else page_text_raw,
+        "extracted_xrefs": prepared["extracted_xrefs"],
+        "xref_to_path": prepared["xref_to_path"],
+        "layout_blocks": layout_blocks_scaled,
+        "dynamic_threshold": dynamic_threshold,
+    }
+
+
+def _extract_pages(
     doc: Any,
+    page_indices: Iterable[int],
+    layout_model: Optional[Any] = None,
+    paddle_lang: str = "ch",
+    force_ocr: bool = False,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """Per-page extraction stage: text spans, render, layout blocks and OCR.
+
+    Pages are prepared in order; once ``ocr_batch_size`` of them are waiting for
+    recognition they are sent to PaddleOCR together and the window is finished.
+    """
+    batch_size = max(1, ocr_batch_size)
+    per_page: List[Dict[str, Any]] = []
+    window: List[Dict[str, Any]] = []
+    pending = 0
+    for page_index in page_indices:
+        prepared = _prepare_page(
+            doc.load_page(page_index),
+            page_index,
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+        )
+        window.append(prepared)
+        if prepared["np_img"] is not None:
+            pending += 1
+        if pending >= batch_size:
+            _run_page_ocr(window, paddle_lang)
+            per_page.extend(_finish_page(p) for p in window)
+            window = []
+            pending = 0
+    _run_page_ocr(window, paddle_lang)
+    per_page.extend(_finish_page(p) for p in window)
+    return per_page
+
+
+def _layout_model_key(layout_model: Optional[Any]) -> Optional[Tuple[str, float]]:
+    key = model_registry.key_of(layout_model)
+    if key is None or key[0] != LAYOUT_MODEL_KIND:
+        return None
+    return LAYOUT_MODEL_KIND, float(dict(key[1]).get("threshold", 0.5))
+
+
+def _layout_model_name(layout_model: Any) -> str:
+    key = _layout_model_key(layout_model)
+    if key is not None:
+        return f"{key[0]}@{key[1]}"
+    return type(layout_model).__name__
+
+
+def _extract_page_range(
     filepath: str,
-    img_dir: str,
+    page_indices: List[int],
+    layout_key: Optional[Tuple[str, float]] = None,
+    paddle_lang: str = "ch",
+    force_ocr: bool = False,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """Process-pool worker: open the PDF once and extract a contiguous run of pages."""
+    layout_model = get_layout_model(layout_key[0], threshold=layout_key[1]) if layout_key else None
+    with fitz.open(filepath) as doc:
+        return _extract_pages(
+            doc,
+            page_indices,
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+            ocr_batch_size=ocr_batch_size,
+        )
+
+
+def _extract_pages_parallel(
+    filepath: str,
+    page_count: int,
     layout_model: Optional[Any] = None,
     paddle_lang: str = "ch",
     force_ocr: bool = False,
-) -> List[Question]:
-    CAPTION_VPAD = 120.0
-    per_page = []
-    def _combine_bboxes(bboxes: Iterable[Tuple[float, float, float, float]]) -> Optional[Tuple[float, float, float, float]]:
-        iterator = iter(bboxes)
-        try:
-            merged = next(iterator)
-        except StopIteration:
-            return None
-        for bbox in iterator:
-            merged = _merge_bbox(merged, bbox)
-        return merged
+    workers: int = 2,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> Optional[List[Dict[str, Any]]]:
+    """Run ``_extract_pages`` for every page across a process pool.
 
-    def _rect_distance(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
-        ax0, ay0, ax1, ay1 = a
-        bx0, by0, bx1, by1 = b
-        dx = 0.0
-        if ax1 < bx0:
-            dx = bx0 - ax1
-        elif bx1 < ax0:
-            dx = ax0 - bx1
-        dy = 0.0
-        if ay1 < by0:
-            dy = by0 - ay1
-        elif by1 < ay0:
-            dy = ay0 - by1
-        if dx == 0.0 and dy == 0.0:
-            return 0.0
-        return math.hypot(dx, dy)
-
-    def _match_marker(
-        image_bbox: Tuple[float, float, float, float],
-        markers: List[Tuple[int, Tuple[float, float, float, float]]],
-        threshold: float,
-    ) -> Optional[int]:
-        if not markers:
+    Pages are split into contiguous chunks so each worker opens the document and
+    loads its models once per chunk. Results are merged back in page order, so the
+    cross-page passes see exactly what the serial loop would have produced. Returns
+    ``None`` when the pool cannot be used and the caller should fall back to serial.
+    """
+    layout_key: Optional[Tuple[str, float]] = None
+    if layout_model is not None:
+        layout_key = _layout_model_key(layout_model)
+        if layout_key is None:
+            logging.debug("版面模型无法在子进程中重建，改用串行解析：%s", filepath)
             return None
-        best_qn: Optional[int] = None
-        best_dist = float("inf")
-        for qn, marker_bbox in markers:
-            dist = _rect_distance(image_bbox, marker_bbox)
-            if dist < best_dist:
-                best_dist = dist
-                best_qn = qn
-        if best_qn is not None and best_dist <= threshold:
-            return best_qn
+    workers = max(1, min(workers, page_count))
+    chunk_size = max(1, math.ceil(page_count / (workers * 2)))
+    chunks = [list(range(start, min(start + chunk_size, page_count))) for start in range(0, page_count, chunk_size)]
+    per_page: List[Dict[str, Any]] = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _extract_page_range, filepath, chunk, layout_key, paddle_lang, force_ocr, ocr_batch_size
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                per_page.extend(future.result())
+    except Exception as exc:
+        logging.warning("并行页面解析失败，回退串行解析：%s", exc)
         return None
+    per_page.sort(key=lambda item: item["index"])
+    return per_page
 
-    # Global tracking for extracted images across all pages
-    global_extracted_xrefs: Set[int] = set()
-    global_xref_to_path: Dict[int, str] = {}
-    for page_index in range(len(doc)):
-        page = doc.load_page(page_index)
-        raw = page.get_text("rawdict")
-        blocks = raw.get("blocks", []) if isinstance(raw, dict) else []
-        page_lines: List[LineBBox] = []
-        line_entries_raw: List[Dict[str, Any]] = []
-        image_blocks: List[Tuple[str, Tuple[float, float, float, float]]] = []
-        extracted_xrefs: Set[int] = set()
-        xref_to_path: Dict[int, str] = {}
-        for b in blocks:
-            if b.get("type") == 0:
-                for line in b.get("lines", []):
-                    spans = line.get("spans", []) if isinstance(line, dict) else []
-                    texts = []
-                    bbox = None
-                    sizes: List[float] = []
-                    for span in spans:
-                        chars = span.get("chars", [])
-                        text = "".join(c.get("c", "") for c in chars if isinstance(c, dict))
-                        if text:
-                            texts.append(text)
-                        sbbox = span.get("bbox")
-                        if isinstance(sbbox, (list, tuple)) and len(sbbox) == 4:
-                            x0, y0, x1, y1 = sbbox
-                            bbox = (float(x0), float(y0), float(x1), float(y1))
-                        try:
-                            span_size = float(span.get("size"))
-                            if span_size > 0:
-                                sizes.append(span_size)
-                        except Exception:
-                            continue
-                    if texts and bbox is not None:
-                        text_value = "".join(texts)
-                        max_size = max(sizes) if sizes else 0.0
-                        page_lines.append((text_value, bbox))
-                        line_entries_raw.append({
-                            "text": text_value,
-                            "bbox": bbox,
-                            "size": max_size,
-                        })
-            elif b.get("type") == 1:
-                # Image block - just collect bbox, extraction happens later
-                bbox = tuple(b.get("bbox", (0, 0, 0, 0)))  # type: ignore
-                image_blocks.append(("placeholder", bbox))  # placeholder path, will be replaced later
-        page_text_raw = cast(str, page.get_text("text") or "")
-        layout_blocks_scaled: List[Dict[str, Any]] = []
-        np_img = None
-        scale = 1.0
-        need_render_for_layout = layout_model is not None
-        need_render_for_ocr = force_ocr or not page_lines
-        if (need_render_for_layout or need_render_for_ocr) and Image is not None and fitz is not None:
-            try:
-                zoom = PAGE_RENDER_ZOOM
-                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
-                img_bytes = pix.tobytes("png")
-                pil_img = Image.open(io.BytesIO(img_bytes))
-                if pil_img.mode != "RGB":
-                    pil_img = pil_img.convert("RGB")
-                pil_img.load()
-                if np is not None:
-                    np_img = np.array(pil_img)
-                scale = 1.0 / zoom
-                page_width_pixels = pix.width
-            except Exception as exc:
-                logging.debug("页面渲染失败：%s", exc)
-                np_img = None
-                page_width_pixels = 2000
-        else:
-            page_width_pixels = 2000
-        if layout_model is not None and np_img is not None:
-            try:
-                # PP-StructureV3 expects PIL Image, not numpy array
-                if Image is not None:
-                    pil_img = Image.fromarray(np_img)
-                    layout_result = layout_model(pil_img)
-                else:
-                    layout_result = []
-
-                for block in layout_result:
-                    # PP-StructureV3 returns dict with 'bbox' key
-                    bbox = block.get("bbox")
-                    if isinstance(bbox, (list, tuple)) and len(bbox) == 4:
-                        x1, y1, x2, y2 = bbox
-                        layout_blocks_scaled.append(
-                            {
-                                "bbox": (
-                                    float(x1) * scale,
-                                    float(y1) * scale,
-                                    float(x2) * scale,
-                                    float(y2) * scale,
-                                ),
-                                "type": block.get("type", "text"),
-                            }
-                        )
-            except Exception as exc:
-                logging.debug("版面分析失败：%s", exc)
-                layout_blocks_scaled = []
-        if np_img is not None and (force_ocr or not page_lines):
-            ocr = get_paddle_ocr(paddle_lang)
-            if ocr is not None:
-                try:
-                    ocr_result = ocr.predict(np_img, cls=True)
-                    entries = extract_paddle_ocr_entries(ocr_result)
-                    if entries:
-                        for text, bbox in entries:
-                            page_lines.append((text, bbox))
-                            line_entries_raw.append({
-                                "text": text,
-                                "bbox": bbox,
-                                "size": 0.0,
-                            })
-                except Exception as exc:
-                    logging.warning("PaddleOCR 识别失败，回退 PyMuPDF：%s", exc)
-        ordered_lines = order_page_lines(page_lines, layout_blocks_scaled)
-        ordered_entries: List[Dict[str, Any]] = []
-        used_flags = [False] * len(line_entries_raw)
-        for text, bbox in ordered_lines:
-            matched = False
-            for idx, entry in enumerate(line_entries_raw):
-                if used_flags[idx]:
-                    continue
-                if entry["text"] == text and entry["bbox"] == bbox:
-                    ordered_entries.append(entry)
-                    used_flags[idx] = True
-                    matched = True
-                    break
-            if not matched:
-                ordered_entries.append({
-                    "text": text,
-                    "bbox": bbox,
-                    "size": 0.0,
-                })
-        if len(ordered_entries) < len(line_entries_raw):
-            for idx, entry in enumerate(line_entries_raw):
-                if not used_flags[idx]:
-                    ordered_entries.append(entry)
-                    used_flags[idx] = True
-        ordered_text_lines = [entry["text"] for entry in ordered_entries if entry["text"]]
-        page_text_final = "\n".join(ordered_text_lines).strip()
-
-        # Calculate dynamic threshold based on page size
-        dynamic_threshold = int(120 * (page_width_pixels / 2000.0))  # base 120 at 2000px
-        per_page.append(
-            {
-                "index": page_index,
-                "line_entries": ordered_entries,
-                "lines": ordered_lines,
-                "images": image_blocks,
-                "text": page_text_final if page_text_final else page_text_raw,
-                "extracted_xrefs": extracted_xrefs,
-                "xref_to_path": xref_to_path,
-                "layout_blocks": layout_blocks_scaled,
-                "dynamic_threshold": dynamic_threshold,
-            }
-        )
-    header_counter: Counter[str] = Counter()
-    footer_counter: Counter[str] = Counter()
-    HEADER_SAMPLE = 3
-    FOOTER_SAMPLE = 3
+
+HEADER_SAMPLE = 3
+FOOTER_SAMPLE = 3
+MIN_REPEAT = 2
+
+
+def _combine_bboxes(bboxes: Iterable[Tuple[float, float, float, float]]) -> Optional[Tuple[float, float, float, float]]:
+    iterator = iter(bboxes)
+    try:
+        merged = next(iterator)
+    except StopIteration:
+        return None
+    for bbox in iterator:
+        merged = _merge_bbox(merged, bbox)
+    return merged
+
+
+def _rect_distance(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    dx = 0.0
+    if ax1 < bx0:
+        dx = bx0 - ax1
+    elif bx1 < ax0:
+        dx = ax0 - bx1
+    dy = 0.0
+    if ay1 < by0:
+        dy = by0 - ay1
+    elif by1 < ay0:
+        dy = ay0 - by1
+    if dx == 0.0 and dy == 0.0:
+        return 0.0
+    return math.hypot(dx, dy)
+
+
+def _match_marker(
+    image_bbox: Tuple[float, float, float, float],
+    markers: List[Tuple[int, Tuple[float, float, float, float]]],
+    threshold: float,
+    index: Optional[SpatialIndex] = None,
+) -> Optional[int]:
+    """Closest figure marker within ``threshold``; ``index`` must be built over ``markers`` in order."""
+    if not markers:
+        return None
+    candidates: Iterable[Tuple[int, Tuple[float, float, float, float]]] = markers
+    if index is not None:
+        x0, y0, x1, y1 = expand(image_bbox, threshold)
+        candidates = [markers[i] for i in index.query(x0, y0, x1, y1)]
+    best_qn: Optional[int] = None
+    best_dist = float("inf")
+    for qn, marker_bbox in candidates:
+        dist = _rect_distance(image_bbox, marker_bbox)
+        if dist < best_dist:
+            best_dist = dist
+            best_qn = qn
+    if best_qn is not None and best_dist <= threshold:
+        return best_qn
+    return None
+
+
+def _count_header_footer(
+    per_page: Iterable[Dict[str, Any]],
+    header_counter: Counter[str],
+    footer_counter: Counter[str],
+) -> None:
     for p in per_page:
         entries = cast(List[Dict[str, Any]], p.get("line_entries", []))
         if not entries:
@@ -396,59 +623,62 @@ def _parse_pdf_doc(
             norm = normalize_text(entry["text"])
             if norm:
                 footer_counter[norm] += 1
-    MIN_REPEAT = 2
-    header_texts = {text for text, count in header_counter.items() if count >= MIN_REPEAT}
-    footer_texts = {text for text, count in footer_counter.items() if count >= MIN_REPEAT}
-    for p in per_page:
-        entries = cast(List[Dict[str, Any]], p.get("line_entries", []))
-        if not entries:
-            p["lines"] = []
-            p["text"] = ""
-            p["question_regions"] = {}
-            p["figure_markers"] = []
-            p["option_markers"] = []
-            continue
-        clean_entries: List[Dict[str, Any]] = []
-        total = len(entries)
-        for idx, entry in enumerate(entries):
-            text_val = entry.get("text", "")
-            if not text_val.strip():
-                clean_entries.append(entry)
-                continue
-            norm = normalize_text(text_val)
-            if idx < HEADER_SAMPLE and norm in header_texts:
-                continue
-            if (total - idx) <= FOOTER_SAMPLE and norm in footer_texts:
-                continue
+
+
+def _clean_page(p: Dict[str, Any], header_texts: Set[str], footer_texts: Set[str]) -> None:
+    """Drop repeated header/footer lines and compute question regions and figure markers."""
+    entries = cast(List[Dict[str, Any]], p.get("line_entries", []))
+    if not entries:
+        p["lines"] = []
+        p["text"] = ""
+        p["question_regions"] = {}
+        p["figure_markers"] = []
+        p["option_markers"] = []
+        return
+    clean_entries: List[Dict[str, Any]] = []
+    total = len(entries)
+    for idx, entry in enumerate(entries):
+        text_val = entry.get("text", "")
+        if not text_val.strip():
             clean_entries.append(entry)
-        if not clean_entries:
-            clean_entries = entries
-        p["line_entries"] = clean_entries
-        p["lines"] = [(entry["text"], entry["bbox"]) for entry in clean_entries]
-        text_lines = [entry["text"] for entry in clean_entries]
-        p["text"] = "\n".join(text_lines)
-        p["question_regions"] = compute_question_regions(p["lines"])
-        figure_markers: List[Tuple[int, Tuple[float, float, float, float]]] = []
-        option_markers: List[Tuple[str, Tuple[float, float, float, float]]] = []
-        for entry in clean_entries:
-            txt = entry.get("text", "")
-            bbox = cast(Tuple[float, float, float, float], entry.get("bbox", (0.0, 0.0, 0.0, 0.0)))
-            match_fig = FIGURE_LABEL_RE.search(txt)
-            if match_fig:
-                try:
-                    qn = int(match_fig.group(1))
-                    figure_markers.append((qn, bbox))
-                except Exception:
-                    pass
-            match_opt = OPTION_FIGURE_RE.search(txt)
-            if match_opt:
-                option_key = match_opt.group(1)
-                option_markers.append((option_key, bbox))
-        p["figure_markers"] = figure_markers
-        p["option_markers"] = option_markers
+            continue
+        norm = normalize_text(text_val)
+        if idx < HEADER_SAMPLE and norm in header_texts:
+            continue
+        if (total - idx) <= FOOTER_SAMPLE and norm in footer_texts:
+            continue
+        clean_entries.append(entry)
+    if not clean_entries:
+        clean_entries = entries
+    p["line_entries"] = clean_entries
+    p["lines"] = [(entry["text"], entry["bbox"]) for entry in clean_entries]
+    text_lines = [entry["text"] for entry in clean_entries]
+    p["text"] = "\n".join(text_lines)
+    p["question_regions"] = compute_question_regions(p["lines"])
+    figure_markers: List[Tuple[int, Tuple[float, float, float, float]]] = []
+    option_markers: List[Tuple[str, Tuple[float, float, float, float]]] = []
+    for entry in clean_entries:
+        txt = entry.get("text", "")
+        bbox = cast(Tuple[float, float, float, float], entry.get("bbox", (0.0, 0.0, 0.0, 0.0)))
+        match_fig = FIGURE_LABEL_RE.search(txt)
+        if match_fig:
+            try:
+                qn = int(match_fig.group(1))
+                figure_markers.append((qn, bbox))
+            except Exception:
+                pass
+        match_opt = OPTION_FIGURE_RE.search(txt)
+        if match_opt:
+            option_key = match_opt.group(1)
+            option_markers.append((option_key, bbox))
+    p["figure_markers"] = figure_markers
+    p["option_markers"] = option_markers
+
+
+def _detect_source_title(doc: Any, first_page: Optional[Dict[str, Any]], filepath: str) -> str:
     source_title = ""
-    if per_page:
-        first_entries = cast(List[Dict[str, Any]], per_page[0].get("line_entries", []))
+    if first_page is not None:
+        first_entries = cast(List[Dict[str, Any]], first_page.get("line_entries", []))
         if first_entries:
             # 优先检查第一行，如果字体较大，则用作标题
             first_entry = first_entries[0]
@@ -487,25 +717,31 @@ def _parse_pdf_doc(
             source_title = ""
     if not source_title:
         source_title = normalize_text(Path(filepath).stem) or Path(filepath).name
-    active_material = ""
-    section_type_ctx = ""
-    all_lines_concat: List[str] = []
-    for p in per_page:
-        text_lines = p["text"].splitlines()
-        if text_lines:
-            all_lines_concat.extend(text_lines)
-        else:
-            all_lines_concat.extend([t for (t, _) in p["lines"]])
-        all_lines_concat.append("")
-    all_questions, active_material, section_type_ctx = parse_text_to_questions(
-        all_lines_concat,
-        source=source_title,
-        image_attach_queue=[],
-        active_material=active_material,
-        current_section_type=section_type_ctx,
-    )
-    used_qnums: Set[int] = {int(q.题号) for q in all_questions if q.题号 is not None}
-    for q in all_questions:
+    return source_title
+
+
+def _page_text_lines(p: Dict[str, Any]) -> List[str]:
+    """Lines a page contributes to question parsing, followed by a page-break blank line."""
+    text_lines = p["text"].splitlines()
+    if not text_lines:
+        text_lines = [t for (t, _) in p["lines"]]
+    return text_lines + [""]
+
+
+def _page_head_numbers(p: Dict[str, Any]) -> Set[int]:
+    numbers: Set[int] = set()
+    for txt, _ in p["lines"]:
+        head = QUESTION_HEAD_RE.match(txt.strip())
+        if head:
+            try:
+                numbers.add(int(head.group(1)))
+            except Exception:
+                continue
+    return numbers
+
+
+def _infer_question_numbers(questions: Iterable[Question], used_qnums: Set[int]) -> None:
+    for q in questions:
         if q.题号 is not None:
             continue
         head_match = QUESTION_HEAD_RE.match((q.内容 or "").strip())
@@ -526,183 +762,346 @@ def _parse_pdf_doc(
         inferred_qn = candidate
         q.题号 = inferred_qn
         used_qnums.add(inferred_qn)
-    num2q = {q.题号: q for q in all_questions if q.题号 is not None}
-    figure_tokens_by_qnum: dict[int, Set[str]] = {}
-    for qn, q in num2q.items():
-        q_tokens = extract_figure_tokens(q.内容)
-        if q.材料:
-            q_tokens.update(extract_figure_tokens(q.材料))
-        figure_tokens_by_qnum[qn] = q_tokens
-    option_images: dict[str, List[str]] = {}
-    for p in per_page:
-        page_lines: List[LineBBox] = cast(List[LineBBox], p["lines"])
-        page_text_lines = p["text"].splitlines() if p["text"].strip() else [t for (t, _) in page_lines]
-        figure_markers: List[Tuple[int, Tuple[float, float, float, float]]] = cast(
-            List[Tuple[int, Tuple[float, float, float, float]]],
-            p.get("figure_markers", []),
-        )
-        question_regions: Dict[int, Tuple[float, float, float, float]] = cast(
-            Dict[int, Tuple[float, float, float, float]],
-            p.get("question_regions", {}),
-        )
-        dynamic_threshold = cast(int, p.get("dynamic_threshold", 160))
-        page_qnums: List[int] = []
-        for ln in page_text_lines:
-            m = QUESTION_HEAD_RE.match(ln)
-            if m:
-                try:
-                    page_qnums.append(int(m.group(1)))
-                except Exception:
-                    pass
-        anchor_by_qnum: dict[int, float] = {}
-        for txt, bbox in page_lines:
-            head = QUESTION_HEAD_RE.match(txt.strip())
-            if not head:
-                continue
+
+
+def _assign_page_images(doc: Any, p: Dict[str, Any], num2q: Dict[int, Question], img_dir: str) -> None:
+    """Extract the page's embedded images and attach each one to the closest question."""
+    page_lines: List[LineBBox] = cast(List[LineBBox], p["lines"])
+    page_text_lines = p["text"].splitlines() if p["text"].strip() else [t for (t, _) in page_lines]
+    figure_markers: List[Tuple[int, Tuple[float, float, float, float]]] = cast(
+        List[Tuple[int, Tuple[float, float, float, float]]],
+        p.get("figure_markers", []),
+    )
+    question_regions: Dict[int, Tuple[float, float, float, float]] = cast(
+        Dict[int, Tuple[float, float, float, float]],
+        p.get("question_regions", {}),
+    )
+    dynamic_threshold = cast(int, p.get("dynamic_threshold", 160))
+    page_qnums: List[int] = []
+    for ln in page_text_lines:
+        m = QUESTION_HEAD_RE.match(ln)
+        if m:
             try:
-                qn = int(head.group(1))
+                page_qnums.append(int(m.group(1)))
             except Exception:
-                continue
-            if qn not in num2q:
-                continue
-            y0, y1 = bbox[1], bbox[3]
-            anchor_by_qnum[qn] = (float(y0) + float(y1)) / 2.0
-        sorted_anchors = sorted(anchor_by_qnum.items(), key=lambda kv: kv[1])
+                pass
+    anchor_by_qnum: dict[int, float] = {}
+    for txt, bbox in page_lines:
+        head = QUESTION_HEAD_RE.match(txt.strip())
+        if not head:
+            continue
+        try:
+            qn = int(head.group(1))
+        except Exception:
+            continue
+        if qn not in num2q:
+            continue
+        y0, y1 = bbox[1], bbox[3]
+        anchor_by_qnum[qn] = (float(y0) + float(y1)) / 2.0
+    sorted_anchors = sorted(anchor_by_qnum.items(), key=lambda kv: kv[1])
+    marker_index = SpatialIndex(bbox for _, bbox in figure_markers) if figure_markers else None
+    region_index = RegionIndex(question_regions) if question_regions else None
 
-        # Extract and assign remaining images that weren't processed above
-        page_obj = None
+    # Extract and assign remaining images that weren't processed above
+    page_obj = None
+    try:
+        page_obj = doc.load_page(p["index"])
+        imgs = page_obj.get_images(full=True)
+    except Exception:
+        imgs = []
+    extracted_xrefs: Set[int] = p.get("extracted_xrefs", set())
+    xref_to_path: Dict[int, str] = p.get("xref_to_path", {})
+
+    for img_info in imgs:
+        try:
+            xref = int(img_info[0])
+        except Exception:
+            continue
+        if xref in extracted_xrefs:
+            continue
+        bbox_list: List[Tuple[float, float, float, float]] = []
         try:
-            page_obj = doc.load_page(p["index"])
-            imgs = page_obj.get_images(full=True)
+            if page_obj is not None and hasattr(page_obj, "get_image_rects"):
+                rects = page_obj.get_image_rects(xref)
+                for r in rects or []:
+                    try:
+                        bbox_list.append((float(r.x0), float(r.y0), float(r.x1), float(r.y1)))
+                    except Exception:
+                        continue
         except Exception:
-            imgs = []
-        extracted_xrefs: Set[int] = p.get("extracted_xrefs", set())
-        xref_to_path: Dict[int, str] = p.get("xref_to_path", {})
+            bbox_list = []
 
-        for img_info in imgs:
+        if xref not in extracted_xrefs:
             try:
-                xref = int(img_info[0])
+                img = doc.extract_image(xref)
+                ext = img.get("ext", "png")
+                name = f"pdf_{p['index']+1}_{xref}_{uuid.uuid4().hex[:8]}.{ext}"
+                out_path = os.path.join(img_dir, name)
+                with open(out_path, "wb") as f:
+                    f.write(img["image"])
+                extracted_xrefs.add(xref)
+                xref_to_path[xref] = out_path
             except Exception:
                 continue
-            if xref in extracted_xrefs:
-                continue
-            bbox_list: List[Tuple[float, float, float, float]] = []
-            try:
-                if page_obj is not None and hasattr(page_obj, "get_image_rects"):
-                    rects = page_obj.get_image_rects(xref)
-                    for r in rects or []:
-                        try:
-                            bbox_list.append((float(r.x0), float(r.y0), float(r.x1), float(r.y1)))
-                        except Exception:
-                            continue
-            except Exception:
-                bbox_list = []
 
-            if xref not in extracted_xrefs:
-                try:
-                    img = doc.extract_image(xref)
-                    ext = img.get("ext", "png")
-                    name = f"pdf_{p['index']+1}_{xref}_{uuid.uuid4().hex[:8]}.{ext}"
-                    out_path = os.path.join(img_dir, name)
-                    with open(out_path, "wb") as f:
-                        f.write(img["image"])
-                    extracted_xrefs.add(xref)
-                    xref_to_path[xref] = out_path
-                except Exception:
-                    continue
+        path = xref_to_path.get(xref)
+        if not path:
+            continue
 
-            path = xref_to_path.get(xref)
-            if not path:
-                continue
+        merged_bbox = _combine_bboxes(bbox_list)
+        cx = cy = None
+        if merged_bbox is not None:
+            cx = (merged_bbox[0] + merged_bbox[2]) / 2.0
+            cy = (merged_bbox[1] + merged_bbox[3]) / 2.0
 
-            merged_bbox = _combine_bboxes(bbox_list)
-            cx = cy = None
-            if merged_bbox is not None:
-                cx = (merged_bbox[0] + merged_bbox[2]) / 2.0
-                cy = (merged_bbox[1] + merged_bbox[3]) / 2.0
-
-            assigned = False
-            if merged_bbox is not None:
-                marker_threshold = max(float(dynamic_threshold) * 1.2, 200.0)
-                marker_qn = _match_marker(merged_bbox, figure_markers, marker_threshold)
-                if marker_qn is not None and marker_qn in num2q:
-                    num2q[marker_qn].配图.append(path)
-                    assigned = True
-
-            if not assigned and merged_bbox is not None and cx is not None and cy is not None:
-                region_qn = assign_image_by_region(cx, cy, question_regions)
-                if region_qn is not None and region_qn in num2q:
-                    num2q[region_qn].配图.append(path)
-                    assigned = True
-
-            if not assigned and sorted_anchors and cy is not None:
-                target_qn: Optional[int] = None
-                if cy <= sorted_anchors[0][1]:
-                    target_qn = sorted_anchors[0][0]
-                elif cy >= sorted_anchors[-1][1]:
-                    target_qn = sorted_anchors[-1][0]
-                else:
-                    for (left_qn, left_y), (right_qn, right_y) in zip(sorted_anchors, sorted_anchors[1:]):
-                        if left_y <= cy <= right_y:
-                            # pick closer anchor
-                            if abs(cy - left_y) <= abs(cy - right_y):
-                                target_qn = left_qn
-                            else:
-                                target_qn = right_qn
-                            break
-                if target_qn is not None and target_qn in num2q:
-                    num2q[target_qn].配图.append(path)
-                    assigned = True
-
-            if not assigned:
-                logging.warning(
-                    "未能匹配题号的图片：page=%s xref=%s path=%s",
-                    p["index"] + 1,
-                    xref,
-                    path,
-                )
-    # Embed option images into content and convert to HTML
-    for q in all_questions:
-        if not q.内容:
-            continue
-        # Replace option images
-        lines = q.内容.split('\n')
-        new_lines = []
-        for line in lines:
-            match = OPTION_RE.match(line)
-            if match:
-                option = match.group(1)
-                option_text = match.group(2).strip()  # Get text after option letter
-                if option in option_images and option_images[option]:
-                    img_tag = f"<img src='{option_images[option][0]}'>"
-                    new_lines.append(f"{option}.{img_tag} {option_text}")
-                else:
-                    new_lines.append(line)
+        assigned = False
+        if merged_bbox is not None:
+            marker_threshold = max(float(dynamic_threshold) * 1.2, 200.0)
+            marker_qn = _match_marker(merged_bbox, figure_markers, marker_threshold, marker_index)
+            if marker_qn is not None and marker_qn in num2q:
+                num2q[marker_qn].配图.append(path)
+                assigned = True
+
+        if not assigned and merged_bbox is not None and cx is not None and cy is not None:
+            region_qn = assign_image_by_region(cx, cy, question_regions, region_index)
+            if region_qn is not None and region_qn in num2q:
+                num2q[region_qn].配图.append(path)
+                assigned = True
+
+        if not assigned and sorted_anchors and cy is not None:
+            target_qn: Optional[int] = None
+            if cy <= sorted_anchors[0][1]:
+                target_qn = sorted_anchors[0][0]
+            elif cy >= sorted_anchors[-1][1]:
+                target_qn = sorted_anchors[-1][0]
+            else:
+                for (left_qn, left_y), (right_qn, right_y) in zip(sorted_anchors, sorted_anchors[1:]):
+                    if left_y <= cy <= right_y:
+                        # pick closer anchor
+                        if abs(cy - left_y) <= abs(cy - right_y):
+                            target_qn = left_qn
+                        else:
+                            target_qn = right_qn
+                        break
+            if target_qn is not None and target_qn in num2q:
+                num2q[target_qn].配图.append(path)
+                assigned = True
+
+        if not assigned:
+            logging.warning(
+                "未能匹配题号的图片：page=%s xref=%s path=%s",
+                p["index"] + 1,
+                xref,
+                path,
+            )
+
+
+def _render_question_html(q: Question, option_images: Dict[str, List[str]]) -> None:
+    """Embed option images into content and convert to HTML."""
+    if not q.内容:
+        return
+    # Replace option images
+    lines = q.内容.split('\n')
+    new_lines = []
+    for line in lines:
+        match = OPTION_RE.match(line)
+        if match:
+            option = match.group(1)
+            option_text = match.group(2).strip()  # Get text after option letter
+            if option in option_images and option_images[option]:
+                img_tag = f"<img src='{option_images[option][0]}'>"
+                new_lines.append(f"{option}.{img_tag} {option_text}")
             else:
                 new_lines.append(line)
-        html_content = '<br>'.join(new_lines)
-        # Add attached images
-        for img in q.配图:
-            html_content += f"<br><img src='{img}'>"
-        q.内容 = html_content
-        # Also convert material to HTML if needed
+        else:
+            new_lines.append(line)
+    html_content = '<br>'.join(new_lines)
+    # Add attached images
+    for img in q.配图:
+        html_content += f"<br><img src='{img}'>"
+    q.内容 = html_content
+    # Also convert material to HTML if needed
+    if q.材料:
+        q.材料 = q.材料.replace('\n', '<br>')
+
+
+def _parse_pdf_doc(
+    doc: Any,
+    filepath: str,
+    img_dir: str,
+    layout_model: Optional[Any] = None,
+    paddle_lang: str = "ch",
+    force_ocr: bool = False,
+    page_workers: int = 1,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> List[Question]:
+    CAPTION_VPAD = 120.0
+    per_page: Optional[List[Dict[str, Any]]] = None
+    if page_workers > 1 and len(doc) > 1:
+        per_page = _extract_pages_parallel(
+            filepath,
+            len(doc),
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+            workers=page_workers,
+            ocr_batch_size=ocr_batch_size,
+        )
+    if not per_page:
+        per_page = _extract_pages(
+            doc,
+            range(len(doc)),
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+            ocr_batch_size=ocr_batch_size,
+        )
+    header_counter: Counter[str] = Counter()
+    footer_counter: Counter[str] = Counter()
+    _count_header_footer(per_page, header_counter, footer_counter)
+    header_texts = {text for text, count in header_counter.items() if count >= MIN_REPEAT}
+    footer_texts = {text for text, count in footer_counter.items() if count >= MIN_REPEAT}
+    for p in per_page:
+        _clean_page(p, header_texts, footer_texts)
+    source_title = _detect_source_title(doc, per_page[0] if per_page else None, filepath)
+    all_lines_concat: List[str] = []
+    for p in per_page:
+        all_lines_concat.extend(_page_text_lines(p))
+    all_questions, _, _ = parse_text_to_questions(
+        all_lines_concat,
+        source=source_title,
+        image_attach_queue=[],
+    )
+    used_qnums: Set[int] = {int(q.题号) for q in all_questions if q.题号 is not None}
+    _infer_question_numbers(all_questions, used_qnums)
+    num2q = {q.题号: q for q in all_questions if q.题号 is not None}
+    figure_tokens_by_qnum: dict[int, Set[str]] = {}
+    for qn, q in num2q.items():
+        q_tokens = extract_figure_tokens(q.内容)
         if q.材料:
-            q.材料 = q.材料.replace('\n', '<br>')
+            q_tokens.update(extract_figure_tokens(q.材料))
+        figure_tokens_by_qnum[qn] = q_tokens
+    option_images: dict[str, List[str]] = {}
+    for p in per_page:
+        _assign_page_images(doc, p, num2q, img_dir)
+    for q in all_questions:
+        _render_question_html(q, option_images)
     # heuristic to attach unmatched images to the last question
     return all_questions
 
-def parse_pdf(
+
+def _iter_pdf_doc(
+    doc: Any,
     filepath: str,
     img_dir: str,
     layout_model: Optional[Any] = None,
     paddle_lang: str = "ch",
     force_ocr: bool = False,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> Iterator[Question]:
+    """Streaming counterpart of ``_parse_pdf_doc``.
+
+    Pages are extracted in windows of ``ocr_batch_size`` and their lines fed to a
+    ``QuestionStream``; a question is yielded once it is finalized and every page
+    it could take images from (pages holding its head, and continuation pages it
+    was still open on) has been processed.
+    Header/footer detection only sees the pages read so far and figure markers
+    pointing at already-yielded questions fall back to region matching, so the
+    output can differ slightly from ``parse_pdf`` on such documents.
+    """
+    # Header/footer detection needs at least MIN_REPEAT pages in the first window.
+    batch_size = max(MIN_REPEAT, ocr_batch_size)
+    header_counter: Counter[str] = Counter()
+    footer_counter: Counter[str] = Counter()
+    stream: Optional[QuestionStream] = None
+    used_qnums: Set[int] = set()
+    held: List[Question] = []
+    pending_pages: List[Tuple[Dict[str, Any], Set[int]]] = []
+    option_images: Dict[str, List[str]] = {}
+
+    def _drain(final: bool) -> Iterator[Question]:
+        nonlocal pending_pages
+        open_qn = stream.open_question_number if stream is not None and not final else None
+        num2q = {q.题号: q for q in held if q.题号 is not None}
+        remaining: List[Tuple[Dict[str, Any], Set[int]]] = []
+        for p, qnums in pending_pages:
+            if open_qn is not None and open_qn in qnums:
+                remaining.append((p, qnums))
+                continue
+            _assign_page_images(doc, p, num2q, img_dir)
+        pending_pages = remaining
+        blocked: Set[int] = set()
+        for _, qnums in pending_pages:
+            blocked.update(qnums)
+        while held and (final or held[0].题号 not in blocked):
+            q = held.pop(0)
+            _render_question_html(q, option_images)
+            yield q
+
+    page_count = len(doc)
+    for start in range(0, page_count, batch_size):
+        pages = _extract_pages(
+            doc,
+            range(start, min(start + batch_size, page_count)),
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+            ocr_batch_size=batch_size,
+        )
+        _count_header_footer(pages, header_counter, footer_counter)
+        header_texts = {text for text, count in header_counter.items() if count >= MIN_REPEAT}
+        footer_texts = {text for text, count in footer_counter.items() if count >= MIN_REPEAT}
+        for p in pages:
+            _clean_page(p, header_texts, footer_texts)
+        if stream is None:
+            source_title = _detect_source_title(doc, pages[0] if pages else None, filepath)
+            stream = QuestionStream(source_title, image_attach_queue=[])
+        finished: List[Question] = []
+        for p in pages:
+            # a question still open when the page starts continues on it and may own its images
+            qnums = _page_head_numbers(p)
+            carried = stream.open_question_number
+            if carried is not None:
+                qnums.add(carried)
+            for line in _page_text_lines(p):
+                finished.extend(stream.feed(line))
+            pending_pages.append((p, qnums))
+        used_qnums.update(int(q.题号) for q in finished if q.题号 is not None)
+        _infer_question_numbers(finished, used_qnums)
+        held.extend(finished)
+        yield from _drain(final=False)
+    if stream is None:
+        return
+    finished = stream.close()
+    used_qnums.update(int(q.题号) for q in finished if q.题号 is not None)
+    _infer_question_numbers(finished, used_qnums)
+    held.extend(finished)
+    yield from _drain(final=True)
+
+
+def _detect_scanned(doc: Any, filepath: str) -> bool:
+    doc_type = classify_pdf_doc(doc)
+    logging.info("Detected document type %s: %s", doc_type, filepath)
+    return doc_type == "pdf_scanned"
+
+
+def parse_pdf(
+    filepath: str,
+    img_dir: str,
+    layout_model: Optional[Any] = None,
+    paddle_lang: str = "ch",
+    force_ocr: Optional[bool] = False,
+    page_workers: int = 1,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
 ) -> List[Question]:
+    """Parse a PDF; ``force_ocr=None`` decides text vs. scanned from the open document."""
     if fitz is None:
         logging.warning("未安装 PyMuPDF，跳过 PDF 解析：%s", filepath)
         return []
     ensure_dir(img_dir)
-    with fitz.open(filepath) as doc:        
+    with fitz.open(filepath) as doc:
+        if force_ocr is None:
+            force_ocr = _detect_scanned(doc, filepath)
         return _parse_pdf_doc(
             doc,
             filepath,
@@ -710,4 +1109,33 @@ def parse_pdf(
             layout_model=layout_model,
             paddle_lang=paddle_lang,
             force_ocr=force_ocr,
-        )
\ No newline at end of file
+            page_workers=page_workers,
+            ocr_batch_size=ocr_batch_size,
+        )
+
+
+def iter_pdf(
+    filepath: str,
+    img_dir: str,
+    layout_model: Optional[Any] = None,
+    paddle_lang: str = "ch",
+    force_ocr: Optional[bool] = False,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> Iterator[Question]:
+    """Yield questions from a PDF as soon as they are finalized (see ``_iter_pdf_doc``)."""
+    if fitz is None:
+        logging.warning("未安装 PyMuPDF，跳过 PDF 解析：%s", filepath)
+        return
+    ensure_dir(img_dir)
+    with fitz.open(filepath) as doc:
+        if force_ocr is None:
+            force_ocr = _detect_scanned(doc, filepath)
+        yield from _iter_pdf_doc(
+            doc,
+            filepath,
+            img_dir,
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=force_ocr,
+            ocr_batch_size=ocr_batch_size,
+        )
@@ -0,0 +1,120 @@
+"""Process-wide registry for heavy OCR / layout models.
+
+PaddleOCR and PP-StructureV3 take seconds to load and hundreds of MB of memory,
+so each distinct (kind, options) combination is loaded lazily at most once per
+process and shared by the parsers, the CLI and Celery workers.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ModelKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        import resource
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """Lazily loads and caches model instances keyed by kind and options."""
+
+    def __init__(self) -> None:
+        self._models: Dict[ModelKey, Optional[Any]] = {}
+        self._info: Dict[ModelKey, Dict[str, Any]] = {}
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, **options: Any) -> ModelKey:
+        return kind, tuple(sorted(options.items()))
+
+    def get(self, kind: str, loader: Callable[[], Any], **options: Any) -> Optional[Any]:
+        """Return the cached model for ``kind``/``options``, loading it on first use.
+
+        A failed load is remembered as ``None`` so a missing dependency is not
+        retried for every page; call :meth:`clear` to try again.
+        """
+        key = self.make_key(kind, **options)
+        if key in self._models:
+            return self._models[key]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key in self._models:
+                return self._models[key]
+            rss_before = _current_rss_bytes()
+            started = time.perf_counter()
+            error: Optional[str] = None
+            try:
+                model = loader()
+            except Exception as exc:
+                logging.warning("Failed to load model %s %s: %s", kind, dict(options), exc)
+                model = None
+                error = str(exc)
+            self._info[key] = {
+                "kind": kind,
+                "options": dict(options),
+                "loaded": model is not None,
+                "load_seconds": round(time.perf_counter() - started, 3),
+                "rss_delta_bytes": max(0, _current_rss_bytes() - rss_before),
+                "error": error,
+            }
+            self._models[key] = model
+            return model
+
+    def key_of(self, model: Any) -> Optional[ModelKey]:
+        """Reverse lookup of the key a model instance was registered under."""
+        for key, candidate in list(self._models.items()):
+            if candidate is not None and candidate is model:
+                return key
+        return None
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Summarize loaded models with their load time and resident memory growth."""
+        models: List[Dict[str, Any]] = [dict(info) for info in self._info.values()]
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": _current_rss_bytes(),
+            "models": models,
+            "models_rss_delta_bytes": sum(info["rss_delta_bytes"] for info in models),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._info.clear()
+            self._key_locks.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def warm_up_models(
+    langs: Iterable[str] = ("ch",),
+    use_layout: bool = False,
+    layout_threshold: float = 0.5,
+) -> Dict[str, Any]:
+    """Eagerly load OCR (and optionally layout) models, e.g. at worker start."""
+    from .utils import get_paddle_ocr
+    from .parsers.pdf import get_layout_model
+
+    for lang in langs:
+        get_paddle_ocr(lang)
+    if use_layout:
+        get_layout_model(threshold=layout_threshold)
+    report = model_registry.memory_report()
+    logging.info("exam_parser models warmed up: %s", report)
+    return report
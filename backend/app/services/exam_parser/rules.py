@@ -122,6 +122,7 @@ def collect_tokens_near_bbox(
     y1: float,
     pad: float = 160.0,
 ) -> set[str]:
+    """Figure tokens mentioned by lines within ``pad`` of the ``y0..y1`` band."""
     contexts: List[str] = []
     extended_top = y0 - pad
     extended_bottom = y1 + pad
@@ -0,0 +1,71 @@
+"""Per-page spatial index for bounding-box lookups.
+
+Pages carry a few hundred text lines, a few dozen layout blocks, question
+regions and figure markers. Matching them pairwise is quadratic; keeping the
+boxes sorted by their top edge turns each lookup into a binary search over the
+vertical band of interest followed by an exact check of the few boxes inside it.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+
+class SpatialIndex:
+    """Static interval index over boxes, keyed on the y axis.
+
+    Items are identified by their position in the input, and query results are
+    returned in that order so callers keep the tie-breaking of the linear scans
+    they replace. Page content is laid out in rows, so a vertical band holds a
+    small fraction of the boxes.
+    """
+
+    def __init__(self, boxes: Iterable[BBox]) -> None:
+        self.boxes: List[BBox] = [
+            (float(x0), float(y0), float(x1), float(y1)) for x0, y0, x1, y1 in boxes
+        ]
+        self._order = sorted(range(len(self.boxes)), key=lambda i: self.boxes[i][1])
+        self._tops = [self.boxes[i][1] for i in self._order]
+        self._max_height = max((b[3] - b[1] for b in self.boxes), default=0.0)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[int]:
+        """Ids of boxes intersecting the rectangle (edges inclusive), in input order."""
+        lo = bisect_left(self._tops, y0 - self._max_height)
+        hi = bisect_right(self._tops, y1)
+        hits = []
+        boxes = self.boxes
+        for i in self._order[lo:hi]:
+            bx0, by0, bx1, by1 = boxes[i]
+            if by1 >= y0 and bx0 <= x1 and bx1 >= x0:
+                hits.append(i)
+        hits.sort()
+        return hits
+
+    def query_y(self, y0: float, y1: float) -> List[int]:
+        """Ids of boxes overlapping the horizontal band ``y0..y1``."""
+        lo = bisect_left(self._tops, y0 - self._max_height)
+        hi = bisect_right(self._tops, y1)
+        boxes = self.boxes
+        hits = [i for i in self._order[lo:hi] if boxes[i][3] >= y0]
+        hits.sort()
+        return hits
+
+
+def center_index(boxes: Iterable[BBox]) -> SpatialIndex:
+    """Index the center point of each box (for "center inside block" tests)."""
+    centers = []
+    for x0, y0, x1, y1 in boxes:
+        cx = (x0 + x1) / 2.0
+        cy = (y0 + y1) / 2.0
+        centers.append((cx, cy, cx, cy))
+    return SpatialIndex(centers)
+
+
+def expand(bbox: BBox, dx: float, dy: Optional[float] = None) -> BBox:
+    dy = dx if dy is None else dy
+    x0, y0, x1, y1 = bbox
+    return x0 - dx, y0 - dy, x1 + dx, y1 + dy
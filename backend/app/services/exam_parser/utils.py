@@ -5,12 +5,14 @@ import os
 import re
 from collections import Counter as _Counter
 from pathlib import Path
-from typing import Any, Iterable, List, Optional, Tuple
+from typing import Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple, cast
 try:
     import fitz
 except Exception:
     fitz = None
+from .cache import OCRResultCache, get_ocr_cache, entries_from_cache, entries_to_cache
 from .core import Question, LineBBox
+from .registry import model_registry
 from .rules import (
     QUESTION_HEAD_RE,
     OPTION_RE,
@@ -69,81 +71,116 @@ def detect_qtype(text: str, options: List[str]) -> str:
     if re.search(r"简答|简述|问答|论述|填空|解答|计算", t):
         return "主观题"
     return "未知"
-def parse_text_to_questions(
-    lines: Iterable[str],
-    source: str,
-    image_attach_queue: Optional[List[str]] = None,
-    active_material: str = "",
-    current_section_type: str = "",
-    type_ranges: Optional[List[Tuple[int, int, str]]] = None,
-) -> Tuple[List[Question], str, str]:
-    questions: List[Question] = []
-    current_q_lines: List[str] = []
-    current_options: List[str] = []
-    current_q_images: List[str] = []
-    last_q: Optional[Question] = None
-    material_buffer = active_material
-    in_material_block = False
-    material_range: Optional[Tuple[int, int]] = None
-    type_ranges = type_ranges or []
-    section_type = current_section_type
-    current_q_number: Optional[int] = None
-    has_started_question: bool = False
-    pending_section_count: Optional[int] = None
-    pending_section_type: Optional[str] = None
-    pending_section_start: Optional[int] = None
-    def flush_question() -> None:
-        nonlocal current_q_lines, current_options, current_q_images, last_q, material_buffer, material_range
-        if not current_q_lines and not current_options:
+class QuestionStream:
+    """Incremental question parser: feed lines one at a time, get questions as they finish.
+
+    A question is finalized when the next question head (or the end of input) is
+    seen, so callers can hand finished questions downstream while later pages are
+    still being extracted. ``parse_text_to_questions`` is the batch wrapper.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        image_attach_queue: Optional[List[str]] = None,
+        active_material: str = "",
+        current_section_type: str = "",
+        type_ranges: Optional[List[Tuple[int, int, str]]] = None,
+    ) -> None:
+        self.source = source
+        self.current_q_lines: List[str] = []
+        self.current_options: List[str] = []
+        self.current_q_images: List[str] = []
+        self.last_q: Optional[Question] = None
+        self.material_buffer = active_material
+        self.in_material_block = False
+        self.material_range: Optional[Tuple[int, int]] = None
+        self.type_ranges = type_ranges or []
+        self.section_type = current_section_type
+        self.current_q_number: Optional[int] = None
+        self.has_started_question: bool = False
+        self.pending_section_count: Optional[int] = None
+        self.pending_section_type: Optional[str] = None
+        self.pending_section_start: Optional[int] = None
+        self.pending_images = list(image_attach_queue or [])
+        self._ready: List[Question] = []
+
+    @property
+    def open_question_number(self) -> Optional[int]:
+        """Number of the question still collecting lines, if any."""
+        if self.has_started_question and (self.current_q_lines or self.current_options):
+            return self.current_q_number
+        return None
+
+    def _flush_question(self) -> None:
+        if not self.current_q_lines and not self.current_options:
             return
-        raw_content = "\n".join(current_q_lines + current_options)
+        raw_content = "\n".join(self.current_q_lines + self.current_options)
         content = raw_content.strip("\n")
         qtype = "未知"
-        if section_type:
-            qtype = section_type
-        if current_q_number is not None:
-            for a, b, tname in type_ranges:
-                if a <= current_q_number <= b:
+        if self.section_type:
+            qtype = self.section_type
+        if self.current_q_number is not None:
+            for a, b, tname in self.type_ranges:
+                if a <= self.current_q_number <= b:
                     qtype = tname
                     break
-        attach_material = material_buffer
-        if material_range is not None:
-            if current_q_number is None or not (material_range[0] <= current_q_number <= material_range[1]):
+        attach_material = self.material_buffer
+        if self.material_range is not None:
+            if self.current_q_number is None or not (self.material_range[0] <= self.current_q_number <= self.material_range[1]):
                 attach_material = ""
-        if not has_started_question:
-            current_q_lines = []
-            current_options = []
-            current_q_images = []
+        if not self.has_started_question:
+            self.current_q_lines = []
+            self.current_options = []
+            self.current_q_images = []
             return
         q = Question(
             内容=content,
-            来源=source,
+            来源=self.source,
             题型=qtype,
-            配图=list(current_q_images),
+            配图=list(self.current_q_images),
             材料=attach_material,
-            题号=current_q_number,
+            题号=self.current_q_number,
         )
-        questions.append(q)
-        last_q = q
-        current_q_lines = []
-        current_options = []
-        current_q_images = []
-        if material_range is not None and current_q_number is not None and current_q_number >= material_range[1]:
-            material_range = None
-            material_buffer = ""
-    pending_images = list(image_attach_queue or [])
-    for idx, raw in enumerate(lines):
+        self._ready.append(q)
+        self.last_q = q
+        self.current_q_lines = []
+        self.current_options = []
+        self.current_q_images = []
+        if self.material_range is not None and self.current_q_number is not None and self.current_q_number >= self.material_range[1]:
+            self.material_range = None
+            self.material_buffer = ""
+
+    def _take_ready(self) -> List[Question]:
+        ready, self._ready = self._ready, []
+        return ready
+
+    def feed(self, raw: str) -> List[Question]:
+        """Consume one line and return any questions it finalized."""
+        self._feed_line(raw)
+        return self._take_ready()
+
+    def close(self) -> List[Question]:
+        """Finalize the question in progress and return it (if any)."""
+        self._flush_question()
+        ready = self._take_ready()
+        if self.pending_images and self.last_q is not None:
+            self.last_q.配图.extend(self.pending_images)
+            self.pending_images.clear()
+        return ready
+
+    def _feed_line(self, raw: str) -> None:
         line = raw.rstrip("\r\n")
         stripped = line.strip()
         if not stripped:
-            if in_material_block:
-                material_buffer = f"{material_buffer}\n" if material_buffer else ""
-                continue
-            if has_started_question:
-                current_q_lines.append("")
-                continue
-            in_material_block = False
-            continue
+            if self.in_material_block:
+                self.material_buffer = f"{self.material_buffer}\n" if self.material_buffer else ""
+                return
+            if self.has_started_question:
+                self.current_q_lines.append("")
+                return
+            self.in_material_block = False
+            return
         range_m = MATERIAL_RANGE_RE.search(stripped)
         if range_m:
             try:
@@ -151,21 +188,21 @@ def parse_text_to_questions(
                 end_n = int(range_m.group(2))
                 if start_n > end_n:
                     start_n, end_n = end_n, start_n
-                material_range = (start_n, end_n)
+                self.material_range = (start_n, end_n)
             except Exception:
-                material_range = None
-            material_buffer = line
-            in_material_block = True
-            continue
+                self.material_range = None
+            self.material_buffer = line
+            self.in_material_block = True
+            return
         if MATERIAL_START_RE.search(stripped):
-            material_buffer = line
-            in_material_block = True
-            continue
-        if in_material_block:
+            self.material_buffer = line
+            self.in_material_block = True
+            return
+        if self.in_material_block:
             if QUESTION_HEAD_RE.match(stripped):
-                in_material_block = False
+                self.in_material_block = False
             else:
-                material_buffer = f"{material_buffer}\n{line}" if material_buffer else line
+                self.material_buffer = f"{self.material_buffer}\n{line}" if self.material_buffer else line
                 rng = MATERIAL_RANGE_ONLY_RE.search(stripped)
                 if rng:
                     try:
@@ -173,21 +210,21 @@ def parse_text_to_questions(
                         end_n = int(rng.group(2))
                         if start_n > end_n:
                             start_n, end_n = end_n, start_n
-                        material_range = (start_n, end_n)
+                        self.material_range = (start_n, end_n)
                     except Exception:
                         pass
-                continue
+                return
         sec = SECTION_HEADER_RE.match(stripped)
         if sec:
             head = sec.group(1)
             for key, v in SECTION_TYPE_MAP.items():
                 if key in head:
-                    section_type = v
+                    self.section_type = v
                     break
-            pending_section_count = None
-            pending_section_type = section_type or None
-            pending_section_start = None
-            continue
+            self.pending_section_count = None
+            self.pending_section_type = self.section_type or None
+            self.pending_section_start = None
+            return
         tr = TYPE_RANGE_RE.search(stripped)
         if tr:
             a, b = int(tr.group(1)), int(tr.group(2))
@@ -198,52 +235,76 @@ def parse_text_to_questions(
                 if key in tname:
                     tname = v
                     break
-            type_ranges.append((a, b, tname))
-            continue
-        if section_type:
+            self.type_ranges.append((a, b, tname))
+            return
+        if self.section_type:
             cnt_m = SECTION_COUNT_RE.search(stripped)
             if cnt_m:
                 try:
-                    pending_section_count = int(cnt_m.group(1))
+                    self.pending_section_count = int(cnt_m.group(1))
                 except Exception:
-                    pending_section_count = None
-                continue
+                    self.pending_section_count = None
+                return
 
         m = QUESTION_HEAD_RE.match(stripped)
         if m:
-            flush_question()
+            self._flush_question()
             try:
-                current_q_number = int(m.group(1))
+                self.current_q_number = int(m.group(1))
             except Exception:
-                current_q_number = None
-            has_started_question = True
-            if pending_section_count and pending_section_type and current_q_number is not None and pending_section_start is None:
-                pending_section_start = current_q_number
-                start = pending_section_start
-                end = start + pending_section_count - 1
-                type_ranges.append((start, end, pending_section_type))
+                self.current_q_number = None
+            self.has_started_question = True
+            if (
+                self.pending_section_count
+                and self.pending_section_type
+                and self.current_q_number is not None
+                and self.pending_section_start is None
+            ):
+                self.pending_section_start = self.current_q_number
+                start = self.pending_section_start
+                end = start + self.pending_section_count - 1
+                self.type_ranges.append((start, end, self.pending_section_type))
             content_after = m.group(2)
             to_append = content_after.lstrip() if content_after else stripped
-            current_q_lines.append(to_append)
-            if pending_images:
-                current_q_images.extend(pending_images)
-                pending_images.clear()
-            continue
+            self.current_q_lines.append(to_append)
+            if self.pending_images:
+                self.current_q_images.extend(self.pending_images)
+                self.pending_images.clear()
+            return
         mo = OPTION_RE.match(stripped)
         if mo:
-            current_options.append(line)
-            continue
-        current_q_lines.append(line)
-    flush_question()
-    if pending_images and questions:
-        questions[-1].配图.extend(pending_images)
-        pending_images.clear()
-    return questions, material_buffer, section_type
-def get_paddle_ocr(lang: str = "ch") -> Optional[Any]:
+            self.current_options.append(line)
+            return
+        self.current_q_lines.append(line)
+
+
+def parse_text_to_questions(
+    lines: Iterable[str],
+    source: str,
+    image_attach_queue: Optional[List[str]] = None,
+    active_material: str = "",
+    current_section_type: str = "",
+    type_ranges: Optional[List[Tuple[int, int, str]]] = None,
+) -> Tuple[List[Question], str, str]:
+    stream = QuestionStream(
+        source,
+        image_attach_queue=image_attach_queue,
+        active_material=active_material,
+        current_section_type=current_section_type,
+        type_ranges=type_ranges,
+    )
+    questions: List[Question] = []
+    for raw in lines:
+        questions.extend(stream.feed(raw))
+    questions.extend(stream.close())
+    return questions, stream.material_buffer, stream.section_type
+
+
+def _load_paddle_ocr(lang: str = "ch", use_angle_cls: bool = True) -> Optional[Any]:
     try:
         from paddleocr import PaddleOCR
         # Try to initialize with minimal settings to avoid dependency issues
-        return PaddleOCR(use_angle_cls=True, lang=lang)
+        return PaddleOCR(use_angle_cls=use_angle_cls, lang=lang)
     except ImportError as e:
         print(e)
         logging.debug("PaddleOCR import failed: %s", e)
@@ -252,6 +313,19 @@ def get_paddle_ocr(lang: str = "ch") -> Optional[Any]:
         print(e)
         logging.debug("PaddleOCR initialization failed: %s", e)
         return None
+
+
+OCR_BATCH_SIZE = int(os.getenv("EXAM_PARSER_OCR_BATCH_SIZE", "8"))
+
+
+def get_paddle_ocr(lang: str = "ch", use_angle_cls: bool = True) -> Optional[Any]:
+    """Return the process-wide PaddleOCR instance for ``lang`` (loaded on first use)."""
+    return model_registry.get(
+        "paddle_ocr",
+        lambda: _load_paddle_ocr(lang, use_angle_cls),
+        lang=lang,
+        use_angle_cls=use_angle_cls,
+    )
 def extract_paddle_ocr_entries(result: Any) -> List[Tuple[str, Tuple[float, float, float, float]]]:
     """Extract text entries and bounding boxes from PaddleOCR result."""
     entries: List[Tuple[str, Tuple[float, float, float, float]]] = []
@@ -304,60 +378,162 @@ def extract_paddle_ocr_entries(result: Any) -> List[Tuple[str, Tuple[float, floa
         logging.debug("Error extracting PaddleOCR entries: %s", e)
     return entries
 
-def ocr_image_to_text(image_path: str, paddle_lang: str = "ch") -> Tuple[str, List[LineBBox]]:
-    def _load_sidecar() -> Optional[Any]:
-        candidates: List[Path] = []
-        base = Path(image_path)
-        candidates.append(base.with_name(f"{base.stem}_res.json"))
-        candidates.append(base.parent / "output" / f"{base.stem}_res.json")
-        candidates.append(Path("output") / f"{base.stem}_res.json")
-        extra_dir = os.getenv("PADDLE_OCR_OUTPUT_DIR")
-        if extra_dir:
-            candidates.append(Path(extra_dir) / f"{base.stem}_res.json")
-        for candidate in candidates:
-            try:
-                if candidate.exists():
-                    with open(candidate, "r", encoding="utf-8") as fh:
-                        import json
-                        return json.load(fh)
-            except Exception as exc:
-                logging.debug("Failed to load PaddleOCR JSON %s: %s", candidate, exc)
-        return None
+def run_ocr_batch(ocr: Any, images: List[Any], **kwargs: Any) -> List[Optional[Any]]:
+    """Run ``ocr.predict`` over several images at once.
 
-    entries: List[LineBBox] = []
-    result: Any = None
-    ocr = get_paddle_ocr(paddle_lang)
-    if ocr is not None:
+    Each returned item has the same shape as a single-image ``predict`` result,
+    so it can be fed to ``extract_paddle_ocr_entries`` unchanged. Falls back to
+    one call per image (and to the legacy ``ocr.ocr`` API) when the batched call
+    fails or returns a result that cannot be mapped back to its inputs. Failed
+    images yield ``None``.
+    """
+    if len(images) > 1:
         try:
-            result = ocr.predict(image_path)
+            batch = ocr.predict(images, **kwargs)
+            batch = list(batch) if batch is not None else []
+            if len(batch) == len(images):
+                return [[item] for item in batch]
+            logging.debug("Batched PaddleOCR returned %d results for %d images", len(batch), len(images))
+        except Exception as exc:
+            logging.debug("Batched PaddleOCR failed, falling back to per-image calls: %s", exc)
+    results: List[Optional[Any]] = []
+    for image in images:
+        try:
+            results.append(ocr.predict(image, **kwargs))
         except TypeError:
             try:
-                result = ocr.ocr(image_path)
+                results.append(ocr.ocr(image))
             except Exception as exc:
                 logging.warning("PaddleOCR recognition failed: %s", exc)
-                result = None
+                results.append(None)
         except Exception as exc:
             logging.warning("PaddleOCR recognition failed: %s", exc)
-            result = None
-    else:
-        logging.warning("PaddleOCR not installed, trying to load exported JSON: %s", image_path)
+            results.append(None)
+    return results
+
+
+def _load_ocr_sidecar(image_path: str) -> Optional[Any]:
+    candidates: List[Path] = []
+    base = Path(image_path)
+    candidates.append(base.with_name(f"{base.stem}_res.json"))
+    candidates.append(base.parent / "output" / f"{base.stem}_res.json")
+    candidates.append(Path("output") / f"{base.stem}_res.json")
+    extra_dir = os.getenv("PADDLE_OCR_OUTPUT_DIR")
+    if extra_dir:
+        candidates.append(Path(extra_dir) / f"{base.stem}_res.json")
+    for candidate in candidates:
+        try:
+            if candidate.exists():
+                with open(candidate, "r", encoding="utf-8") as fh:
+                    import json
+                    return json.load(fh)
+        except Exception as exc:
+            logging.debug("Failed to load PaddleOCR JSON %s: %s", candidate, exc)
+    return None
+
+
+def _image_cache_key(image_path: str, paddle_lang: str) -> Optional[str]:
+    try:
+        with open(image_path, "rb") as fh:
+            digest = OCRResultCache.content_digest(fh.read())
+    except OSError as exc:
+        logging.debug("Failed to hash image for OCR cache %s: %s", image_path, exc)
+        return None
+    return OCRResultCache.make_key("ocr", digest, lang=paddle_lang, model="paddleocr")
 
-    if result is not None:
-        entries = extract_paddle_ocr_entries(result)
-        if not entries and ocr is not None and hasattr(ocr, "ocr"):
-            try:
-                legacy = ocr.ocr(image_path)
-                entries = extract_paddle_ocr_entries(legacy)
-            except Exception:
-                pass
 
-    if not entries:
-        sidecar = _load_sidecar()
-        if sidecar is not None:
-            entries = extract_paddle_ocr_entries(sidecar)
+def ocr_images_to_text(
+    image_paths: List[str],
+    paddle_lang: str = "ch",
+    batch_size: int = OCR_BATCH_SIZE,
+) -> List[Tuple[str, List[LineBBox]]]:
+    """OCR several image files, sending cache misses to PaddleOCR in batches.
+
+    Returns one ``(text, entries)`` pair per input path, in input order.
+    """
+    outputs: List[Tuple[str, List[LineBBox]]] = [("", []) for _ in image_paths]
+    cache = get_ocr_cache()
+    cache_keys: List[Optional[str]] = [None] * len(image_paths)
+    pending: List[int] = []
+    for idx, image_path in enumerate(image_paths):
+        if cache is not None:
+            cache_keys[idx] = _image_cache_key(image_path, paddle_lang)
+            cached = cache.get(cache_keys[idx]) if cache_keys[idx] is not None else None
+            if cached is not None:
+                entries = entries_from_cache(cached)
+                outputs[idx] = ("\n".join(line for line, _ in entries) if entries else "", entries)
+                continue
+        pending.append(idx)
+    if not pending:
+        return outputs
+
+    ocr = get_paddle_ocr(paddle_lang)
+    if ocr is None:
+        for idx in pending:
+            logging.warning("PaddleOCR not installed, trying to load exported JSON: %s", image_paths[idx])
+    batch_size = max(1, batch_size)
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        if ocr is not None:
+            results = run_ocr_batch(ocr, [image_paths[idx] for idx in chunk])
+        else:
+            results = [None] * len(chunk)
+        for idx, result in zip(chunk, results):
+            image_path = image_paths[idx]
+            entries: List[LineBBox] = []
+            if result is not None:
+                entries = extract_paddle_ocr_entries(result)
+                if not entries and ocr is not None and hasattr(ocr, "ocr"):
+                    try:
+                        legacy = ocr.ocr(image_path)
+                        entries = extract_paddle_ocr_entries(legacy)
+                    except Exception:
+                        pass
+
+            if not entries:
+                sidecar = _load_ocr_sidecar(image_path)
+                if sidecar is not None:
+                    entries = extract_paddle_ocr_entries(sidecar)
 
-    text = "\n".join(line for line, _ in entries) if entries else ""
-    return text, entries
+            cache_key = cache_keys[idx]
+            if cache is not None and cache_key is not None and (entries or result is not None):
+                cache.put(cache_key, entries_to_cache(entries))
+
+            text = "\n".join(line for line, _ in entries) if entries else ""
+            outputs[idx] = (text, entries)
+    return outputs
+
+
+def ocr_image_to_text(image_path: str, paddle_lang: str = "ch") -> Tuple[str, List[LineBBox]]:
+    return ocr_images_to_text([image_path], paddle_lang=paddle_lang)[0]
+
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+SUPPORTED_SUFFIXES = {".pdf", ".docx"} | IMAGE_SUFFIXES
+
+
+def classify_pdf_doc(doc: Any, sample_pages: int = 5) -> str:
+    """Tell a text PDF from a scanned one by sampling the text layer of an open document."""
+    try:
+        total_pages = len(doc)
+        if total_pages == 0:
+            return "pdf_text"
+        check_pages = min(total_pages, max(sample_pages, 1))
+        text_chars = 0
+        non_empty_pages = 0
+        for page_index in range(check_pages):
+            page = doc.load_page(page_index)
+            text = str(page.get_text("text") or "").strip()
+            if text:
+                text_chars += len(text)
+                non_empty_pages += 1
+                if text_chars >= 200:
+                    break
+        if non_empty_pages == 0 or text_chars < 120:
+            return "pdf_scanned"
+    except Exception as exc:
+        logging.debug("Failed to detect PDF text, defaulting to text PDF: %s", exc)
+    return "pdf_text"
 
 
 def detect_document_type(input_path: str, sample_pages: int = 5) -> str:
@@ -371,90 +547,234 @@ def detect_document_type(input_path: str, sample_pages: int = 5) -> str:
             return "pdf_text"
         try:
             with fitz.open(input_path) as doc:
-                total_pages = len(doc)
-                if total_pages == 0:
-                    return "pdf_text"
-                check_pages = min(total_pages, max(sample_pages, 1))
-                text_chars = 0
-                non_empty_pages = 0
-                for page_index in range(check_pages):
-                    page = doc.load_page(page_index)
-                    text = str(page.get_text("text") or "").strip()
-                    if text:
-                        text_chars += len(text)
-                        non_empty_pages += 1
-                        if text_chars >= 200:
-                            break
-                if non_empty_pages == 0 or text_chars < 120:
-                    return "pdf_scanned"
+                return classify_pdf_doc(doc, sample_pages)
         except Exception as exc:
             logging.debug("Failed to detect PDF text, defaulting to text PDF: %s", exc)
             return "pdf_text"
-        return "pdf_text"
     if ext == ".docx":
         return "docx"
-    if ext in {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}:
+    if ext in IMAGE_SUFFIXES:
         return "image"
     return "unsupported"
 
 
+def parse_document(
+    file_path: str,
+    img_dir: str,
+    paddle_lang: str = "ch",
+    layout_model: Optional[Any] = None,
+    page_workers: int = 1,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+    ocr_result: Optional[Tuple[str, List[LineBBox]]] = None,
+) -> List[Question]:
+    """Parse a single file, dispatching on its suffix.
+
+    Text vs. scanned PDF detection happens inside ``parse_pdf`` on the document
+    it already has open, so every file is opened exactly once.
+    """
+    from .parsers import parse_pdf, parse_docx, parse_image
+
+    ext = Path(file_path).suffix.lower()
+    if ext == ".pdf":
+        return parse_pdf(
+            file_path,
+            img_dir,
+            layout_model=layout_model,
+            paddle_lang=paddle_lang,
+            force_ocr=None,
+            page_workers=page_workers,
+            ocr_batch_size=ocr_batch_size,
+        )
+    if ext == ".docx":
+        logging.info("Detected document type docx: %s", file_path)
+        return parse_docx(file_path, img_dir)
+    if ext in IMAGE_SUFFIXES:
+        logging.info("Detected document type image: %s", file_path)
+        return parse_image(
+            file_path,
+            img_dir,
+            paddle_lang=paddle_lang,
+            ocr_result=ocr_result,
+        )
+    logging.debug("Skipping unsupported file: %s", file_path)
+    return []
+
+
+def iter_input_files(input_dir: str) -> List[str]:
+    """Supported files under ``input_dir`` in deterministic (walk, then name) order."""
+    files: List[str] = []
+    for root, dirs, names in os.walk(input_dir):
+        dirs.sort()
+        for fn in sorted(names):
+            fp = os.path.join(root, fn)
+            if Path(fp).suffix.lower() in SUPPORTED_SUFFIXES and not os.path.isdir(fp):
+                files.append(fp)
+    return files
+
+
 def parse_path(
     input_path: str,
     img_dir: str,
     paddle_lang: str = "ch",
     layout_model: Optional[Any] = None,
+    page_workers: int = 1,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+    workers: int = 1,
+    manifest_path: Optional[str] = None,
+    resume: bool = False,
 ) -> List[Question]:
-    from .parsers import parse_pdf, parse_docx, parse_image
+    """Parse a file or every supported file under a directory.
+
+    For directories, ``workers > 1`` or a ``manifest_path`` switches to the
+    work-queue importer in :mod:`.batch` (per-file timing, failure isolation and
+    resumable progress).
+    """
+    if not os.path.isdir(input_path):
+        return parse_document(
+            input_path,
+            img_dir,
+            paddle_lang=paddle_lang,
+            layout_model=layout_model,
+            page_workers=page_workers,
+            ocr_batch_size=ocr_batch_size,
+        )
+
+    if workers > 1 or manifest_path:
+        from .batch import parse_directory
+
+        return parse_directory(
+            input_path,
+            img_dir,
+            paddle_lang=paddle_lang,
+            layout_model=layout_model,
+            workers=workers,
+            manifest_path=manifest_path,
+            resume=resume,
+            page_workers=page_workers,
+            ocr_batch_size=ocr_batch_size,
+        )
 
     results: List[Question] = []
+    # Consecutive images are OCR'd together, then parsed in their original order.
+    image_batch: List[str] = []
 
-    def _parse_file(file_path: str) -> List[Question]:
-        doc_type = detect_document_type(file_path)
-        if doc_type == "directory":
-            logging.debug("Path is directory, handled at upper level: %s", file_path)
-            return []
-        if doc_type == "unsupported":
-            logging.debug("Skipping unsupported file: %s", file_path)
-            return []
-        logging.info("Detected document type %s: %s", doc_type, file_path)
-        if doc_type == "pdf_text":
-            return parse_pdf(
-                file_path,
+    def _flush_images() -> None:
+        if not image_batch:
+            return
+        ocr_results = ocr_images_to_text(image_batch, paddle_lang=paddle_lang, batch_size=ocr_batch_size)
+        for image_path, ocr_result in zip(image_batch, ocr_results):
+            results.extend(parse_document(image_path, img_dir, paddle_lang=paddle_lang, ocr_result=ocr_result))
+        image_batch.clear()
+
+    for fp in iter_input_files(input_path):
+        if Path(fp).suffix.lower() in IMAGE_SUFFIXES:
+            image_batch.append(fp)
+            if len(image_batch) >= max(1, ocr_batch_size):
+                _flush_images()
+            continue
+        _flush_images()
+        results.extend(
+            parse_document(
+                fp,
                 img_dir,
-                layout_model=layout_model,
                 paddle_lang=paddle_lang,
-            )
-        if doc_type == "pdf_scanned":
-            return parse_pdf(
-                file_path,
-                img_dir,
                 layout_model=layout_model,
-                paddle_lang=paddle_lang,
-                force_ocr=True,
+                page_workers=page_workers,
+                ocr_batch_size=ocr_batch_size,
             )
-        if doc_type == "docx":
-            return parse_docx(file_path, img_dir)
-        if doc_type == "image":
-            return parse_image(
+        )
+    _flush_images()
+    return results
+
+
+def iter_questions(
+    input_path: str,
+    img_dir: str,
+    paddle_lang: str = "ch",
+    layout_model: Optional[Any] = None,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> Iterator[Question]:
+    """Streaming variant of ``parse_path`` that yields questions as soon as they are finalized.
+
+    PDFs are read one page window at a time (see ``iter_pdf``), so downstream
+    embedding and inserts can start while later pages are still being OCR'd.
+    DOCX/DOC and image files are parsed whole; directories are walked file by file.
+
+    Raises:
+        ValueError: ``input_path`` is a file of an unsupported type.
+    """
+    from .parsers import iter_pdf, parse_docx, parse_image
+
+    def _iter_file(file_path: str) -> Iterator[Question]:
+        ext = Path(file_path).suffix.lower()
+        if ext == ".pdf":
+            yield from iter_pdf(
                 file_path,
                 img_dir,
+                layout_model=layout_model,
                 paddle_lang=paddle_lang,
+                force_ocr=None,
+                ocr_batch_size=ocr_batch_size,
             )
-        logging.warning("Unknown document type: %s", file_path)
-        return []
+        elif ext in (".docx", ".doc"):
+            logging.info("Detected document type docx: %s", file_path)
+            yield from parse_docx(file_path, img_dir)
+        elif ext in IMAGE_SUFFIXES:
+            logging.info("Detected document type image: %s", file_path)
+            yield from parse_image(file_path, img_dir, paddle_lang=paddle_lang)
+        else:
+            # directory walks only yield supported files, so this is an explicit path
+            raise ValueError(f"Unsupported file type: {file_path}")
 
     if os.path.isdir(input_path):
-        for root, _, files in os.walk(input_path):
-            for fn in sorted(files):
-                fp = os.path.join(root, fn)
-                if os.path.isdir(fp):
-                    continue
-                if Path(fp).suffix.lower() not in {".pdf", ".docx", ".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}:
-                    continue
-                results.extend(_parse_file(fp))
-        return results
-
-    return _parse_file(input_path)
+        for fp in iter_input_files(input_path):
+            yield from _iter_file(fp)
+        return
+    yield from _iter_file(input_path)
+
+
+async def aiter_questions(
+    input_path: str,
+    img_dir: str,
+    paddle_lang: str = "ch",
+    layout_model: Optional[Any] = None,
+    ocr_batch_size: int = OCR_BATCH_SIZE,
+) -> AsyncIterator[Question]:
+    """Async counterpart of ``iter_questions``; parsing runs in a worker thread."""
+    import asyncio
+
+    iterator = iter_questions(
+        input_path,
+        img_dir,
+        paddle_lang=paddle_lang,
+        layout_model=layout_model,
+        ocr_batch_size=ocr_batch_size,
+    )
+    sentinel = object()
+    loop = asyncio.get_running_loop()
+    pending: Optional["asyncio.Future[Any]"] = None
+
+    def _close_when_done(future: "asyncio.Future[Any]") -> None:
+        if not future.cancelled():
+            future.exception()  # mark retrieved; the consumer is already gone
+        iterator.close()
+
+    try:
+        while True:
+            # shield keeps the executor future alive on cancellation so the
+            # finally block can tell whether next() is still running
+            pending = loop.run_in_executor(None, next, iterator, sentinel)
+            question = await asyncio.shield(pending)
+            if question is sentinel:
+                break
+            yield cast(Question, question)
+    finally:
+        if pending is not None and not pending.done():
+            # closing a generator that is executing raises ValueError and would
+            # mask the CancelledError; close it once the in-flight next() returns
+            pending.add_done_callback(_close_when_done)
+        else:
+            iterator.close()
 
 
 def export_results(questions: List[Question], out_path: str, fmt: str = "csv", include_number: bool = False) -> None:
@@ -0,0 +1,152 @@
+# 试题混合搜索
+"""
+关键词 + 语义混合搜索
+
+两路召回：
+- 关键词：jieba 分词后在 search_vector 的 GIN 倒排索引上匹配，按 ts_rank_cd 排序
+- 语义：向量搜索后端（pgvector / numpy）按余弦相似度排序
+
+两路结果按倒数排名融合（RRF）：score = Σ 1 / (HYBRID_RRF_K + 名次)，
+只看名次不看原始分数，无需对两种分数做归一化。融合结果按 (score 降序, id 升序)
+排列，分页游标记录上一页最后一条的 (score, id)。
+"""
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.question_vectorization import search_similar_questions
+from app.services.text_search import TEXT_SEARCH_CONFIG, query_tokens
+from app.services.vector_backends import VECTOR_SEARCH_COLUMNS, require_database_backend
+from app.utils.pagination import decode_cursor, encode_cursor
+
+LEXICAL_FILTERS = ("subject_id", "question_type", "difficulty")
+
+
+@lru_cache(maxsize=16)
+def lexical_search_sql(filters: Tuple[str, ...], table: str = "question_vectors"):
+    """关键词召回语句（按过滤列组合缓存，取值均为绑定参数）"""
+    where = " AND ".join(["user_id = :user_id"] + [f"{column} = :{column}" for column in filters])
+    return text(
+        f"""
+        SELECT {VECTOR_SEARCH_COLUMNS}, ts_rank_cd(search_vector, query) AS lexical_score
+        FROM {table}, plainto_tsquery('{TEXT_SEARCH_CONFIG}', :q) AS query
+        WHERE {where} AND search_vector @@ query
+        ORDER BY lexical_score DESC, id
+        LIMIT :limit
+        """
+    )
+
+
+async def lexical_search(
+    db: AsyncSession,
+    keyword: str,
+    user_id: int,
+    subject_id: Optional[int] = None,
+    limit: int = 100,
+    **filters: Any
+) -> List[Mapping[str, Any]]:
+    """
+    关键词召回 question_vectors 中的试题
+
+    Raises:
+        RuntimeError: 当前向量后端不写入 question_vectors（如 numpy）
+    """
+    require_database_backend("Lexical search")
+    tokens = await asyncio.to_thread(query_tokens, keyword)
+    if not tokens:
+        return []
+    values = dict(filters, subject_id=subject_id)
+    columns = tuple(column for column in LEXICAL_FILTERS if values.get(column) is not None)
+    params: Dict[str, Any] = {column: values[column] for column in columns}
+    params.update(user_id=user_id, q=tokens, limit=limit)
+    result = await db.execute(lexical_search_sql(columns), params)
+    return list(result.mappings().all())
+
+
+def reciprocal_rank_fusion(ranked: Dict[str, Sequence[Mapping[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """
+    倒数排名融合
+
+    Args:
+        ranked: 召回方式 -> 按相关度降序的结果行（需含 id）
+        k: 平滑常数，越大名次差异的影响越小
+
+    Returns:
+        按 (score 降序, id 升序) 排列的结果行，附带 score 与各路名次 <召回方式>_rank
+    """
+    fused: Dict[int, Dict[str, Any]] = {}
+    for name, rows in ranked.items():
+        for rank, row in enumerate(rows, start=1):
+            entry = fused.get(row["id"])
+            if entry is None:
+                entry = fused[row["id"]] = dict(row, score=0.0)
+            else:
+                for key, value in row.items():
+                    entry.setdefault(key, value)
+            entry["score"] += 1.0 / (k + rank)
+            entry[f"{name}_rank"] = rank
+    return sorted(fused.values(), key=lambda entry: (-entry["score"], entry["id"]))
+
+
+def _decode_after(cursor: str) -> Tuple[float, int]:
+    score, last_id = decode_cursor(cursor, 2)
+    try:
+        return -float(score), int(last_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _page_after(
+    items: List[Dict[str, Any]], after: Optional[Tuple[float, int]], limit: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    start = 0
+    if after is not None:
+        while start < len(items) and (-items[start]["score"], items[start]["id"]) <= after:
+            start += 1
+    page = items[start:start + limit]
+    next_cursor = None
+    if page and start + limit < len(items):
+        next_cursor = encode_cursor([page[-1]["score"], page[-1]["id"]])
+    return page, next_cursor
+
+
+async def hybrid_search_questions(
+    query: str,
+    user_id: int,
+    subject_id: Optional[int] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: AsyncSession = None,
+    question_type: Optional[str] = None,
+    difficulty: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    混合搜索试题
+
+    每路最多召回 HYBRID_SEARCH_CANDIDATES 条，分页在融合结果内进行；
+    相同查询的各页基于同一排序，游标之后的结果不会与前页重复。
+
+    Returns:
+        (结果行, 下一页游标)：没有更多结果时游标为 None
+
+    Raises:
+        ValueError: 游标无效
+        RuntimeError: 当前向量后端不写入 question_vectors（如 numpy），关键词一路无法召回
+    """
+    require_database_backend("Hybrid search")
+    after = _decode_after(cursor) if cursor else None
+    candidates = max(settings.HYBRID_SEARCH_CANDIDATES, limit)
+    filters = {"question_type": question_type, "difficulty": difficulty}
+    ranked: Dict[str, Sequence[Mapping[str, Any]]] = {}
+    # 同一个会话上的查询不能并发，两路依次执行
+    if db is not None:
+        ranked["lexical"] = await lexical_search(db, query, user_id, subject_id, candidates, **filters)
+    ranked["semantic"] = await search_similar_questions(
+        query, user_id, subject_id=subject_id, limit=candidates, db=db, **filters
+    )
+    fused = reciprocal_rank_fusion(ranked, k=settings.HYBRID_RRF_K)
+    return _page_after(fused, after, limit)
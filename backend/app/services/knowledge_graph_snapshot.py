@@ -0,0 +1,550 @@
+# 学科知识图谱内存快照
+"""
+按学科缓存知识图谱，图谱读取与路径查询直接在内存中完成
+
+存储结构：
+- 知识点 ID 重映射为连续下标 0..n-1，名称、父节点按下标存放在数组中
+- 关系以 CSR（压缩稀疏行）存储：indptr[i]:indptr[i+1] 是下标 i 的出边区间，
+  indices / etype / weight 分别为终点下标、关系类型编号、强度；另存一份反向 CSR 用于查前驱
+- 增量修改（新增节点/关系、删除节点/关系）先记入增量表，删除用墓碑标记；
+  增量超过阈值时重新压缩为 CSR
+
+快照首次访问时从数据库加载（节点取自 knowledge_points，关系取自 Neo4j），
+之后由创建/修改/删除知识点、创建关系、移动知识点等操作通过 graph_snapshots 的钩子增量更新；
+KG_SNAPSHOT_TTL 秒后重新加载，以兜底其他进程的写入。
+"""
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import SUBJECT_TAG_PREFIX, cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (源知识点ID, 目标知识点ID, 关系类型, 强度)
+EdgeRow = Tuple[int, int, str, Optional[float]]
+
+# 增量表规模超过 max(COMPACT_MIN_DELTA, 边数 / COMPACT_RATIO) 时重新压缩
+COMPACT_MIN_DELTA = 256
+COMPACT_RATIO = 8
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """按源下标分组，返回 (indptr, 排序后的边序号)"""
+    order = np.argsort(src, kind="stable")
+    counts = np.bincount(src, minlength=n) if n else np.zeros(0, dtype=np.int64)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, order
+
+
+class SubjectGraph:
+    """单个学科的知识图谱（CSR + 增量表）"""
+
+    def __init__(
+        self,
+        subject_id: int,
+        nodes: Iterable[Tuple[int, str, Optional[int]]] = (),
+        edges: Iterable[EdgeRow] = (),
+    ) -> None:
+        """
+        Args:
+            subject_id: 学科ID
+            nodes: (知识点ID, 名称, 父知识点ID)
+            edges: (源ID, 目标ID, 关系类型, 强度)，端点不在 nodes 中的关系被忽略
+        """
+        self.subject_id = subject_id
+        self.version = 0
+        self._types: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._ids: List[int] = []
+        self._names: List[str] = []
+        self._parent_ids: List[Optional[int]] = []
+        self._alive: List[bool] = []
+        self._index: Dict[int, int] = {}
+        for node_id, name, parent_id in nodes:
+            self._append_node(node_id, name, parent_id)
+        self._compact(self._edge_arrays(edges))
+
+    # ------------------------------------------------------------------ 构建
+
+    def _append_node(self, node_id: int, name: str, parent_id: Optional[int]) -> int:
+        idx = len(self._ids)
+        self._ids.append(node_id)
+        self._names.append(name)
+        self._parent_ids.append(parent_id)
+        self._alive.append(True)
+        self._index[node_id] = idx
+        return idx
+
+    def _type_code(self, rel_type: str) -> int:
+        code = self._type_codes.get(rel_type)
+        if code is None:
+            code = self._type_codes[rel_type] = len(self._types)
+            self._types.append(rel_type)
+        return code
+
+    def _edge_arrays(self, edges: Iterable[EdgeRow]):
+        src, dst, etype, weight = [], [], [], []
+        seen = set()
+        for source, target, rel_type, strength in edges:
+            s, t = self._index.get(source), self._index.get(target)
+            if s is None or t is None:
+                continue
+            code = self._type_code(rel_type)
+            if (s, t, code) in seen:
+                continue
+            seen.add((s, t, code))
+            src.append(s)
+            dst.append(t)
+            etype.append(code)
+            weight.append(1.0 if strength is None else strength)
+        return (
+            np.asarray(src, dtype=np.int32),
+            np.asarray(dst, dtype=np.int32),
+            np.asarray(etype, dtype=np.int16),
+            np.asarray(weight, dtype=np.float32),
+        )
+
+    def _compact(self, arrays=None) -> None:
+        """把增量表合并进 CSR，并回收已删除节点的下标"""
+        if arrays is None:
+            rows = list(self._iter_edge_indices())
+            live = [i for i in range(len(self._ids)) if self._alive[i]]
+            remap = np.full(len(self._ids), -1, dtype=np.int32)
+            remap[live] = np.arange(len(live), dtype=np.int32)
+            self._ids = [self._ids[i] for i in live]
+            self._names = [self._names[i] for i in live]
+            self._parent_ids = [self._parent_ids[i] for i in live]
+            self._alive = [True] * len(live)
+            self._index = {node_id: i for i, node_id in enumerate(self._ids)}
+            arrays = (
+                remap[np.asarray([r[0] for r in rows], dtype=np.int32)],
+                remap[np.asarray([r[1] for r in rows], dtype=np.int32)],
+                np.asarray([r[2] for r in rows], dtype=np.int16),
+                np.asarray([r[3] for r in rows], dtype=np.float32),
+            )
+        src, dst, etype, weight = arrays
+        n = len(self._ids)
+        self._indptr, order = _csr(n, src, dst)
+        self._indices, self._etype, self._weight = dst[order], etype[order], weight[order]
+        self._rindptr, rorder = _csr(n, dst, src)
+        self._rindices, self._retype = src[rorder], etype[rorder]
+        self._csr_nodes = n
+        self._delta_out: Dict[int, List[Tuple[int, int, float]]] = {}
+        self._delta_in: Dict[int, List[Tuple[int, int]]] = {}
+        self._removed: set = set()
+        self._delta_size = 0
+        self._tombstones = 0
+
+    def _maybe_compact(self) -> None:
+        if self._delta_size + self._tombstones > max(COMPACT_MIN_DELTA, len(self._indices) // COMPACT_RATIO):
+            self._compact()
+
+    # ------------------------------------------------------------------ 读取
+
+    @property
+    def node_count(self) -> int:
+        return len(self._index)
+
+    @property
+    def edge_count(self) -> int:
+        return sum(1 for _ in self._iter_edge_indices())
+
+    @property
+    def rel_types(self) -> List[str]:
+        return list(self._types)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self._index
+
+    def _codes(self, rel_types: Optional[Sequence[str]]) -> Optional[set]:
+        if rel_types is None:
+            return None
+        return {self._type_codes[t] for t in rel_types if t in self._type_codes}
+
+    def _out(self, idx: int, codes: Optional[set] = None) -> Iterator[Tuple[int, int, float]]:
+        if idx < self._csr_nodes:
+            start, end = self._indptr[idx], self._indptr[idx + 1]
+            for t, c, w in zip(self._indices[start:end].tolist(), self._etype[start:end].tolist(),
+                               self._weight[start:end].tolist()):
+                if self._alive[t] and (codes is None or c in codes) and (idx, t, c) not in self._removed:
+                    yield t, c, w
+        for t, c, w in self._delta_out.get(idx, ()):
+            if self._alive[t] and (codes is None or c in codes):
+                yield t, c, w
+
+    def _in(self, idx: int, codes: Optional[set] = None) -> Iterator[int]:
+        if idx < self._csr_nodes:
+            start, end = self._rindptr[idx], self._rindptr[idx + 1]
+            for s, c in zip(self._rindices[start:end].tolist(), self._retype[start:end].tolist()):
+                if self._alive[s] and (codes is None or c in codes) and (s, idx, c) not in self._removed:
+                    yield s
+        for s, c in self._delta_in.get(idx, ()):
+            if self._alive[s] and (codes is None or c in codes):
+                yield s
+
+    def _iter_edge_indices(self, codes: Optional[set] = None) -> Iterator[Tuple[int, int, int, float]]:
+        for s in range(len(self._ids)):
+            if self._alive[s]:
+                for t, c, w in self._out(s, codes):
+                    yield s, t, c, w
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        """全部知识点（按加载/创建顺序）"""
+        return [
+            {"id": self._ids[i], "name": self._names[i], "parent_id": self._parent_ids[i]}
+            for i in range(len(self._ids))
+            if self._alive[i]
+        ]
+
+    def edges(self, rel_types: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """关系列表，rel_types 为空时返回全部类型"""
+        return [
+            {"source": self._ids[s], "target": self._ids[t], "type": self._types[c], "strength": w}
+            for s, t, c, w in self._iter_edge_indices(self._codes(rel_types))
+        ]
+
+    def name_of(self, node_id: int) -> Optional[str]:
+        idx = self._index.get(node_id)
+        return None if idx is None else self._names[idx]
+
+    def parent_of(self, node_id: int) -> Optional[int]:
+        idx = self._index.get(node_id)
+        return None if idx is None else self._parent_ids[idx]
+
+    def successors(self, node_id: int, rel_types: Optional[Sequence[str]] = None) -> List[int]:
+        idx = self._index.get(node_id)
+        if idx is None:
+            return []
+        return [self._ids[t] for t, _, _ in self._out(idx, self._codes(rel_types))]
+
+    def predecessors(self, node_id: int, rel_types: Optional[Sequence[str]] = None) -> List[int]:
+        idx = self._index.get(node_id)
+        if idx is None:
+            return []
+        return [self._ids[s] for s in self._in(idx, self._codes(rel_types))]
+
+    def has_edge(self, source_id: int, target_id: int, rel_type: str) -> bool:
+        s, t = self._index.get(source_id), self._index.get(target_id)
+        code = self._type_codes.get(rel_type)
+        if s is None or t is None or code is None:
+            return False
+        return any(dst == t for dst, _, _ in self._out(s, {code}))
+
+    def shortest_path(
+        self, source_id: int, target_id: int, rel_types: Optional[Sequence[str]] = None
+    ) -> Optional[List[int]]:
+        """沿关系方向的最短路径（边数最少），不可达时返回 None"""
+        s, t = self._index.get(source_id), self._index.get(target_id)
+        if s is None or t is None:
+            return None
+        codes = self._codes(rel_types)
+        prev = {s: -1}
+        queue = deque([s])
+        while queue:
+            cur = queue.popleft()
+            if cur == t:
+                path = []
+                while cur != -1:
+                    path.append(self._ids[cur])
+                    cur = prev[cur]
+                return path[::-1]
+            for nxt, _, _ in self._out(cur, codes):
+                if nxt not in prev:
+                    prev[nxt] = cur
+                    queue.append(nxt)
+        return None
+
+    def topological_order(
+        self,
+        rel_types: Optional[Sequence[str]] = None,
+        key: Optional[Callable[[int], Any]] = None,
+    ) -> List[int]:
+        """
+        拓扑序（关系起点排在终点之前），同一层可选节点按 key(知识点ID) 升序
+
+        成环部分无法排序，按 key 顺序追加在末尾。
+        """
+        codes = self._codes(rel_types)
+        key = key or (lambda node_id: node_id)
+        live = [i for i in range(len(self._ids)) if self._alive[i]]
+        indegree = {i: 0 for i in live}
+        for s in live:
+            for t, _, _ in self._out(s, codes):
+                indegree[t] += 1
+        heap = [(key(self._ids[i]), self._ids[i], i) for i in live if indegree[i] == 0]
+        heapq.heapify(heap)
+        order: List[int] = []
+        while heap:
+            _, node_id, idx = heapq.heappop(heap)
+            order.append(node_id)
+            for t, _, _ in self._out(idx, codes):
+                indegree[t] -= 1
+                if indegree[t] == 0:
+                    heapq.heappush(heap, (key(self._ids[t]), self._ids[t], t))
+        if len(order) < len(live):
+            placed = set(order)
+            order.extend(sorted((self._ids[i] for i in live if self._ids[i] not in placed), key=key))
+        return order
+
+    def to_dict(self, rel_types: Optional[Sequence[str]] = ("RELATES_TO",)) -> Dict[str, List[Dict[str, Any]]]:
+        """图谱接口的返回结构：nodes(id, name) 与 edges(source, target, strength)"""
+        return {
+            "nodes": [{"id": node["id"], "name": node["name"]} for node in self.nodes()],
+            "edges": [
+                {"source": edge["source"], "target": edge["target"], "strength": edge["strength"]}
+                for edge in self.edges(rel_types)
+            ],
+        }
+
+    # ------------------------------------------------------------------ 增量修改
+
+    def add_node(self, node_id: int, name: str, parent_id: Optional[int] = None) -> None:
+        idx = self._index.get(node_id)
+        if idx is not None:
+            self._names[idx] = name
+            self._parent_ids[idx] = parent_id
+        else:
+            self._append_node(node_id, name, parent_id)
+        self.version += 1
+
+    def update_node(self, node_id: int, name: Optional[str] = None) -> None:
+        idx = self._index.get(node_id)
+        if idx is not None and name is not None:
+            self._names[idx] = name
+            self.version += 1
+
+    def set_parent(self, node_id: int, parent_id: Optional[int]) -> None:
+        idx = self._index.get(node_id)
+        if idx is not None:
+            self._parent_ids[idx] = parent_id
+            self.version += 1
+
+    def remove_node(self, node_id: int) -> None:
+        """删除节点及其关系；按 parent_id 级联删除的子节点也一并移除"""
+        if node_id not in self._index:
+            return
+        pending = [node_id]
+        while pending:
+            current = pending.pop()
+            idx = self._index.pop(current, None)
+            if idx is None:
+                continue
+            self._alive[idx] = False
+            self._tombstones += 1
+            pending.extend(self._ids[i] for i, p in enumerate(self._parent_ids) if p == current and self._alive[i])
+        self.version += 1
+        self._maybe_compact()
+
+    def add_edge(self, source_id: int, target_id: int, rel_type: str, strength: Optional[float] = None) -> bool:
+        """新增关系（已存在则忽略），端点不在本图中时返回 False"""
+        s, t = self._index.get(source_id), self._index.get(target_id)
+        if s is None or t is None:
+            return False
+        if self.has_edge(source_id, target_id, rel_type):
+            return True
+        code = self._type_code(rel_type)
+        self._delta_out.setdefault(s, []).append((t, code, 1.0 if strength is None else float(strength)))
+        self._delta_in.setdefault(t, []).append((s, code))
+        self._delta_size += 1
+        self.version += 1
+        self._maybe_compact()
+        return True
+
+    def remove_edge(self, source_id: int, target_id: int, rel_type: str) -> bool:
+        """删除关系，不存在时返回 False"""
+        if not self.has_edge(source_id, target_id, rel_type):
+            return False
+        s, t, code = self._index[source_id], self._index[target_id], self._type_codes[rel_type]
+        delta = self._delta_out.get(s, [])
+        if any(dst == t and c == code for dst, c, _ in delta):
+            self._delta_out[s] = [entry for entry in delta if not (entry[0] == t and entry[1] == code)]
+            self._delta_in[t] = [entry for entry in self._delta_in[t] if entry != (s, code)]
+            self._delta_size -= 1
+        else:
+            self._removed.add((s, t, code))
+            self._tombstones += 1
+        self.version += 1
+        self._maybe_compact()
+        return True
+
+
+async def load_subject_graph(subject_id: int, db: AsyncSession) -> SubjectGraph:
+    """从数据库加载学科图谱：节点取自 knowledge_points，关系取自 Neo4j（不可用时退回关系型表）"""
+    from app.models.knowledge_point import KnowledgePoint, KnowledgePointRelationship
+
+    rows = (
+        await db.execute(
+            select(KnowledgePoint.id, KnowledgePoint.name, KnowledgePoint.parent_id)
+            .where(KnowledgePoint.subject_id == subject_id)
+            .order_by(KnowledgePoint.id)
+        )
+    ).all()
+    try:
+        from app.db.neo4j_utils import get_subject_relations
+
+        edges = await get_subject_relations(subject_id)
+    except Exception as e:
+        logger.warning("学科 %s 的图谱关系读取 Neo4j 失败，改用关系型表: %s", subject_id, e)
+        ids = [row[0] for row in rows]
+        result = await db.execute(
+            select(
+                KnowledgePointRelationship.source_id,
+                KnowledgePointRelationship.target_id,
+                KnowledgePointRelationship.relationship_type,
+                KnowledgePointRelationship.weight,
+            ).where(
+                KnowledgePointRelationship.source_id.in_(ids),
+                KnowledgePointRelationship.is_active.is_(True),
+            )
+        ) if ids else None
+        edges = [
+            (source, target, rel_type.value.upper(), weight)
+            for source, target, rel_type, weight in (result.all() if result is not None else [])
+        ]
+    return SubjectGraph(subject_id, rows, edges)
+
+
+class GraphSnapshotStore:
+    """
+    学科图谱快照注册表（按学科 LRU，带过期时间）
+
+    写操作钩子只更新本进程的快照；其他进程的写入通过缓存的学科标签失效广播得知
+    （on_tags_invalidated），收到后丢弃对应学科的快照，下次访问时重新加载
+    """
+
+    def __init__(self, loader=load_subject_graph, ttl: Optional[int] = None, max_subjects: Optional[int] = None):
+        self._loader = loader
+        self._ttl = settings.KG_SNAPSHOT_TTL if ttl is None else ttl
+        self._max_subjects = settings.KG_SNAPSHOT_MAX_SUBJECTS if max_subjects is None else max_subjects
+        self._graphs: "OrderedDict[int, Tuple[SubjectGraph, float]]" = OrderedDict()
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # 失效计数：加载期间学科被失效时，加载结果只返回给本次调用，不保存
+        self._epoch = 0
+        self._generations: Dict[int, int] = {}
+
+    def _generation(self, subject_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(subject_id, 0)
+
+    def peek(self, subject_id: int) -> Optional[SubjectGraph]:
+        """已加载且未过期的快照，不触发加载"""
+        entry = self._graphs.get(subject_id)
+        if entry is None:
+            return None
+        graph, loaded_at = entry
+        if self._ttl and time.monotonic() - loaded_at > self._ttl:
+            self._graphs.pop(subject_id, None)
+            return None
+        return graph
+
+    async def get(self, subject_id: int, db: AsyncSession) -> SubjectGraph:
+        """获取学科快照，未加载时从数据库加载（同一学科的并发请求只加载一次）"""
+        graph = self.peek(subject_id)
+        if graph is not None:
+            self._graphs.move_to_end(subject_id)
+            return graph
+        lock = self._locks.setdefault(subject_id, asyncio.Lock())
+        async with lock:
+            graph = self.peek(subject_id)
+            if graph is None:
+                started = time.perf_counter()
+                generation = self._generation(subject_id)
+                graph = await self._loader(subject_id, db)
+                logger.info(
+                    "学科 %s 图谱快照已加载：%s 个节点，%s 条关系，耗时 %.1f ms",
+                    subject_id, graph.node_count, graph.edge_count, (time.perf_counter() - started) * 1000,
+                )
+                if self._generation(subject_id) != generation:
+                    return graph
+                self._graphs[subject_id] = (graph, time.monotonic())
+                while len(self._graphs) > self._max_subjects:
+                    evicted, _ = self._graphs.popitem(last=False)
+                    self._locks.pop(evicted, None)
+                    self._generations.pop(evicted, None)
+            self._graphs.move_to_end(subject_id)
+            return graph
+
+    def invalidate(self, subject_id: Optional[int] = None) -> None:
+        """丢弃快照（subject_id 为空时丢弃全部），下次访问时重新加载"""
+        if subject_id is None:
+            self._graphs.clear()
+            self._generations.clear()
+            self._epoch += 1
+        else:
+            self._graphs.pop(subject_id, None)
+            self._generations[subject_id] = self._generations.get(subject_id, 0) + 1
+
+    def on_tags_invalidated(self, tags: Optional[Sequence[str]]) -> None:
+        """其他进程失效了缓存标签（tags 为 None 表示可能漏收消息）：丢弃相关学科的快照"""
+        if tags is None:
+            self.invalidate()
+            return
+        for tag in tags:
+            if tag.startswith(SUBJECT_TAG_PREFIX):
+                try:
+                    self.invalidate(int(tag[len(SUBJECT_TAG_PREFIX):]))
+                except ValueError:
+                    continue
+
+    def _find(self, node_id: int, subject_id: Optional[int] = None) -> Optional[SubjectGraph]:
+        if subject_id is not None:
+            graph = self.peek(subject_id)
+            return graph if graph is not None and node_id in graph else None
+        for graph, _ in self._graphs.values():
+            if node_id in graph:
+                return graph
+        return None
+
+    # ------------------------------------------------------------------ 写操作钩子
+    # 快照未加载时无需处理，下次访问会加载到最新数据
+
+    def knowledge_point_created(self, subject_id: int, node_id: int, name: str, parent_id: Optional[int] = None) -> None:
+        graph = self.peek(subject_id)
+        if graph is not None:
+            graph.add_node(node_id, name, parent_id)
+
+    def knowledge_point_updated(self, node_id: int, name: Optional[str] = None, subject_id: Optional[int] = None) -> None:
+        graph = self._find(node_id, subject_id)
+        if graph is not None:
+            graph.update_node(node_id, name=name)
+
+    def knowledge_point_deleted(self, node_id: int, subject_id: Optional[int] = None) -> None:
+        graph = self._find(node_id, subject_id)
+        if graph is not None:
+            graph.remove_node(node_id)
+
+    def knowledge_point_moved(self, node_id: int, new_parent_id: Optional[int], subject_id: Optional[int] = None) -> None:
+        graph = self._find(node_id, subject_id)
+        if graph is not None:
+            graph.set_parent(node_id, new_parent_id)
+
+    def relations_created(self, relations: Iterable[Dict[str, Any]]) -> None:
+        """
+        Args:
+            relations: 与 create_typed_relations_bulk 的输入相同（source_id、target_id、rel_type、strength）
+        """
+        for rel in relations:
+            graph = self._find(rel["source_id"])
+            if graph is not None:
+                rel_type = (rel.get("rel_type") or "RELATES_TO").strip().upper()
+                graph.add_edge(rel["source_id"], rel["target_id"], rel_type, rel.get("strength"))
+
+    def relations_deleted(self, relations: Iterable[Dict[str, Any]]) -> None:
+        for rel in relations:
+            graph = self._find(rel["source_id"])
+            if graph is not None:
+                rel_type = (rel.get("rel_type") or "RELATES_TO").strip().upper()
+                graph.remove_edge(rel["source_id"], rel["target_id"], rel_type)
+
+
+graph_snapshots = GraphSnapshotStore()
+cache.add_invalidation_listener(graph_snapshots.on_tags_invalidated)
@@ -1,11 +1,13 @@
-from typing import Any, Dict, List, Optional
-from sqlalchemy import select, insert, delete
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from sqlalchemy import Row, and_, exists, or_, select, insert, text
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.knowledge_point import (
     KnowledgePoint,
     knowledge_point_closure,
 )
-from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from app.utils.knowledge_point_identifiers import (
     generate_knowledge_point_code,
@@ -121,21 +123,93 @@ async def _get_ancestor_ids(session: AsyncSession, node_id: int) -> List[int]:
     return [row[0] for row in res.fetchall()]
 
 
+# 递归展开 parent 链的深度上限：parent_id 中存在环时让语句以主键冲突失败，而不是无限递归
+MAX_TREE_DEPTH = 1000
+
+
+@lru_cache(maxsize=8)
+def closure_sql(nodes: str = "knowledge_points", closure: str = "knowledge_point_closure") -> Dict[str, Any]:
+    """
+    闭包表维护语句（按表名缓存，基准测试使用独立的表）
+
+    - detach：删除子树外的祖先到子树内节点的关系，子树内部的关系保留
+    - attach：新父节点的每个祖先（含自身）× 子树内每个节点，depth = 两段之和 + 1
+    - subtree_paths / all_paths：按闭包表重新计算 path、depth
+    - rebuild：沿 parent_id 递归展开，一条 INSERT ... SELECT 写入整张闭包表
+    """
+    paths = f"""
+        UPDATE {nodes} AS n SET depth = agg.depth, path = agg.path
+        FROM (
+            SELECT c.descendant_id AS id, count(*) AS depth,
+                   string_agg(c.ancestor_id::text, '/' ORDER BY c.depth DESC) AS path
+            FROM {closure} AS c
+            {{scope}}
+            GROUP BY c.descendant_id
+        ) AS agg
+        WHERE n.id = agg.id AND (n.depth IS DISTINCT FROM agg.depth OR n.path IS DISTINCT FROM agg.path)
+    """
+    return {
+        "is_descendant": text(
+            f"SELECT EXISTS (SELECT 1 FROM {closure} WHERE ancestor_id = :node_id AND descendant_id = :target_id)"
+        ),
+        "detach": text(
+            f"""
+            DELETE FROM {closure} AS c
+            USING {closure} AS sub, {closure} AS sup
+            WHERE sub.ancestor_id = :node_id AND c.descendant_id = sub.descendant_id
+              AND sup.descendant_id = :node_id AND sup.ancestor_id <> :node_id
+              AND c.ancestor_id = sup.ancestor_id
+            """
+        ),
+        "attach": text(
+            f"""
+            INSERT INTO {closure} (ancestor_id, descendant_id, depth)
+            SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+            FROM {closure} AS sup CROSS JOIN {closure} AS sub
+            WHERE sup.descendant_id = :parent_id AND sub.ancestor_id = :node_id
+            """
+        ),
+        "subtree_paths": text(paths.format(
+            scope=f"JOIN {closure} AS s ON s.descendant_id = c.descendant_id WHERE s.ancestor_id = :node_id"
+        )),
+        "all_paths": text(paths.format(scope="")),
+        "clear": text(f"DELETE FROM {closure}"),
+        "rebuild": text(
+            f"""
+            WITH RECURSIVE chain (ancestor_id, descendant_id, depth) AS (
+                SELECT id, id, 0 FROM {nodes}
+                UNION ALL
+                SELECT n.parent_id, chain.descendant_id, chain.depth + 1
+                FROM chain JOIN {nodes} AS n ON n.id = chain.ancestor_id
+                WHERE n.parent_id IS NOT NULL AND chain.depth < {MAX_TREE_DEPTH}
+            )
+            INSERT INTO {closure} (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, descendant_id, depth FROM chain
+            """
+        ),
+    }
+
+
 async def move_knowledge_point(
     session: AsyncSession, node_id: int, new_parent_id: Optional[int]
 ) -> Optional[KnowledgePoint]:
     """将节点移动到 new_parent_id。
     会检测环（不能把节点移动到自己的子孙）。
+    闭包表只更新被移动子树相关的行：先断开子树与原祖先的关系，再接到新父节点的祖先链上，
+    最后重新计算子树内节点的 path/depth。
     """
     kp = await session.get(KnowledgePoint, node_id)
     if not kp:
         raise ValueError(f"知识点 {node_id} 不存在")
+    if kp.parent_id == new_parent_id:
+        return kp
 
+    sql = closure_sql()
     # 若 new_parent_id 为 None，则允许成为根
     if new_parent_id is not None:
-        # 检查 new_parent 是否是 node 的后代，若是则会产生环
-        descendants = await _get_descendant_ids(session, node_id)
-        if new_parent_id in descendants:
+        # 检查 new_parent 是否是 node 的后代（含自身），若是则会产生环
+        res = await session.execute(sql["is_descendant"], {"node_id": node_id, "target_id": new_parent_id})
+        if res.scalar():
             raise ValueError("无法将节点移动到其子孙节点，会形成环")
 
         # 检查 new_parent 是否存在
@@ -145,11 +219,13 @@ async def move_knowledge_point(
 
     kp.parent_id = new_parent_id
     kp.updated_at = datetime.utcnow()
-    await session.flush()  # 触发 before_update/after_update 事件以维护闭包/path/depth
-    await session.refresh(kp)
-    # 简化实现：移动后重建整个闭包表，确保数据正确
-    await rebuild_closure(session)
     await session.flush()
+
+    await session.execute(sql["detach"], {"node_id": node_id})
+    if new_parent_id is not None:
+        await session.execute(sql["attach"], {"node_id": node_id, "parent_id": new_parent_id})
+    await session.execute(sql["subtree_paths"], {"node_id": node_id})
+    await session.refresh(kp)
     return kp
 
 
@@ -174,114 +250,189 @@ async def delete_knowledge_point(
     return True
 
 
-async def get_subtree(session: AsyncSession, node_id: int) -> List[Dict[str, Any]]:
-    """返回子树所有节点的 ORM 数据（按 depth 升序）。"""
-    stmt = select(KnowledgePoint).join(
-        knowledge_point_closure,
-        knowledge_point_closure.c.descendant_id == KnowledgePoint.id,
-    ).where(knowledge_point_closure.c.ancestor_id == node_id).order_by(knowledge_point_closure.c.depth)
+# 树查询只取这些列，不加载 ORM 实体及其关系
+TREE_COLUMNS = (
+    KnowledgePoint.id,
+    KnowledgePoint.name,
+    KnowledgePoint.parent_id,
+    KnowledgePoint.depth,
+    KnowledgePoint.path,
+)
+TREE_STREAM_BATCH = 1000
+
+
+class TreeResult(NamedTuple):
+    """树查询结果及其 ETag（按返回内容计算）"""
+    data: Any
+    etag: str
+
+
+def _path_key():
+    # path 按字节序比较："1/3" < "1/3/5" < "1/30"，子树在排序结果中连续，且父节点在子节点之前
+    return KnowledgePoint.path.collate("C")
+
+
+def _subtree_filter(root_path: str):
+    """物化路径前缀的范围条件：root 自身 + 以 "root_path/" 开头的所有节点（"0" 是 "/" 的下一个字符）"""
+    key = _path_key()
+    return or_(key == root_path, and_(key >= f"{root_path}/", key < f"{root_path}0"))
+
+
+def _has_children_column():
+    child = aliased(KnowledgePoint)
+    return exists().where(child.parent_id == KnowledgePoint.id).label("has_children")
+
+
+def _etag(digest) -> str:
+    return f'"{digest.hexdigest()}"'
+
+
+def _hash_row(digest, row: Sequence[Any]) -> None:
+    digest.update("\x1f".join("" if v is None else str(v) for v in row).encode())
+    digest.update(b"\n")
+
+
+async def _tree_root(session: AsyncSession, node_id: int) -> Optional[Row]:
+    res = await session.execute(select(*TREE_COLUMNS).where(KnowledgePoint.id == node_id))
+    return res.first()
+
+
+def _subtree_stmt(root: Row, max_depth: Optional[int] = None, with_has_children: bool = False):
+    columns = list(TREE_COLUMNS) + ([_has_children_column()] if with_has_children else [])
+    if root.path:
+        stmt = select(*columns).where(_subtree_filter(root.path)).order_by(_path_key())
+    else:
+        # 历史数据未维护 path 时退回闭包表（按层级深度排序，同样保证父节点在前）
+        stmt = select(*columns).join(
+            knowledge_point_closure,
+            knowledge_point_closure.c.descendant_id == KnowledgePoint.id,
+        ).where(knowledge_point_closure.c.ancestor_id == root.id).order_by(knowledge_point_closure.c.depth, KnowledgePoint.id)
+    if max_depth is not None:
+        stmt = stmt.where(KnowledgePoint.depth <= (root.depth or 1) + max_depth)
+    return stmt.execution_options(yield_per=TREE_STREAM_BATCH)
+
+
+def _tree_node(row: Sequence[Any], with_has_children: bool) -> Dict[str, Any]:
+    node = {"id": row[0], "name": row[1], "parent_id": row[2], "children": []}
+    if with_has_children:
+        node["has_children"] = bool(row[5])
+    return node
+
+
+class TreeAssembler:
+    """按 path 顺序逐行接收节点，一次遍历组装嵌套树（父节点总是先于子节点到达）"""
+
+    def __init__(self, root_id: int, with_has_children: bool = False) -> None:
+        self.root_id = root_id
+        self.with_has_children = with_has_children
+        self.root: Optional[Dict[str, Any]] = None
+        self._nodes: Dict[int, Dict[str, Any]] = {}
+
+    def add(self, row: Sequence[Any]) -> None:
+        node = _tree_node(row, self.with_has_children)
+        self._nodes[node["id"]] = node
+        if node["id"] == self.root_id:
+            self.root = node
+            return
+        parent = self._nodes.get(node["parent_id"])
+        if parent is not None:
+            parent["children"].append(node)
+
+
+async def load_tree(
+    session: AsyncSession, root_id: int, max_depth: Optional[int] = None
+) -> Optional[TreeResult]:
+    """以 root_id 为根的嵌套树 {id, name, parent_id, children: [...]}。
+
+    max_depth 限制返回的层数（0 表示只返回根），此时每个节点带 has_children，
+    前端可按需调用 get_children 展开。
+    """
+    root = await _tree_root(session, root_id)
+    if root is None:
+        return None
+    with_has_children = max_depth is not None
+    assembler = TreeAssembler(root_id, with_has_children)
+    digest = hashlib.blake2b(digest_size=16)
+    result = await session.stream(_subtree_stmt(root, max_depth, with_has_children))
+    async for row in result:
+        _hash_row(digest, row)
+        assembler.add(row)
+    if assembler.root is None:
+        assembler.add(tuple(root) + (False,))
+    return TreeResult(assembler.root, _etag(digest))
+
+
+async def load_children(session: AsyncSession, node_id: int) -> TreeResult:
+    """直接子节点（懒加载展开树），每个节点带 has_children。"""
+    stmt = select(*TREE_COLUMNS, _has_children_column()).where(
+        KnowledgePoint.parent_id == node_id
+    ).order_by(_path_key(), KnowledgePoint.id)
     res = await session.execute(stmt)
-    rows = [r[0] for r in res.fetchall()]
-    return [
-        {
-            "id": n.id,
-            "name": n.name,
-            "parent_id": n.parent_id,
-            "path": n.path,
-            "depth": n.depth,
-        }
-        for n in rows
-    ]
+    digest = hashlib.blake2b(digest_size=16)
+    children = []
+    for row in res:
+        _hash_row(digest, row)
+        node = _tree_node(row, True)
+        node.update(path=row[4], depth=row[3])
+        children.append(node)
+    return TreeResult(children, _etag(digest))
+
+
+async def load_subtree(session: AsyncSession, node_id: int) -> Optional[TreeResult]:
+    """子树所有节点的扁平列表（先序，父节点在前）。"""
+    root = await _tree_root(session, node_id)
+    if root is None:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    nodes = []
+    result = await session.stream(_subtree_stmt(root))
+    async for row in result:
+        _hash_row(digest, row)
+        nodes.append({"id": row[0], "name": row[1], "parent_id": row[2], "path": row[4], "depth": row[3]})
+    return TreeResult(nodes, _etag(digest))
+
+
+async def get_subtree(session: AsyncSession, node_id: int) -> List[Dict[str, Any]]:
+    """返回子树所有节点（按 path 先序排列）。"""
+    result = await load_subtree(session, node_id)
+    return result.data if result else []
 
 
 async def get_ancestors(session: AsyncSession, node_id: int) -> List[Dict[str, Any]]:
-    stmt = select(KnowledgePoint).join(
-        knowledge_point_closure,
-        knowledge_point_closure.c.ancestor_id == KnowledgePoint.id,
-    ).where(knowledge_point_closure.c.descendant_id == node_id).order_by(knowledge_point_closure.c.depth)
+    """返回节点自身及其所有祖先（由近及远）。祖先 ID 直接取自 path。"""
+    root = await _tree_root(session, node_id)
+    if root is None:
+        return []
+    if root.path:
+        ids = [int(part) for part in root.path.split("/") if part]
+        stmt = select(*TREE_COLUMNS).where(KnowledgePoint.id.in_(ids)).order_by(KnowledgePoint.depth.desc())
+    else:
+        stmt = select(*TREE_COLUMNS).join(
+            knowledge_point_closure,
+            knowledge_point_closure.c.ancestor_id == KnowledgePoint.id,
+        ).where(knowledge_point_closure.c.descendant_id == node_id).order_by(knowledge_point_closure.c.depth)
     res = await session.execute(stmt)
-    rows = [r[0] for r in res.fetchall()]
-    return [
-        {"id": n.id, "name": n.name, "path": n.path, "depth": n.depth} for n in rows
-    ]
+    return [{"id": row[0], "name": row[1], "path": row[4], "depth": row[3]} for row in res]
 
 
-async def build_tree(session: AsyncSession, root_id: int) -> Dict[str, Any]:
-    """基于 parent_id 构建嵌套树结构（从 root_id 开始）。
+async def build_tree(session: AsyncSession, root_id: int, max_depth: Optional[int] = None) -> Dict[str, Any]:
+    """基于物化路径构建嵌套树结构（从 root_id 开始）。
 
-    返回字典：{id, name, children: [...]}，便于前端展示。
+    返回字典：{id, name, parent_id, children: [...]}，便于前端展示。
     """
-    # 获取子树节点（ORM 实例）
-    stmt = select(KnowledgePoint).join(
-        knowledge_point_closure,
-        knowledge_point_closure.c.descendant_id == KnowledgePoint.id,
-    ).where(knowledge_point_closure.c.ancestor_id == root_id).order_by(KnowledgePoint.depth)
-    res = await session.execute(stmt)
-    nodes = [r[0] for r in res.fetchall()]
-
-    # 映射 id->node
-    node_map: Dict[int, Dict[str, Any]] = {}
-    children_map: Dict[Optional[int], List[Dict[str, Any]]] = {}
-    for n in nodes:
-        node_map[n.id] = {"id": n.id, "name": n.name, "parent_id": n.parent_id, "children": []}
-        children_map.setdefault(n.parent_id, []).append(node_map[n.id])
-
-    # 连接父子
-    for nid, node in node_map.items():
-        node_parent = node.get("parent_id")
-        if node_parent in node_map:
-            node_map[node_parent]["children"].append(node)
-
-    # 返回根节点结构
-    root = node_map.get(root_id)
-    if not root:
-        # 如果 root 本身不存在，尝试加载 it
-        kp = await session.get(KnowledgePoint, root_id)
-        if not kp:
-            return {}
-        root = {"id": kp.id, "name": kp.name, "parent_id": kp.parent_id, "children": children_map.get(kp.id, [])}
-    return root
+    result = await load_tree(session, root_id, max_depth)
+    return result.data if result else {}
 
 
 async def rebuild_closure(session: AsyncSession) -> None:
-    """重建整个 closure 表（谨慎，建议离线或维护窗口运行）。
+    """重建整个 closure 表，并按新的闭包表修正所有节点的 path/depth。
 
-    算法：清空 closure，然后为每个节点插入自身->自身; 再基于 parent 指针逐层插入祖先关系。
-    适用于表不大或维护窗口场景。
+    用于修复数据（如批量导入绕过了服务层）；日常的插入与移动只增量维护闭包表。
     """
-    # 删除所有 existing 记录
-    await session.execute(delete(knowledge_point_closure))
-    await session.flush()
-
-    # 插入 self relations
-    stmt_self = insert(knowledge_point_closure).from_select(
-        ["ancestor_id", "descendant_id", "depth"],
-        select(KnowledgePoint.id, KnowledgePoint.id, 0),
-    )
-    await session.execute(stmt_self)
-    await session.flush()
-
-    # 为每个节点沿 parent 链插入祖先关系
-    # 取所有节点 id
-    res = await session.execute(select(KnowledgePoint.id, KnowledgePoint.parent_id))
-    rows = res.fetchall()
-    id_parent = {r[0]: r[1] for r in rows}
-
-    # 对每个节点，walk upward 插入 ancestor关系
-    for node_id, parent_id in id_parent.items():
-        current_parent = parent_id
-        depth = 1
-        values = []
-        while current_parent is not None:
-            values.append({"ancestor_id": current_parent, "descendant_id": node_id, "depth": depth})
-            depth += 1
-            current_parent = id_parent.get(current_parent)
-        if values:
-            try:
-                await session.execute(insert(knowledge_point_closure), values)
-            except IntegrityError:
-                # 忽略重复插入
-                pass
+    sql = closure_sql()
+    await session.execute(sql["clear"])
+    await session.execute(sql["rebuild"])
+    await session.execute(sql["all_paths"])
     await session.flush()
 
 
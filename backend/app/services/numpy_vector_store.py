@@ -0,0 +1,301 @@
+# 进程内向量存储（NumPy）
+# 向量按 用户 / 学科 分区，追加写入内存映射文件；查询时分块计算余弦相似度并用
+# argpartition 取 top-k。用于未安装 pgvector 的开发环境、测试与小租户，
+# 也作为 pgvector 召回率与延迟的对照基准。
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 结果行中保存的列（不含向量）
+ROW_COLUMNS = (
+    "id", "content", "title", "question_type", "difficulty", "source",
+    "subject_id", "user_id", "tags", "created_at",
+)
+# 可过滤的列（subject_id 由分区处理）
+FILTER_COLUMNS = ("question_type", "difficulty")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """按行归一化为单位向量，余弦相似度即点积"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    mask: Optional[np.ndarray] = None,
+    chunk_rows: int = 65536,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量余弦 top-k
+
+    matrix 与 queries 均为单位向量；matrix 分块参与计算，float16 存储的块
+    转为 float32 后再做矩阵乘法，内存占用与块大小成正比。
+
+    Returns:
+        (indices, scores)：形状均为 (查询数, k')，k' = min(k, 可选行数)，按相似度降序；
+        不足 k 个的位置 indices 为 -1、scores 为 -inf
+    """
+    n_queries = len(queries)
+    best_idx = np.full((n_queries, 0), -1, dtype=np.int64)
+    best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+    if k <= 0 or len(matrix) == 0:
+        return best_idx, best_scores
+    for start in range(0, len(matrix), chunk_rows):
+        chunk = np.asarray(matrix[start:start + chunk_rows], dtype=np.float32)
+        scores = queries @ chunk.T
+        if mask is not None:
+            scores[:, ~mask[start:start + len(chunk)]] = -np.inf
+        kk = min(k, scores.shape[1])
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        best_idx = np.concatenate([best_idx, part + start], axis=1)
+        best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+        if best_idx.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_idx = np.take_along_axis(best_idx, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_idx = np.take_along_axis(best_idx, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_idx[~np.isfinite(best_scores)] = -1
+    return best_idx, best_scores
+
+
+class _Partition:
+    """
+    一个 用户 / 学科 分区的三个追加文件：
+    - vectors.bin：单位向量矩阵（float32 / float16，行优先）
+    - ids.bin：int64 行 ID
+    - rows.jsonl：结果行（ROW_COLUMNS）
+
+    写入顺序为 向量 → ID → 行，读取时行数取三者的最小值，
+    被中断的半行写入不会被读到。其他进程追加的数据在下次 refresh 时增量读入。
+    """
+
+    def __init__(self, path: Path, dim: int, dtype: np.dtype) -> None:
+        self.path = path
+        self.dim = dim
+        self.dtype = dtype
+        self.vectors: np.ndarray = np.empty((0, dim), dtype=dtype)
+        self.ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self.rows: List[Dict[str, Any]] = []
+        self.columns: Dict[str, np.ndarray] = {col: np.empty(0, dtype=object) for col in FILTER_COLUMNS}
+        self._vector_bytes = -1
+        self._rows_offset = 0
+
+    @property
+    def count(self) -> int:
+        return min(len(self.vectors), len(self.ids), len(self.rows))
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def refresh(self) -> None:
+        vector_file = self._file("vectors.bin")
+        try:
+            vector_bytes = vector_file.stat().st_size
+        except FileNotFoundError:
+            return
+        if vector_bytes == self._vector_bytes and len(self.vectors) == len(self.ids) == len(self.rows):
+            return
+        row_bytes = self.dim * self.dtype.itemsize
+        n_vectors = vector_bytes // row_bytes
+        if n_vectors:
+            self.vectors = np.memmap(vector_file, dtype=self.dtype, mode="r", shape=(n_vectors, self.dim))
+        self._vector_bytes = vector_bytes
+
+        id_file = self._file("ids.bin")
+        if id_file.exists():
+            n_ids = id_file.stat().st_size // 8
+            if n_ids > len(self.ids):
+                with open(id_file, "rb") as fh:
+                    fh.seek(len(self.ids) * 8)
+                    new_ids = np.frombuffer(fh.read((n_ids - len(self.ids)) * 8), dtype=np.int64)
+                self.ids = np.concatenate([self.ids, new_ids])
+
+        row_file = self._file("rows.jsonl")
+        if row_file.exists():
+            with open(row_file, "rb") as fh:
+                fh.seek(self._rows_offset)
+                data = fh.read()
+            complete = data.rfind(b"\n") + 1
+            new_rows = [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
+            self._rows_offset += complete
+            if new_rows:
+                self.rows.extend(new_rows)
+                for col in FILTER_COLUMNS:
+                    values = np.empty(len(new_rows), dtype=object)
+                    values[:] = [row.get(col) for row in new_rows]
+                    self.columns[col] = np.concatenate([self.columns[col], values])
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray, rows: List[Dict[str, Any]]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self._file("vectors.bin"), "ab") as fh:
+            fh.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        with open(self._file("ids.bin"), "ab") as fh:
+            fh.write(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+        with open(self._file("rows.jsonl"), "a", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    def mask(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        active = {col: value for col, value in filters.items() if value is not None}
+        if not active:
+            return None
+        count = self.count
+        mask = np.ones(count, dtype=bool)
+        for col, value in active.items():
+            mask &= self.columns[col][:count] == value
+        return mask
+
+
+class NumpyVectorStore:
+    """
+    按 用户 / 学科 分区的 NumPy 向量存储
+
+    目录结构：<root>/u<user_id>/s<subject_id | none>/{vectors.bin, ids.bin, rows.jsonl}，
+    行 ID 由调用方提供（来自数据库），缺失时使用 <root>/next_id 计数器分配。
+    单进程内写入通过锁串行；多个进程可以同时读取同一目录。
+    """
+
+    def __init__(self, root_dir: str, dim: int = 1024, dtype: str = "float32", chunk_rows: int = 65536) -> None:
+        self.root = Path(root_dir)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype("float32"), np.dtype("float16")):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.chunk_rows = chunk_rows
+        self._partitions: Dict[Tuple[int, Optional[int]], _Partition] = {}
+        self._lock = threading.Lock()
+
+    def _partition_path(self, user_id: int, subject_id: Optional[int]) -> Path:
+        return self.root / f"u{int(user_id)}" / ("snone" if subject_id is None else f"s{int(subject_id)}")
+
+    def _partition(self, user_id: int, subject_id: Optional[int]) -> _Partition:
+        key = (int(user_id), None if subject_id is None else int(subject_id))
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = _Partition(self._partition_path(*key), self.dim, self.dtype)
+            self._partitions[key] = partition
+        return partition
+
+    def _user_partitions(self, user_id: int, subject_id: Optional[int]) -> List[_Partition]:
+        if subject_id is not None:
+            return [self._partition(user_id, subject_id)]
+        user_dir = self.root / f"u{int(user_id)}"
+        if not user_dir.is_dir():
+            return []
+        partitions = []
+        for path in sorted(user_dir.iterdir()):
+            if not path.is_dir() or not path.name.startswith("s"):
+                continue
+            name = path.name[1:]
+            partitions.append(self._partition(user_id, None if name == "none" else int(name)))
+        return partitions
+
+    def _allocate_ids(self, count: int, max_seen: int = 0) -> List[int]:
+        """分配 count 个新 ID，并保证计数器越过调用方提供的最大 ID"""
+        counter = self.root / "next_id"
+        next_id = int(counter.read_text().strip() or 1) if counter.exists() else 1
+        next_id = max(next_id, max_seen + 1)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = counter.with_name(f".next_id.{os.getpid()}.tmp")
+        tmp.write_text(str(next_id + count))
+        os.replace(tmp, counter)
+        return list(range(next_id, next_id + count))
+
+    def append(self, rows: Sequence[Dict[str, Any]], vectors: Optional[Iterable[Sequence[float]]] = None) -> List[int]:
+        """
+        追加行（rows 中的 embedding 列或单独传入的 vectors）
+
+        Returns:
+            List[int]: 每行的 ID（与输入顺序一致）
+        """
+        if not rows:
+            return []
+        if vectors is None:
+            vectors = [row["embedding"] for row in rows]
+        matrix = normalize_rows(np.asarray(list(vectors), dtype=np.float32))
+        if matrix.shape != (len(rows), self.dim):
+            raise ValueError(f"Expected {len(rows)} vectors of dim {self.dim}, got {matrix.shape}")
+        with self._lock:
+            given = [int(row["id"]) for row in rows if row.get("id") is not None]
+            allocated = iter(self._allocate_ids(len(rows) - len(given), max(given, default=0)))
+            ids = [row.get("id") if row.get("id") is not None else next(allocated) for row in rows]
+            groups: Dict[Tuple[int, Optional[int]], List[int]] = {}
+            for i, row in enumerate(rows):
+                groups.setdefault((row["user_id"], row.get("subject_id")), []).append(i)
+            for (user_id, subject_id), positions in groups.items():
+                self._partition(user_id, subject_id).append(
+                    np.asarray([ids[i] for i in positions], dtype=np.int64),
+                    matrix[positions],
+                    [dict({col: rows[i].get(col) for col in ROW_COLUMNS}, id=ids[i]) for i in positions],
+                )
+        return ids
+
+    def search_batch(
+        self,
+        queries: Sequence[Sequence[float]],
+        user_id: int,
+        subject_id: Optional[int] = None,
+        limit: int = 10,
+        **filters: Any,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量精确搜索：每个查询返回按相似度降序的结果行（含 similarity）
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unsupported filters: {sorted(unknown)}")
+        query_matrix = normalize_rows(np.asarray(queries, dtype=np.float32))
+        candidates: List[List[Tuple[float, int, _Partition]]] = [[] for _ in range(len(query_matrix))]
+        with self._lock:
+            partitions = self._user_partitions(user_id, subject_id)
+            for partition in partitions:
+                partition.refresh()
+        for partition in partitions:
+            count = partition.count
+            if not count:
+                continue
+            indices, scores = top_k(
+                partition.vectors[:count], query_matrix, limit, partition.mask(filters), self.chunk_rows
+            )
+            for qi in range(len(query_matrix)):
+                for idx, score in zip(indices[qi], scores[qi]):
+                    if idx >= 0:
+                        candidates[qi].append((float(score), int(idx), partition))
+        results = []
+        for found in candidates:
+            found.sort(key=lambda item: item[0], reverse=True)
+            results.append([dict(partition.rows[idx], similarity=score) for score, idx, partition in found[:limit]])
+        return results
+
+    def search(
+        self,
+        query: Sequence[float],
+        user_id: int,
+        subject_id: Optional[int] = None,
+        limit: int = 10,
+        **filters: Any,
+    ) -> List[Dict[str, Any]]:
+        return self.search_batch([query], user_id, subject_id, limit, **filters)[0]
+
+    def count(self, user_id: int, subject_id: Optional[int] = None) -> int:
+        with self._lock:
+            partitions = self._user_partitions(user_id, subject_id)
+            for partition in partitions:
+                partition.refresh()
+        return sum(partition.count for partition in partitions)
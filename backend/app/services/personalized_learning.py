@@ -1,41 +1,62 @@
-from typing import List, Dict
-import networkx as nx
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.knowledge_point import KnowledgePoint
-from app.models.user_progress import UserProgress
+from app.services.knowledge_graph_snapshot import SubjectGraph, graph_snapshots
+
+# 学习顺序依据的关系：起点应先于终点学习
+PREREQUISITE_TYPES = ("PREREQUISITE", "CONTAINS")
+MASTERED_THRESHOLD = 0.8  # 掌握度达到该值视为已掌握
+MINUTES_PER_POINT = 30  # 每个知识点的预计学习时长（分钟）
+MILESTONE_SIZE = 5  # 每个里程碑包含的知识点数
+
 
 class PersonalizedLearningPath:
     async def generate_path(
         self,
         user_id: int,
         subject_id: int,
-        db: AsyncSession
+        db: AsyncSession,
+        progress: Optional[Dict[int, float]] = None,
     ) -> Dict:
-        # 构建知识图谱
-        G = nx.DiGraph()
-        
-        # 获取用户当前掌握度
-        user_progress = await self._get_user_progress(user_id, subject_id, db)
-        
-        # 获取知识点依赖关系
-        knowledge_points = await self._get_knowledge_dependencies(subject_id, db)
-        
+        """
+        基于学科图谱快照生成学习路径
+
+        Args:
+            progress: 知识点ID -> 掌握度(0-1)，未提供时视为全部未掌握
+        """
+        graph = await graph_snapshots.get(subject_id, db)
+        progress = progress or {}
+
         # 构建学习路径
-        path = self._build_learning_path(knowledge_points, user_progress)
-        
+        path = self._build_learning_path(graph, progress)
+
         return {
             "learning_path": path,
             "estimated_duration": self._calculate_duration(path),
-            "prerequisites": self._get_prerequisites(path),
+            "prerequisites": self._get_prerequisites(graph, path),
             "milestones": self._generate_milestones(path)
         }
 
-    def _build_learning_path(self, knowledge_points: List, progress: Dict) -> List:
-        """基于知识点依赖关系和用户进度构建最优学习路径"""
-        return sorted(
-            knowledge_points,
-            key=lambda x: (
-                self._calculate_priority(x, progress),
-                -progress.get(x.id, 0)
-            )
+    def _build_learning_path(self, graph: SubjectGraph, progress: Dict[int, float]) -> List[Dict]:
+        """基于知识点依赖关系和用户进度构建学习路径：先修在前，同层掌握度低的优先"""
+        order = graph.topological_order(
+            PREREQUISITE_TYPES, key=lambda node_id: progress.get(node_id, 0.0)
         )
+        return [
+            {"id": node_id, "name": graph.name_of(node_id), "mastery": progress.get(node_id, 0.0)}
+            for node_id in order
+            if progress.get(node_id, 0.0) < MASTERED_THRESHOLD
+        ]
+
+    def _calculate_duration(self, path: List[Dict]) -> int:
+        """预计学习时长（分钟）"""
+        return len(path) * MINUTES_PER_POINT
+
+    def _get_prerequisites(self, graph: SubjectGraph, path: List[Dict]) -> Dict[int, List[int]]:
+        """路径中各知识点的直接先修知识点"""
+        return {item["id"]: graph.predecessors(item["id"], PREREQUISITE_TYPES) for item in path}
+
+    def _generate_milestones(self, path: List[Dict]) -> List[Dict]:
+        return [
+            {"index": i // MILESTONE_SIZE + 1, "knowledge_point_ids": [item["id"] for item in path[i:i + MILESTONE_SIZE]]}
+            for i in range(0, len(path), MILESTONE_SIZE)
+        ]
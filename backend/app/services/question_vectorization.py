@@ -1,15 +1,79 @@
 # 试题向量化服务
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional
+import asyncio
 import json
 from datetime import datetime
-from langchain_ollama import OllamaEmbeddings
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from pgvector.sqlalchemy import Vector
+from app.core.config import settings
 from app.models.VectorStore import QuestionVector, QuestionVectorCreate
+from app.services.embedding_cache import get_cached_embeddings
 from app.services.exam_parser.core import Question
+from app.services.text_search import index_tokens
+from app.services.vector_backends import get_vector_backend
+
+# 初始化本地 Ollama 嵌入模型（带向量缓存）
+embeddings = get_cached_embeddings("bge-m3")
+
+def _question_embed_text(parsed_question: Question) -> str:
+    """构建试题内容用于向量化"""
+    return f"""
+标题: {parsed_question.题号 or '未命名'}
+内容: {parsed_question.内容}
+类型: {parsed_question.题型}
+来源: {parsed_question.来源}
+材料: {parsed_question.材料}
+""".strip()
+
+
+def _question_vector_values(
+    parsed_question: Question,
+    embedding: List[float],
+    user_id: int,
+    subject_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """QuestionVector 的列值"""
+    title = f"题目 {parsed_question.题号}" if parsed_question.题号 else "导入题目"
+    return {
+        "content": parsed_question.内容,
+        "embedding": embedding,
+        "title": title,
+        "question_type": parsed_question.题型,
+        "difficulty": 3,  # 默认中等难度
+        "source": parsed_question.来源,
+        "subject_id": subject_id,
+        "user_id": user_id,
+        "tags": json.dumps([], ensure_ascii=False),  # 默认为空数组
+        "created_at": datetime.now().isoformat(),
+        "search_tokens": index_tokens(title, parsed_question.内容),  # 关键词检索用的分词结果
+    }
+
+
+async def embed_texts(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[List[float]]:
+    """
+    批量生成向量嵌入
+
+    文本按 batch_size 分块调用 embed_documents，每块在线程池中执行，
+    避免阻塞事件循环；同时进行的请求数不超过 max_concurrency。
+    返回的向量顺序与输入文本一致。
+    """
+    if not texts:
+        return []
+    batch_size = max(1, batch_size or settings.EMBEDDING_BATCH_SIZE)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY))
+
+    async def _embed_chunk(chunk: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await asyncio.to_thread(embeddings.embed_documents, chunk)
+
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(_embed_chunk(chunk) for chunk in chunks))
+    return [vector for chunk_vectors in results for vector in chunk_vectors]
 
-# 初始化本地 Ollama 嵌入模型
-embeddings = OllamaEmbeddings(model="bge-m3", base_url="http://localhost:11434")
 
 async def vectorize_question(
     parsed_question: Question,
@@ -27,40 +91,22 @@ async def vectorize_question(
     Returns:
         QuestionVector: 向量化的试题对象
     """
-    # 构建试题内容用于向量化
-    content_to_embed = f"""
-标题: {parsed_question.题号 or '未命名'}
-内容: {parsed_question.内容}
-类型: {parsed_question.题型}
-来源: {parsed_question.来源}
-材料: {parsed_question.材料}
-""".strip()
-
-    # 生成向量嵌入
-    embedding = embeddings.embed_query(content_to_embed)
-
-    # 构建标签字符串
-    tags_str = json.dumps([], ensure_ascii=False)  # 默认为空数组
+    # 生成向量嵌入（在线程池中执行，不阻塞事件循环）
+    embedding = await asyncio.to_thread(embeddings.embed_query, _question_embed_text(parsed_question))
 
     # 创建QuestionVector对象
-    question_vector = QuestionVector(
-        content=parsed_question.内容,
-        embedding=embedding,
-        title=f"题目 {parsed_question.题号}" if parsed_question.题号 else "导入题目",
-        question_type=parsed_question.题型,
-        difficulty=3,  # 默认中等难度
-        source=parsed_question.来源,
-        subject_id=subject_id,
-        user_id=user_id,
-        tags=tags_str,
-        created_at=datetime.now().isoformat()
-    )
+    values = await asyncio.to_thread(_question_vector_values, parsed_question, embedding, user_id, subject_id)
+    question_vector = QuestionVector(**values)
 
     # 如果提供了数据库会话，保存到数据库
-    if db:
+    backend = get_vector_backend()
+    if db and backend.uses_database:
         db.add(question_vector)
         await db.flush()  # 获取ID但不提交
         await db.refresh(question_vector)
+    elif not backend.uses_database:
+        # 非数据库后端：追加到后端自身的向量存储
+        question_vector.id = (await backend.add([values]))[0]
 
     return question_vector
 
@@ -73,6 +119,9 @@ async def vectorize_questions_batch(
     """
     批量向量化试题
 
+    向量由 embed_texts 分块并发生成，所有 QuestionVector 行通过一条
+    INSERT ... RETURNING 语句写入，不再逐行 flush/refresh。
+
     Args:
         parsed_questions: 解析出的试题列表
         user_id: 用户ID
@@ -80,28 +129,44 @@ async def vectorize_questions_batch(
         db: 数据库会话
 
     Returns:
-        List[QuestionVector]: 向量化的试题列表
+        List[QuestionVector]: 向量化的试题列表（顺序与输入一致）
     """
-    question_vectors = []
+    if not parsed_questions:
+        return []
 
-    for parsed_question in parsed_questions:
-        question_vector = await vectorize_question(
-            parsed_question=parsed_question,
-            user_id=user_id,
-            subject_id=subject_id,
-            db=db
-        )
-        question_vectors.append(question_vector)
+    vectors = await embed_texts([_question_embed_text(q) for q in parsed_questions])
+    # 分词（jieba）为 CPU 计算，放到线程池中执行
+    rows = await asyncio.to_thread(lambda: [
+        _question_vector_values(q, vector, user_id, subject_id)
+        for q, vector in zip(parsed_questions, vectors)
+    ])
 
-    return question_vectors
+    backend = get_vector_backend()
+    if not backend.uses_database:
+        ids = await backend.add(rows)
+        return [QuestionVector(**row, id=row_id) for row, row_id in zip(rows, ids)]
+
+    if not db:
+        return [QuestionVector(**row) for row in rows]
+
+    # insertmanyvalues 保证 RETURNING 的行顺序与参数顺序一致
+    result = await db.scalars(
+        insert(QuestionVector).returning(QuestionVector, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.all())
 
 async def search_similar_questions(
     query: str,
     user_id: int,
     subject_id: Optional[int] = None,
     limit: int = 10,
-    db: AsyncSession = None
-) -> List[QuestionVector]:
+    db: AsyncSession = None,
+    ef_search: Optional[int] = None,
+    question_type: Optional[str] = None,
+    difficulty: Optional[int] = None,
+    strategy: str = "auto"
+) -> List[Mapping[str, Any]]:
     """
     语义搜索相似试题
 
@@ -111,54 +176,31 @@ async def search_similar_questions(
         subject_id: 学科ID（可选）
         limit: 返回结果数量
         db: 数据库会话
+        ef_search: HNSW 查询候选列表大小（默认 settings.VECTOR_EF_SEARCH，不小于 limit）
+        question_type: 题型过滤（可选）
+        difficulty: 难度过滤（可选）
+        strategy: pgvector 后端的过滤策略 pre / post / auto。auto 先做一次有上限的计数，
+            命中行数不超过 VECTOR_PREFILTER_MAX_ROWS 时用 pre（精确），否则用 post（索引）；
+            post 结果不足 limit 时回退到 pre
 
     Returns:
-        List[QuestionVector]: 相似的试题列表
+        List[Mapping]: 按相似度降序的结果行（含 similarity，不含向量数据）
     """
-    if not db:
+    backend = get_vector_backend()
+    if backend.uses_database and not db:
         return []
 
-    # 生成查询向量
-    query_embedding = embeddings.embed_query(query)
-
-    # 构建查询
-    from sqlalchemy import text
+    # 生成查询向量（常用查询直接命中向量缓存）
+    query_embedding = await asyncio.to_thread(embeddings.embed_query, query)
 
-    # 将向量转换为字符串格式
-    embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-
-    # 使用pgvector的相似度搜索
-    similarity_query = f"""
-        SELECT id, content, title, question_type, difficulty, source, subject_id, user_id, tags, created_at,
-               1 - (embedding <=> '{embedding_str}'::vector(1024)) as similarity
-        FROM question_vectors
-        WHERE user_id = {user_id}
-        {"AND subject_id = " + str(subject_id) if subject_id is not None else ""}
-        ORDER BY embedding <=> '{embedding_str}'::vector(1024)
-        LIMIT {limit}
-    """
-
-    result = await db.execute(text(similarity_query))
-
-    # 获取结果并转换为QuestionVector对象
-    rows = result.fetchall()
-    similar_questions = []
-
-    for row in rows:
-        # 创建QuestionVector对象（不包含embedding以节省内存）
-        question_vector = QuestionVector(
-            id=row[0],
-            content=row[1],
-            embedding=[],  # 不返回向量数据
-            title=row[2],
-            question_type=row[3],
-            difficulty=row[4],
-            source=row[5],
-            subject_id=row[6],
-            user_id=row[7],
-            tags=row[8],
-            created_at=row[9]
-        )
-        similar_questions.append(question_vector)
-
-    return similar_questions
\ No newline at end of file
+    return await backend.search(
+        query_embedding,
+        user_id,
+        subject_id=subject_id,
+        limit=limit,
+        db=db,
+        ef_search=ef_search,
+        strategy=strategy,
+        question_type=question_type,
+        difficulty=difficulty
+    )
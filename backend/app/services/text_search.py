@@ -0,0 +1,158 @@
+# 中文全文检索
+"""
+基于 jieba 分词的 PostgreSQL 倒排索引
+
+PostgreSQL 内置解析器不能切分中文，因此分词在应用侧完成：
+- 写入时 index_tokens 用搜索引擎模式（cut_for_search）分词，以空格连接写入 search_tokens 列，
+  数据库端由生成列 search_vector = to_tsvector('simple', search_tokens) 建 GIN 索引
+- 查询时 query_tokens 用精确模式分词，plainto_tsquery('simple', ...) 要求所有词都出现；
+  精确模式的词都包含在搜索引擎模式的结果中，因此能命中索引
+
+已有数据的分词通过命令行回填（在 backend 目录下）：
+    python -m app.services.text_search backfill --table questions
+    python -m app.services.text_search backfill --table question_vectors --batch-size 2000
+"""
+import argparse
+import asyncio
+import html
+import logging
+import re
+import threading
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import func, or_, text
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = "simple"
+
+# 表名 -> 参与分词的列
+TEXT_SEARCH_TABLES = {
+    "questions": ("title", "content"),
+    "question_vectors": ("title", "content"),
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_jieba = None
+_jieba_lock = threading.Lock()
+
+
+def _get_jieba():
+    """延迟加载 jieba（首次分词时加载词典约需 1 秒）"""
+    global _jieba
+    if _jieba is None:
+        with _jieba_lock:
+            if _jieba is None:
+                import jieba
+
+                jieba.setLogLevel(logging.WARNING)
+                jieba.initialize()
+                _jieba = jieba
+    return _jieba
+
+
+def _clean(text_value: Optional[str]) -> str:
+    """去除 HTML 标签与实体，全角/半角统一并转小写"""
+    if not text_value:
+        return ""
+    cleaned = html.unescape(_TAG_RE.sub(" ", text_value))
+    return unicodedata.normalize("NFKC", cleaned).lower()
+
+
+def _keep(token: str) -> bool:
+    token = token.strip()
+    return bool(token) and any(ch.isalnum() for ch in token)
+
+
+def index_tokens(*texts: Optional[str]) -> str:
+    """写入索引的分词结果（空格分隔，保留重复词以便排序时计算词频）"""
+    jieba = _get_jieba()
+    tokens: List[str] = []
+    for value in texts:
+        cleaned = _clean(value)
+        if cleaned:
+            tokens.extend(token.strip() for token in jieba.cut_for_search(cleaned) if _keep(token))
+    return " ".join(tokens)
+
+
+def query_tokens(keyword: Optional[str]) -> str:
+    """查询词的分词结果（空格分隔、去重）"""
+    cleaned = _clean(keyword)
+    if not cleaned:
+        return ""
+    tokens = dict.fromkeys(token.strip() for token in _get_jieba().cut(cleaned) if _keep(token))
+    return " ".join(tokens)
+
+
+def keyword_condition(model, keyword: str):
+    """
+    关键词过滤条件：命中 search_vector 的 GIN 索引
+
+    查询词分词后为空（例如只有标点）时退回 title / content 的 ilike。
+    """
+    tokens = query_tokens(keyword)
+    if not tokens:
+        return or_(model.title.ilike(f"%{keyword}%"), model.content.ilike(f"%{keyword}%"))
+    return model.search_vector.op("@@")(func.plainto_tsquery(TEXT_SEARCH_CONFIG, tokens))
+
+
+def keyword_rank(model, keyword: str):
+    """关键词相关度（ts_rank_cd），与 keyword_condition 配合用于排序"""
+    return func.ts_rank_cd(model.search_vector, func.plainto_tsquery(TEXT_SEARCH_CONFIG, query_tokens(keyword)))
+
+
+async def backfill_search_tokens(engine, table: str, batch_size: int = 1000, rebuild: bool = False) -> int:
+    """
+    按 id 分批回填 search_tokens
+
+    默认只处理 search_tokens 为空的行；rebuild=True 时重新分词所有行。
+    """
+    if table not in TEXT_SEARCH_TABLES:
+        raise ValueError(f"不支持的表: {table}")
+    columns = ", ".join(TEXT_SEARCH_TABLES[table])
+    pending = "" if rebuild else "AND search_tokens IS NULL"
+    select_sql = text(
+        f"SELECT id, {columns} FROM {table} WHERE id > :after {pending} ORDER BY id LIMIT :limit"
+    )
+    update_sql = text(f"UPDATE {table} SET search_tokens = :tokens WHERE id = :id")
+    after, total = 0, 0
+    while True:
+        async with engine.begin() as conn:
+            rows = (await conn.execute(select_sql, {"after": after, "limit": batch_size})).all()
+            if not rows:
+                break
+            params = await asyncio.to_thread(
+                lambda: [{"id": row[0], "tokens": index_tokens(*row[1:])} for row in rows]
+            )
+            await conn.execute(update_sql, params)
+        after = rows[-1][0]
+        total += len(rows)
+        logger.info("%s: 已回填 %s 行（id <= %s）", table, total, after)
+    return total
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="中文全文检索索引维护")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="回填 search_tokens 分词列")
+    backfill.add_argument("--table", choices=sorted(TEXT_SEARCH_TABLES), action="append", help="表名，可重复；默认全部")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.add_argument("--rebuild", action="store_true", help="重新分词所有行（更新词典后使用）")
+    return parser
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from app.db.session import engine
+
+    try:
+        for table in args.table or sorted(TEXT_SEARCH_TABLES):
+            total = await backfill_search_tokens(engine, table, args.batch_size, args.rebuild)
+            print(f"{table}: {total} 行")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    asyncio.run(_main(build_arg_parser().parse_args()))
@@ -0,0 +1,204 @@
+# 试题向量搜索后端
+# - pgvector：在 PostgreSQL 中搜索（默认）
+# - numpy：进程内精确搜索（见 numpy_vector_store），用于未安装 pgvector 的开发环境、
+#   测试与小租户，也作为 pgvector 的对照基准
+# 通过 settings.VECTOR_SEARCH_BACKEND 选择。
+# 关键词 / 混合搜索读取 question_vectors 表，只能与写入该表的后端（pgvector）一起使用。
+import abc
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.vector_index import set_ef_search
+
+logger = logging.getLogger(__name__)
+
+# 向量搜索返回的列（不含 embedding）
+VECTOR_SEARCH_COLUMNS = (
+    "id, content, title, question_type, difficulty, source, subject_id, user_id, tags, created_at"
+)
+# 可下推到向量搜索的过滤列
+VECTOR_SEARCH_FILTERS = ("subject_id", "question_type", "difficulty")
+
+
+@lru_cache(maxsize=64)
+def vector_search_sql(strategy: str, filters: Tuple[str, ...], table: str = "question_vectors"):
+    """
+    生成向量搜索语句（按 策略 + 过滤列组合 缓存）
+
+    所有取值（查询向量、用户、过滤值、limit）均为绑定参数，语句文本固定，
+    asyncpg 在每个连接上只 prepare 一次；查询向量只作为一个参数 :q 传输。
+
+    - pre：先按过滤条件取出候选行，再对候选行精确计算距离排序，适合过滤后行数较少的情况
+    - post：走 HNSW 索引按距离扫描，扫描过程中应用过滤条件，适合过滤条件不够选择性的情况
+    """
+    where = " AND ".join(["user_id = :user_id"] + [f"{column} = :{column}" for column in filters])
+    if strategy == "pre":
+        sql = f"""
+            WITH candidates AS MATERIALIZED (
+                SELECT {VECTOR_SEARCH_COLUMNS}, embedding FROM {table} WHERE {where}
+            )
+            SELECT {VECTOR_SEARCH_COLUMNS}, 1 - (embedding <=> :q) AS similarity
+            FROM candidates
+            ORDER BY embedding <=> :q
+            LIMIT :limit
+        """
+    elif strategy == "post":
+        sql = f"""
+            SELECT {VECTOR_SEARCH_COLUMNS}, 1 - (embedding <=> :q) AS similarity
+            FROM {table}
+            WHERE {where}
+            ORDER BY embedding <=> :q
+            LIMIT :limit
+        """
+    else:
+        raise ValueError(f"Unknown vector search strategy: {strategy}")
+    return text(sql).bindparams(bindparam("q", type_=Vector(1024)))
+
+
+@lru_cache(maxsize=16)
+def _filtered_count_sql(filters: Tuple[str, ...], table: str = "question_vectors"):
+    where = " AND ".join(["user_id = :user_id"] + [f"{column} = :{column}" for column in filters])
+    return text(f"SELECT count(*) FROM (SELECT 1 FROM {table} WHERE {where} LIMIT :cap) AS matched")
+
+
+class VectorSearchBackend(abc.ABC):
+    """
+    向量搜索后端接口
+
+    uses_database 为 True 时试题向量写入 question_vectors 表，由数据库负责搜索；
+    否则由后端自身保存 add 传入的行，question_vectors 表为空，关键词 / 混合搜索不可用
+    （require_database_backend 会报错，而不是静默丢掉关键词一路）。
+    """
+
+    name = ""
+    uses_database = True
+
+    async def add(self, rows: Sequence[Dict[str, Any]]) -> List[Optional[int]]:
+        """保存新写入的试题向量行（含 embedding），返回每行的 ID"""
+        return [row.get("id") for row in rows]
+
+    @abc.abstractmethod
+    async def search(
+        self,
+        query_embedding: List[float],
+        user_id: int,
+        subject_id: Optional[int] = None,
+        limit: int = 10,
+        db: Optional[AsyncSession] = None,
+        ef_search: Optional[int] = None,
+        strategy: str = "auto",
+        **filters: Any
+    ) -> List[Mapping[str, Any]]:
+        """按余弦相似度降序返回结果行（含 similarity，不含向量数据）"""
+
+
+class PgvectorBackend(VectorSearchBackend):
+    """pgvector 搜索：先过滤 / 后过滤两种策略，auto 按过滤后的行数选择"""
+
+    name = "pgvector"
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        user_id: int,
+        subject_id: Optional[int] = None,
+        limit: int = 10,
+        db: Optional[AsyncSession] = None,
+        ef_search: Optional[int] = None,
+        strategy: str = "auto",
+        **filters: Any
+    ) -> List[Mapping[str, Any]]:
+        if not db:
+            return []
+
+        filter_values = dict(filters, subject_id=subject_id)
+        columns = tuple(column for column in VECTOR_SEARCH_FILTERS if filter_values.get(column) is not None)
+        params: Dict[str, Any] = {column: filter_values[column] for column in columns}
+        params["user_id"] = user_id
+
+        if strategy == "auto":
+            cap = settings.VECTOR_PREFILTER_MAX_ROWS
+            matched = (await db.execute(_filtered_count_sql(columns), {**params, "cap": cap + 1})).scalar_one()
+            strategy = "pre" if matched <= cap else "post"
+            if matched == 0:
+                return []
+
+        search_params = {**params, "q": query_embedding, "limit": limit}
+        if strategy == "post":
+            # HNSW 最多返回 ef_search 个候选且过滤在扫描后进行，按 limit 放大候选数
+            overfetch = limit * settings.VECTOR_POSTFILTER_OVERFETCH
+            await set_ef_search(db, max(ef_search or settings.VECTOR_EF_SEARCH, overfetch))
+            rows = (await db.execute(vector_search_sql("post", columns), search_params)).mappings().all()
+            if len(rows) >= limit:
+                return list(rows)
+            logger.debug("向量搜索后过滤结果不足 %s 条，回退到先过滤", limit)
+
+        return list((await db.execute(vector_search_sql("pre", columns), search_params)).mappings().all())
+
+
+class NumpyBackend(VectorSearchBackend):
+    """进程内 NumPy 精确搜索，向量保存在 settings.VECTOR_NUMPY_DIR 下的内存映射文件中"""
+
+    name = "numpy"
+    uses_database = False
+
+    def __init__(self, store=None) -> None:
+        if store is None:
+            from app.services.numpy_vector_store import NumpyVectorStore
+
+            store = NumpyVectorStore(settings.VECTOR_NUMPY_DIR, dim=1024, dtype=settings.VECTOR_NUMPY_DTYPE)
+        self.store = store
+
+    async def add(self, rows: Sequence[Dict[str, Any]]) -> List[Optional[int]]:
+        return await asyncio.to_thread(self.store.append, list(rows))
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        user_id: int,
+        subject_id: Optional[int] = None,
+        limit: int = 10,
+        db: Optional[AsyncSession] = None,
+        ef_search: Optional[int] = None,
+        strategy: str = "auto",
+        **filters: Any
+    ) -> List[Mapping[str, Any]]:
+        active = {column: value for column, value in filters.items() if value is not None}
+        return await asyncio.to_thread(self.store.search, query_embedding, user_id, subject_id, limit, **active)
+
+
+VECTOR_BACKENDS = {
+    PgvectorBackend.name: PgvectorBackend,
+    NumpyBackend.name: NumpyBackend,
+}
+
+_backend: Optional[VectorSearchBackend] = None
+
+
+def get_vector_backend() -> VectorSearchBackend:
+    """获取 settings.VECTOR_SEARCH_BACKEND 指定的向量搜索后端（进程内单例）"""
+    global _backend
+    if _backend is None or _backend.name != settings.VECTOR_SEARCH_BACKEND:
+        backend_cls = VECTOR_BACKENDS.get(settings.VECTOR_SEARCH_BACKEND)
+        if backend_cls is None:
+            raise ValueError(f"Unknown vector search backend: {settings.VECTOR_SEARCH_BACKEND}")
+        _backend = backend_cls()
+    return _backend
+
+
+def require_database_backend(feature: str) -> VectorSearchBackend:
+    """feature 依赖 question_vectors 表时调用：当前后端不写入该表则报错"""
+    backend = get_vector_backend()
+    if not backend.uses_database:
+        raise RuntimeError(
+            f"{feature} requires a database vector backend (question_vectors); "
+            f"VECTOR_SEARCH_BACKEND={backend.name} does not write that table"
+        )
+    return backend
@@ -1,5 +1,6 @@
 # Celery 任务配置和定义
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 # 创建Celery应用实例
@@ -18,3 +19,12 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
 )
+
+
+@worker_process_init.connect
+def warm_up_exam_parser_models(**kwargs):
+    """每个 worker 进程启动时预加载 OCR/版面模型，避免首个任务承担加载开销"""
+    if not settings.EXAM_PARSER_WARMUP:
+        return
+    from app.services.exam_parser.registry import warm_up_models
+    warm_up_models(settings.EXAM_PARSER_OCR_LANGS, use_layout=settings.EXAM_PARSER_USE_LAYOUT)
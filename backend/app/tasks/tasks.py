@@ -3,6 +3,8 @@ from app.tasks.celery_tasks import celery_app
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from app.core.config import settings
+from app.db.pool import engine_pool_kwargs
+from celery.signals import worker_process_init
 from app.models.question import Question
 from app.services.exam_parser import parse_pdf, parse_docx, parse_image
 from typing import Optional
@@ -10,13 +12,20 @@ import tempfile
 import os
 import shutil
 
-# 创建同步数据库引擎（用于Celery任务）
+# 创建同步数据库引擎（用于Celery任务，连接池规模与 background 池一致）
 sync_engine = create_engine(
     str(settings.DATABASE_URL).replace("postgresql+asyncpg://", "postgresql://"),
-    pool_pre_ping=True,
+    **engine_pool_kwargs(settings, "background", is_async=False),
 )
 SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
+
+@worker_process_init.connect
+def _reset_sync_pool(**kwargs):
+    """prefork 子进程不能复用父进程打开的连接，fork 后丢弃继承的连接池"""
+    sync_engine.dispose(close=False)
+
+
 @celery_app.task(bind=True)
 def process_file_import_task(self, file_path: str, file_type: str, user_id: int, subject_id: Optional[int] = None):
     """Celery任务：处理文件导入"""
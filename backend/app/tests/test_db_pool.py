@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from app.db.pool import TimedQueuePool, engine_pool_kwargs, get_pool_metrics, pool_stats, render_prometheus
+
+
+def _settings(**overrides):
+    values = dict(
+        DB_USE_NULLPOOL=False,
+        DB_POOL_SIZE=1,
+        DB_MAX_OVERFLOW=0,
+        DB_BACKGROUND_POOL_SIZE=1,
+        DB_BACKGROUND_MAX_OVERFLOW=0,
+        DB_POOL_TIMEOUT=0.05,
+        DB_POOL_RECYCLE=1800,
+        DB_POOL_PRE_PING=False,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_engine_pool_kwargs_per_workload():
+    settings = _settings(DB_POOL_SIZE=10, DB_BACKGROUND_POOL_SIZE=3)
+    assert engine_pool_kwargs(settings, "api")["pool_size"] == 10
+    background = engine_pool_kwargs(settings, "background", is_async=False)
+    assert background["pool_size"] == 3
+    assert background["poolclass"] is TimedQueuePool
+    assert engine_pool_kwargs(_settings(DB_USE_NULLPOOL=True))["poolclass"] is NullPool
+    with pytest.raises(ValueError):
+        engine_pool_kwargs(settings, "reports")
+
+
+def test_checkout_wait_and_timeouts_are_recorded(tmp_path):
+    kwargs = engine_pool_kwargs(_settings(), "background", is_async=False)
+    kwargs["pool_logging_name"] = "test_pool"
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **kwargs)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            # 连接池已满，第二次取连接等待 pool_timeout 后超时
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        stats = pool_stats()["test_pool"]
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.05
+        assert stats["size"] == 1 and stats["checked_out"] == 0
+        assert 'db_pool_checkout_wait_seconds_count{pool="test_pool"} 2' in render_prometheus()
+    finally:
+        engine.dispose()
+        assert get_pool_metrics("test_pool").count == 2
@@ -0,0 +1,63 @@
+import pytest
+
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def test_cached_embeddings_reuses_vectors(tmp_path):
+    fake = FakeEmbeddings()
+    cached = CachedEmbeddings(fake, model="bge-m3", cache=EmbeddingCache(str(tmp_path), max_entries=10))
+
+    assert cached.embed_documents(["函数", "极限", "函数"]) == [[2.0, 0.5], [2.0, 0.5], [2.0, 0.5]]
+    assert fake.calls == [["函数", "极限"]]
+    # 归一化后相同的文本命中缓存
+    assert cached.embed_query("  函数 ") == [2.0, 0.5]
+    assert len(fake.calls) == 1
+
+    # 新进程只有持久层
+    fresh = CachedEmbeddings(fake, model="bge-m3", cache=EmbeddingCache(str(tmp_path), max_entries=10))
+    assert fresh.embed_query("极限") == [2.0, 0.5]
+    assert len(fake.calls) == 1
+    assert fresh.cache.stats()["disk_hits"] == 1
+
+
+def test_embedding_cache_key_depends_on_model():
+    assert EmbeddingCache.make_key("bge-m3", "a  b") == EmbeddingCache.make_key("bge-m3", "a b")
+    assert EmbeddingCache.make_key("bge-m3", "a") != EmbeddingCache.make_key("other", "a")
+
+
+def test_embedding_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, [1.0])
+    assert cache.get("a") is None
+    assert cache.get("c") == [1.0]
+
+
+def test_cached_embeddings_rejects_short_batches(tmp_path):
+    class ShortEmbeddings(FakeEmbeddings):
+        def embed_documents(self, texts):
+            return super().embed_documents(texts)[:-1]
+
+    cached = CachedEmbeddings(ShortEmbeddings(), model="bge-m3", cache=EmbeddingCache(str(tmp_path)))
+    with pytest.raises(ValueError):
+        cached.embed_documents(["函数", "极限"])
+
+
+def test_embedding_cache_disk_budget(tmp_path):
+    # 每条 4 个 float32 = 16 字节，预算 40 字节最多保留两条
+    cache = EmbeddingCache(str(tmp_path), max_entries=0, max_bytes=40)
+    for key in ("a1", "b2", "c3"):
+        cache.put(key, [1.0] * 4)
+        cache.put(key, [2.0] * 4)  # 覆盖写入不重复计入大小
+    assert cache.stats()["evictions"] >= 1
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*.f32")) <= 40
+    assert cache.get("c3") == [2.0] * 4
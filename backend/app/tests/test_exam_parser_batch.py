@@ -0,0 +1,56 @@
+import os
+
+from app.services.exam_parser import batch
+from app.services.exam_parser.core import Question
+
+
+def _fake_parse_document(file_path, img_dir, **kwargs):
+    name = os.path.basename(file_path)
+    if name.startswith("bad"):
+        raise ValueError("broken file")
+    if name.startswith("crash"):
+        os._exit(3)
+    return [Question(内容=f"1. {name}", 来源=name, 题号=1)]
+
+
+def _make_files(tmp_path, names):
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in names:
+        (src / name).write_bytes(b"x")
+    return str(src)
+
+
+def test_parse_directory_isolates_failures_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "parse_document", _fake_parse_document)
+    src = _make_files(tmp_path, ["a.pdf", "bad.docx", "c.docx", "notes.txt"])
+    manifest = str(tmp_path / "manifest.jsonl")
+
+    questions = batch.parse_directory(src, str(tmp_path / "img"), manifest_path=manifest)
+    assert [q.来源 for q in questions] == ["a.pdf", "c.docx"]
+    records = batch.load_manifest(manifest)
+    assert records[os.path.join(src, "bad.docx")]["status"] == "failed"
+
+    calls = []
+
+    def _counting_parse(file_path, img_dir, **kwargs):
+        calls.append(os.path.basename(file_path))
+        return _fake_parse_document(file_path, img_dir, **kwargs)
+
+    monkeypatch.setattr(batch, "parse_document", _counting_parse)
+    questions = batch.parse_directory(src, str(tmp_path / "img"), manifest_path=manifest, resume=True)
+    assert calls == ["bad.docx"]
+    assert [q.来源 for q in questions] == ["a.pdf", "c.docx"]
+
+
+def test_parse_directory_survives_worker_crash(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "parse_document", _fake_parse_document)
+    monkeypatch.setattr(batch, "WORKER_POLL_SECONDS", 0.1)
+    src = _make_files(tmp_path, ["a.pdf", "crash.pdf", "c.docx", "d.docx"])
+    manifest = str(tmp_path / "manifest.jsonl")
+
+    questions = batch.parse_directory(src, str(tmp_path / "img"), workers=2, manifest_path=manifest)
+    assert [q.来源 for q in questions] == ["a.pdf", "c.docx", "d.docx"]
+    crashed = batch.load_manifest(manifest)[os.path.join(src, "crash.pdf")]
+    assert crashed["status"] == "failed"
+    assert "exited" in crashed["error"]
@@ -0,0 +1,37 @@
+from app.services.exam_parser.cache import OCRResultCache, entries_from_cache, entries_to_cache
+
+
+def test_ocr_cache_roundtrip(tmp_path):
+    cache = OCRResultCache(str(tmp_path))
+    key = OCRResultCache.make_key("ocr", OCRResultCache.content_digest(b"page"), zoom=2.0, lang="ch")
+    assert cache.get(key) is None
+    entries = [("1. 题目", (1.0, 2.0, 3.0, 4.0))]
+    cache.put(key, entries_to_cache(entries))
+    assert entries_from_cache(cache.get(key)) == entries
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ocr_cache_key_depends_on_params():
+    digest = OCRResultCache.content_digest(b"page")
+    assert OCRResultCache.make_key("ocr", digest, lang="ch") != OCRResultCache.make_key("ocr", digest, lang="en")
+    assert OCRResultCache.make_key("ocr", digest, zoom=1.0) != OCRResultCache.make_key("ocr", digest, zoom=2.0)
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    cache = OCRResultCache(str(tmp_path), max_bytes=200)
+    keys = [OCRResultCache.make_key("ocr", str(i)) for i in range(10)]
+    for key in keys:
+        cache.put(key, [["x" * 20, [0, 0, 1, 1]]])
+    assert cache.stats()["size_bytes"] <= 200
+    assert cache.stats()["evictions"] > 0
+
+
+def test_ocr_cache_overwrite_keeps_size_accurate(tmp_path):
+    cache = OCRResultCache(str(tmp_path), max_bytes=10_000)
+    cache.put("a" * 64, {"text": "x" * 100})
+    cache.put("b" * 64, {"text": "y"})
+    for _ in range(5):
+        cache.put("a" * 64, {"text": "x" * 100})
+    assert cache._size == cache._scan_size()
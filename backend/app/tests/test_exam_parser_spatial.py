@@ -0,0 +1,35 @@
+import random
+
+from app.services.exam_parser.parsers.pdf import RegionIndex, _match_marker, assign_image_by_region
+from app.services.exam_parser.spatial import SpatialIndex
+
+
+def _random_box(rng, size=200.0):
+    x0 = rng.uniform(0, 1500)
+    y0 = rng.uniform(0, 2200)
+    return (x0, y0, x0 + rng.uniform(0, size), y0 + rng.uniform(0, size))
+
+
+def test_spatial_index_matches_brute_force():
+    rng = random.Random(1)
+    boxes = [_random_box(rng) for _ in range(300)]
+    index = SpatialIndex(boxes)
+    for _ in range(200):
+        x0, y0, x1, y1 = _random_box(rng, size=600.0)
+        expected = [i for i, (bx0, by0, bx1, by1) in enumerate(boxes) if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0]
+        assert index.query(x0, y0, x1, y1) == expected
+        assert index.query_y(y0, y1) == [i for i, b in enumerate(boxes) if b[1] <= y1 and b[3] >= y0]
+
+
+def test_indexed_image_assignment_matches_linear_scan():
+    rng = random.Random(2)
+    for _ in range(50):
+        regions = {qn: _random_box(rng, size=400.0) for qn in rng.sample(range(1, 200), 30)}
+        markers = [(rng.randint(1, 30), _random_box(rng, size=40.0)) for _ in range(20)]
+        region_index = RegionIndex(regions)
+        marker_index = SpatialIndex(bbox for _, bbox in markers)
+        for _ in range(20):
+            image = _random_box(rng)
+            cx, cy = (image[0] + image[2]) / 2, (image[1] + image[3]) / 2
+            assert assign_image_by_region(cx, cy, regions, region_index) == assign_image_by_region(cx, cy, regions)
+            assert _match_marker(image, markers, 200.0, marker_index) == _match_marker(image, markers, 200.0)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.exam_parser import utils
+from app.services.exam_parser.core import Question
+
+
+def test_aiter_questions_cancelled_mid_parse(monkeypatch):
+    started, release, closed = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_iter(input_path, img_dir, **kwargs):
+        try:
+            yield Question(内容="1. first", 来源=input_path, 题号=1)
+            started.set()
+            release.wait(5)
+            yield Question(内容="2. second", 来源=input_path, 题号=2)
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(utils, "iter_questions", slow_iter)
+
+    async def consume(seen):
+        async for question in utils.aiter_questions("paper.pdf", "imgs"):
+            seen.append(question.题号)
+
+    async def scenario():
+        seen = []
+        task = asyncio.create_task(consume(seen))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        # the CancelledError surfaces instead of "generator already executing"
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert seen == [1] and not closed.is_set()
+
+        release.set()
+        for _ in range(100):
+            if closed.is_set():
+                break
+            await asyncio.sleep(0.01)
+        assert closed.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_iter_pdf_keeps_images_on_continuation_pages(monkeypatch):
+    from app.services.exam_parser.parsers import pdf
+
+    texts = ["1. first question", "continued with a figure", "2. second question"]
+    assigned = []
+
+    def fake_extract(doc, indices, **kwargs):
+        return [{"index": i, "text": texts[i], "lines": [(texts[i], (0, 0, 1, 1))]} for i in indices]
+
+    def fake_assign(doc, p, num2q, img_dir):
+        assigned.append((p["index"], sorted(num2q)))
+
+    monkeypatch.setattr(pdf, "_extract_pages", fake_extract)
+    monkeypatch.setattr(pdf, "_clean_page", lambda p, headers, footers: None)
+    monkeypatch.setattr(pdf, "_detect_source_title", lambda doc, first_page, filepath: "paper")
+    monkeypatch.setattr(pdf, "_assign_page_images", fake_assign)
+    monkeypatch.setattr(pdf, "_render_question_html", lambda q, option_images: None)
+
+    questions = list(pdf._iter_pdf_doc(texts, "paper.pdf", "imgs", ocr_batch_size=1, force_ocr=True))
+    assert [q.题号 for q in questions] == [1, 2]
+    # page 1 continues question 1, so it is only assigned once question 1 is finished
+    assert (1, [1]) in assigned
+
+
+def test_iter_questions_rejects_unsupported_file(tmp_path):
+    path = tmp_path / "paper.txt"
+    path.write_text("1. question")
+    with pytest.raises(ValueError):
+        list(utils.iter_questions(str(path), str(tmp_path)))
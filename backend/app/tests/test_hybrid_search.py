@@ -0,0 +1,33 @@
+import pytest
+
+from app.services.hybrid_search import _decode_after, _page_after, reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_combines_ranks():
+    lexical = [{"id": 1, "lexical_score": 0.9}, {"id": 2, "lexical_score": 0.5}]
+    semantic = [{"id": 2, "similarity": 0.8}, {"id": 3, "similarity": 0.7}]
+
+    fused = reciprocal_rank_fusion({"lexical": lexical, "semantic": semantic}, k=60)
+
+    # 两路都命中的 2 排在最前，1 与 3 名次相同时按 id 升序
+    assert [row["id"] for row in fused] == [2, 1, 3]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[0]["lexical_rank"] == 2 and fused[0]["semantic_rank"] == 1
+    assert fused[0]["lexical_score"] == 0.5 and fused[0]["similarity"] == 0.8
+
+
+def test_keyset_pages_cover_fused_results_once():
+    rows = [{"id": i} for i in range(1, 8)]
+    fused = reciprocal_rank_fusion({"semantic": rows, "lexical": list(reversed(rows))})
+
+    seen, after = [], None
+    while True:
+        page, cursor = _page_after(fused, after, 3)
+        seen.extend(row["id"] for row in page)
+        if cursor is None:
+            break
+        after = _decode_after(cursor)
+    assert seen == [row["id"] for row in fused]
+
+    with pytest.raises(ValueError):
+        _decode_after("not-a-cursor")
@@ -0,0 +1,45 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import DateTime, Integer, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.crud.base import apply_keyset, keyset_page
+
+
+class _TestBase(DeclarativeBase):
+    """独立的 MetaData，避免测试表混入 app.models.base.Base.metadata"""
+
+
+class KeysetItem(_TestBase):
+    __tablename__ = "keyset_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+def _sql(query):
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_keyset_page_round_trips_cursor():
+    rows = [SimpleNamespace(id=i, created_at=datetime(2026, 1, 10 - i)) for i in range(1, 5)]
+
+    page, cursor = keyset_page(rows, 3, order_by="created_at")
+    assert [row.id for row in page] == [1, 2, 3]
+
+    sql = _sql(apply_keyset(select(KeysetItem), KeysetItem, cursor=cursor, limit=3,
+                            order_by="created_at", descending=True))
+    assert "(keyset_items.created_at, keyset_items.id) < ('2026-01-07 00:00:00', 3)" in sql
+    assert "ORDER BY keyset_items.created_at DESC, keyset_items.id DESC" in sql
+    assert "LIMIT 4" in sql
+
+    # 最后一页不返回游标
+    assert keyset_page(rows[:2], 3) == (rows[:2], None)
+
+
+def test_apply_keyset_rejects_bad_cursor():
+    with pytest.raises(ValueError):
+        apply_keyset(select(KeysetItem), KeysetItem, cursor="bm9wZQ", limit=10)
@@ -0,0 +1,111 @@
+import asyncio
+
+from app.services import knowledge_graph_snapshot
+from app.services.knowledge_graph_snapshot import GraphSnapshotStore, SubjectGraph
+
+NODES = [(10, "函数", None), (11, "一次函数", 10), (12, "二次函数", 10), (13, "方程", None)]
+EDGES = [
+    (10, 11, "CONTAINS", 1.0),
+    (10, 12, "CONTAINS", 1.0),
+    (11, 12, "PREREQUISITE", 0.8),
+    (13, 12, "RELATES_TO", None),
+    (13, 99, "RELATES_TO", 1.0),  # 终点不在本学科，忽略
+]
+
+
+def test_csr_queries_and_incremental_updates(monkeypatch):
+    monkeypatch.setattr(knowledge_graph_snapshot, "COMPACT_MIN_DELTA", 2)
+    graph = SubjectGraph(1, NODES, EDGES)
+
+    assert graph.node_count == 4 and graph.edge_count == 4
+    assert sorted(graph.successors(10)) == [11, 12]
+    assert sorted(graph.predecessors(12, ["CONTAINS", "PREREQUISITE"])) == [10, 11]
+    assert graph.shortest_path(10, 12, ["PREREQUISITE", "CONTAINS"]) == [10, 12]
+    assert graph.shortest_path(12, 10) is None
+    assert graph.to_dict()["edges"] == [{"source": 13, "target": 12, "strength": 1.0}]
+
+    graph.add_node(14, "函数图像", 10)
+    assert graph.add_edge(12, 14, "PREREQUISITE", 0.5)
+    assert not graph.add_edge(12, 404, "PREREQUISITE")
+    assert graph.topological_order(["CONTAINS", "PREREQUISITE"]) == [10, 11, 12, 13, 14]
+
+    assert graph.remove_edge(11, 12, "PREREQUISITE")
+    assert not graph.remove_edge(11, 12, "PREREQUISITE")
+    assert graph.successors(11) == []
+
+    # 删除节点会级联删除子节点与相关关系，超过阈值后重新压缩为 CSR
+    graph.remove_node(10)
+    assert 11 not in graph and 14 not in graph
+    assert [node["id"] for node in graph.nodes()] == [13]
+    assert graph.edges() == []
+    assert graph._delta_size == 0 and len(graph._ids) == 1
+
+
+def test_store_loads_once_and_applies_hooks():
+    calls = []
+
+    async def loader(subject_id, db):
+        calls.append(subject_id)
+        return SubjectGraph(subject_id, NODES, EDGES)
+
+    store = GraphSnapshotStore(loader=loader, ttl=600, max_subjects=2)
+
+    async def scenario():
+        first, second = await asyncio.gather(store.get(1, None), store.get(1, None))
+        assert first is second and calls == [1]
+
+        store.knowledge_point_created(1, 20, "不等式")
+        store.relations_created([{"source_id": 13, "target_id": 20, "rel_type": "relates_to"}])
+        store.knowledge_point_moved(20, 13)
+        store.knowledge_point_updated(20, name="一元一次不等式")
+        graph = await store.get(1, None)
+        assert graph.successors(13, ["RELATES_TO"]) == [12, 20]
+        assert graph.parent_of(20) == 13 and graph.name_of(20) == "一元一次不等式"
+
+        store.knowledge_point_deleted(13)
+        assert 20 not in graph
+
+        # 未加载的学科不受钩子影响；超过上限时淘汰最久未用的学科
+        store.knowledge_point_created(2, 30, "x")
+        await store.get(2, None)
+        await store.get(3, None)
+        assert store.peek(1) is None and calls == [1, 2, 3]
+
+    asyncio.run(scenario())
+
+
+def test_store_drops_snapshot_on_remote_invalidation():
+    from app.core.cache import LocalRedis, TwoTierCache, subject_tag
+    from app.utils.simple_cache import L1Cache
+
+    calls = []
+
+    async def loader(subject_id, db):
+        calls.append(subject_id)
+        return SubjectGraph(subject_id, NODES, EDGES)
+
+    async def scenario():
+        redis = LocalRedis()
+        worker_a, worker_b = TwoTierCache(L1Cache(), redis), TwoTierCache(L1Cache(), redis)
+        store_a, store_b = GraphSnapshotStore(loader=loader, ttl=600), GraphSnapshotStore(loader=loader, ttl=600)
+        worker_a.add_invalidation_listener(store_a.on_tags_invalidated)
+        worker_b.add_invalidation_listener(store_b.on_tags_invalidated)
+        await worker_a.start()
+        await worker_b.start()
+
+        await store_a.get(1, None)
+        await store_b.get(1, None)
+        assert calls == [1, 1]
+
+        # worker_a 写入后已用钩子更新本地快照，再广播失效；worker_b 丢弃快照并重新加载
+        store_a.knowledge_point_created(1, 20, "不等式")
+        await worker_a.invalidate_tags(subject_tag(1))
+        await asyncio.sleep(0)
+        assert store_b.peek(1) is None and 20 in store_a.peek(1)
+        await store_b.get(1, None)
+        assert calls == [1, 1, 1]
+
+        await worker_a.stop()
+        await worker_b.stop()
+
+    asyncio.run(scenario())
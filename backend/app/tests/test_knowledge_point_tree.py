@@ -0,0 +1,30 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.knowledge_point import KnowledgePoint
+from app.services.knowledge_point_service import TreeAssembler, _subtree_filter
+
+
+def test_tree_assembler_links_rows_in_path_order():
+    # (id, name, parent_id, depth, path, has_children)，按 path 字节序排列
+    rows = [
+        (1, "代数", None, 1, "1", True),
+        (3, "方程", 1, 2, "1/3", True),
+        (5, "一元二次方程", 3, 3, "1/3/5", False),
+        (30, "函数", 1, 2, "1/30", False),
+    ]
+    assembler = TreeAssembler(1, with_has_children=True)
+    for row in rows:
+        assembler.add(row)
+
+    tree = assembler.root
+    assert [child["id"] for child in tree["children"]] == [3, 30]
+    assert tree["children"][0]["children"][0]["name"] == "一元二次方程"
+    assert tree["children"][1]["has_children"] is False
+
+
+def test_subtree_filter_is_a_byte_order_range_scan():
+    stmt = select(KnowledgePoint.id).where(_subtree_filter("1/3"))
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "(knowledge_points.path COLLATE \"C\") >= '1/3/'" in sql
+    assert "(knowledge_points.path COLLATE \"C\") < '1/30'" in sql
@@ -0,0 +1,26 @@
+from app.db.neo4j_utils import _chunks, _group_relations, plan_acyclic_edges
+
+
+def test_plan_acyclic_edges_rejects_cycles_through_existing_and_batch_edges():
+    existing = [(1, 2), (2, 3)]
+    new_edges = [(3, 4), (4, 1), (3, 1), (1, 3), (5, 5), (4, 5)]
+
+    accepted, rejected = plan_acyclic_edges(existing, new_edges)
+
+    # 4->1 经新边 3->4 与已有边成环；3->1 直接与已有路径成环；自环拒绝
+    assert accepted == [0, 3, 5]
+    assert rejected == [1, 2, 4]
+
+
+def test_group_relations_by_type_keeps_input_positions():
+    relations = [
+        {"source_id": 1, "target_id": 2, "rel_type": "contains"},
+        {"source_id": 2, "target_id": 3},
+        {"source_id": 3, "target_id": 4, "rel_type": "CONTAINS", "strength": 0.5},
+    ]
+
+    groups, positions = _group_relations(relations)
+
+    assert groups == {"CONTAINS": [(1, 2, 1.0), (3, 4, 0.5)], "RELATES_TO": [(2, 3, 1.0)]}
+    assert positions == {"CONTAINS": [0, 2], "RELATES_TO": [1]}
+    assert [len(chunk) for chunk in _chunks(list(range(5)), 2)] == [2, 2, 1]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.services.numpy_vector_store import NumpyVectorStore, normalize_rows, top_k
+
+
+def _row(user_id, subject_id, question_type="选择题", difficulty=3, row_id=None):
+    return {
+        "id": row_id,
+        "content": f"题目 {row_id}",
+        "question_type": question_type,
+        "difficulty": difficulty,
+        "subject_id": subject_id,
+        "user_id": user_id,
+    }
+
+
+def test_top_k_matches_exact_sort():
+    rng = np.random.default_rng(0)
+    matrix = normalize_rows(rng.standard_normal((1000, 16)))
+    queries = normalize_rows(rng.standard_normal((3, 16)))
+    mask = rng.random(1000) > 0.5
+
+    indices, scores = top_k(matrix, queries, 5, mask=mask, chunk_rows=128)
+
+    for qi, query in enumerate(queries):
+        sims = matrix @ query
+        sims[~mask] = -np.inf
+        expected = np.argsort(-sims)[:5]
+        assert indices[qi].tolist() == expected.tolist()
+        assert np.allclose(scores[qi], sims[expected])
+
+
+def test_store_appends_partitions_and_filters(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), dim=4)
+    basis = np.eye(4, dtype=np.float32)
+    ids = store.append(
+        [_row(1, 10), _row(1, 20, question_type="填空题"), _row(2, 10, row_id=99)],
+        [basis[0], basis[0] + 0.1 * basis[1], basis[0]],
+    )
+    # 自动分配的 ID 不会与调用方提供的 ID 冲突
+    assert ids == [100, 101, 99]
+
+    hits = store.search(basis[0], user_id=1, limit=5)
+    assert [hit["id"] for hit in hits] == [100, 101]
+    assert hits[0]["similarity"] > hits[1]["similarity"]
+    assert [hit["id"] for hit in store.search(basis[0], user_id=1, subject_id=20)] == [101]
+    assert [hit["id"] for hit in store.search(basis[0], user_id=1, question_type="填空题")] == [101]
+
+    # 增量追加后无需重建即可被搜索到；新实例从文件读取
+    store.append([_row(1, 10, row_id=None)], [basis[2]])
+    assert store.search(basis[2], user_id=1, limit=1)[0]["id"] == 102
+    fresh = NumpyVectorStore(str(tmp_path), dim=4)
+    assert fresh.count(user_id=1) == 3
+    assert fresh.search_batch([basis[0], basis[2]], user_id=1, limit=1)[1][0]["id"] == 102
+
+
+def test_numpy_backend_rejects_lexical_search(tmp_path, monkeypatch):
+    from app.services import vector_backends
+
+    with pytest.raises(TypeError):
+        vector_backends.VectorSearchBackend()
+
+    monkeypatch.setattr(vector_backends.settings, "VECTOR_SEARCH_BACKEND", "numpy")
+    monkeypatch.setattr(vector_backends, "_backend", vector_backends.NumpyBackend(NumpyVectorStore(str(tmp_path))))
+    # numpy 后端不写 question_vectors，关键词 / 混合搜索必须报错而不是静默缺一路
+    with pytest.raises(RuntimeError):
+        vector_backends.require_database_backend("Hybrid search")
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.core.cache import cache
+from app.core.principals import (
+    Principal,
+    get_principal,
+    invalidate_principals,
+    invalidate_subject_principals,
+)
+from app.models.user import User
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """只记录查询次数的会话替身"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def get(self, model, ident):
+        self.queries += 1
+        return User(id=ident, username="alice", email="a@example.com", hashed_password="x", is_active=True)
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return FakeResult(self.rows)
+
+
+def test_principal_membership_and_tags():
+    principal = Principal(
+        7, {}, owned_subjects=frozenset({1}), member_subjects=frozenset({2}), member_classes=frozenset({5}),
+    )
+    assert principal.is_subject_owner(1) and not principal.is_subject_owner(2)
+    assert principal.is_subject_member(1) and principal.is_subject_member(2)
+    assert principal.is_class_member(5) and not principal.is_class_owner(5)
+    assert set(principal.tags()) == {
+        "principal:7", "principal:subject:1", "principal:subject:2", "principal:class:5",
+    }
+
+
+def test_principal_cached_until_invalidated():
+    async def scenario():
+        cache.l1.clear()
+        db = FakeSession([("owned_subjects", 1), ("member_classes", 5)])
+
+        principal = await get_principal(db, 7)
+        assert principal.is_subject_owner(1) and principal.is_class_member(5)
+        assert principal.row["username"] == "alice"
+        assert db.queries == 2
+
+        # 命中缓存，不再查询
+        await get_principal(db, 7)
+        assert db.queries == 2
+
+        await invalidate_subject_principals(1)
+        await get_principal(db, 7)
+        assert db.queries == 4
+
+        await invalidate_principals([7])
+        await get_principal(db, 7)
+        assert db.queries == 6
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+import asyncio
+from types import MappingProxyType, SimpleNamespace
+from typing import List
+
+import pytest
+from fastapi import Depends, FastAPI
+from pydantic import BaseModel
+from fastapi.testclient import TestClient
+
+from app.core.cache import cache, cached_response, etag_matches, subject_tag
+
+
+def _client(calls):
+    app = FastAPI()
+
+    def current_user(uid: int = 1):
+        return SimpleNamespace(id=uid)
+
+    @app.get("/stats/{subject_id}")
+    @cached_response(ttl=60, tags=lambda p: [subject_tag(p["subject_id"])])
+    async def stats(subject_id: int, current_user=Depends(current_user)):
+        calls.append(subject_id)
+        return {"subject_id": subject_id, "user": current_user.id, "calls": len(calls)}
+
+    return TestClient(app)
+
+
+def test_cached_response_etag_and_invalidation():
+    cache.l1.clear()
+    calls = []
+    client = _client(calls)
+
+    first = client.get("/stats/7")
+    assert first.status_code == 200 and first.json()["calls"] == 1
+    etag = first.headers["etag"]
+
+    again = client.get("/stats/7", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    assert len(calls) == 1
+
+    # 不同用户使用不同的缓存键
+    assert client.get("/stats/7", params={"uid": 2}).json()["user"] == 2
+    assert len(calls) == 2
+
+    asyncio.run(cache.invalidate_tags(subject_tag(7)))
+    refreshed = client.get("/stats/7", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.json()["calls"] == 3
+    assert refreshed.headers["etag"] != etag
+
+
+class Point:
+    """非模型、非 Mapping 的普通对象，按属性取值"""
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+def test_cached_response_validates_against_response_model():
+    cache.l1.clear()
+    app = FastAPI()
+
+    class Item(BaseModel):
+        id: int
+        name: str
+
+    @app.get("/items")
+    @cached_response(vary_user=False, response_model=List[Item])
+    async def items():
+        return [MappingProxyType({"id": 1, "name": "函数", "extra": "x"}), Point(2, "极限")]
+
+    body = TestClient(app).get("/items").json()
+    assert body == [{"id": 1, "name": "函数"}, {"id": 2, "name": "极限"}]
+
+
+def test_vary_user_requires_user_parameter():
+    with pytest.raises(TypeError):
+        @cached_response()
+        async def anonymous(user=None):
+            return {}
+
+
+def test_etag_matches_weak_and_wildcard():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"') and not etag_matches(None, '"b"')
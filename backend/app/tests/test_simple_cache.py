@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.utils.simple_cache import L1Cache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_bound_tags_and_expiry():
+    clock = FakeClock()
+    cache = L1Cache(max_entries=2, clock=clock)
+    cache.set("a", 1, ttl=10, tags=("subject:1",))
+    cache.set("b", 2, ttl=10, tags=("subject:2",))
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3, ttl=0, tags=("subject:1",))
+    assert cache.get("b") is None and cache.stats()["evictions"] == 1
+
+    assert cache.invalidate_tags("subject:1") == 2
+    assert cache.get("a") is None and cache.get("c") is None
+
+    cache.set("d", 4, ttl=5)
+    clock.now = 6
+    assert cache.purge_expired() == 1
+    assert len(cache) == 0
+
+
+def test_get_or_load_is_single_flight():
+    cache = L1Cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["kp"]
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader, ttl=60) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert calls == 1 and all(r == ["kp"] for r in results)
+    assert cache.stats()["coalesced"] == 9
+    assert cache.get("k") == ["kp"]
+
+
+def test_invalidation_during_load_is_not_cached():
+    cache = L1Cache()
+
+    async def loader():
+        cache.invalidate_tags("subject:1")
+        return "stale"
+
+    async def failing():
+        raise RuntimeError("neo4j down")
+
+    assert asyncio.run(cache.get_or_load("k", loader, ttl=60, tags=("subject:1",))) == "stale"
+    assert cache.get("k") is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_load("k", failing, ttl=60))
+
+
+def test_waiters_retry_when_loader_is_cancelled():
+    cache = L1Cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05 if calls == 1 else 0)
+        return calls
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_load("k", loader, ttl=60))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_load("k", loader, ttl=60)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    # one waiter takes over the load, the others coalesce onto it
+    assert asyncio.run(run()) == [2, 2, 2]
+    assert calls == 2 and cache.get("k") == 2
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+from types import MappingProxyType
+
+import pytest
+
+from app.core.cache import LocalRedis, TwoTierCache, decode_value, encode_value
+from app.utils.simple_cache import L1Cache
+
+
+def test_payload_round_trip():
+    node = {"id": 1, "name": "一元二次方程", "tags": ("代数",), "created_at": datetime(2026, 1, 1)}
+    assert decode_value(encode_value(node)) == {
+        "id": 1, "name": "一元二次方程", "tags": ["代数"], "created_at": "2026-01-01T00:00:00",
+    }
+
+
+def test_payload_round_trip_mappings():
+    from neo4j.graph import Graph, Node
+
+    node = Node(Graph(), "4:kp:1", 1, {"KnowledgePoint"}, {"id": 3, "name": "导数", "subject_id": 1})
+    assert decode_value(encode_value([node])) == [{"id": 3, "name": "导数", "subject_id": 1}]
+    assert decode_value(encode_value({"kp": MappingProxyType({"id": 4})})) == {"kp": {"id": 4}}
+    with pytest.raises(TypeError):
+        encode_value({"kp": object()})
+
+
+def test_invalidation_reaches_other_workers():
+    async def scenario():
+        redis = LocalRedis()
+        worker_a = TwoTierCache(L1Cache(), redis)
+        worker_b = TwoTierCache(L1Cache(), redis)
+        await worker_a.start()
+        await worker_b.start()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return [{"id": len(calls)}]
+
+        tags = ("kp:subject:1",)
+        assert await worker_a.get_or_load("kp:subject:1:list", load, 300, tags) == [{"id": 1}]
+        # worker_b 从 L2 读取，不再调用加载函数
+        assert await worker_b.get_or_load("kp:subject:1:list", load, 300, tags) == [{"id": 1}]
+        assert len(calls) == 1 and worker_b.l2_hits == 1
+
+        await worker_a.invalidate_tags("kp:subject:1")
+        await asyncio.sleep(0)
+        assert worker_b.invalidations_received == 1
+        assert worker_b.l1.get("kp:subject:1:list") is None
+        assert await worker_b.get_or_load("kp:subject:1:list", load, 300, tags) == [{"id": 2}]
+
+        await worker_a.stop()
+        await worker_b.stop()
+
+    asyncio.run(scenario())
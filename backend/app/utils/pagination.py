@@ -0,0 +1,39 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor is the sort key of the last item on a page, serialized as JSON and
+base64url-encoded so clients treat it as an opaque token. Decoding failures
+raise ``ValueError``; routes turn that into a 400 response.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+# List endpoints return the next cursor in a header so the body stays a plain list.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last returned row."""
+    payload = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by :func:`encode_cursor` holding ``size`` values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def set_next_cursor(response: Any, cursor: Optional[str]) -> None:
+    """Expose the next-page cursor on a list response (omitted on the last page)."""
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -1,54 +1,349 @@
-"""Lightweight in-process cache helpers with TTL support.
+"""Bounded in-process (L1) cache with TTL, tags and single-flight loading.
 
-The production system is expected to use Redis, but for developer and
-unit-test scenarios we provide an in-memory fallback that offers
-explicit set/get/invalidate primitives.  The helpers are intentionally
-async-agnostic so they can be safely reused from sync or async code.
+The production system is expected to use Redis, but hot read paths still
+benefit from a per-process layer.  ``L1Cache`` provides:
+
+* an LRU size bound (``max_entries``), so memory no longer grows with the
+  number of distinct keys;
+* tag-based invalidation: every entry may carry tags and
+  ``invalidate_tags`` only touches the entries indexed under those tags
+  instead of scanning every key;
+* expiry: entries past their TTL are never returned and a background
+  sweeper thread (``start_sweeper``) drops them from memory;
+* single-flight loading (``get_or_load``): concurrent misses for the same
+  key await one loader call instead of each hitting the backend;
+* hit/miss/eviction counters exported via ``render_prometheus``.
+
+The synchronous helpers are thread-safe and can be reused from sync or
+async code; ``get_or_load`` must be awaited from an event loop.
 """
 
 from __future__ import annotations
 
+import asyncio
+import heapq
 import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_SWEEP_INTERVAL = 30.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: Optional[float]
+    tags: Tuple[str, ...]
+
+
+class L1Cache:
+    """Thread-safe LRU cache with per-entry TTL and tag index."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._tag_generation: Dict[str, int] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    def configure(self, max_entries: Optional[int] = None, sweep_interval: Optional[float] = None) -> None:
+        """Adjust limits at startup; shrinking evicts least recently used entries."""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max(1, int(max_entries))
+                self._evict_overflow()
+            if sweep_interval is not None:
+                self.sweep_interval = sweep_interval
+
+    # ------------------------------------------------------------------ #
+    # basic operations
+    # ------------------------------------------------------------------ #
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or ``default`` when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry.expires_at is not None and entry.expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        """Store ``value``; ``ttl`` <= 0 or None means no expiry."""
+        expires_at = self._clock() + ttl if ttl and ttl > 0 else None
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, expires_at, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._evict_overflow()
+            self._compact_heap()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; cost is proportional to those entries."""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                self._tag_generation[tag] = self._tag_generation.get(tag, 0) + 1
+                for key in list(self._tags.get(tag, ())):
+                    removed += self._remove(key)
+            self.invalidations += removed
+        return removed
+
+    def tag_generations(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        """Counters bumped on every invalidation of each tag (to detect races with loads)."""
+        with self._lock:
+            return tuple(self._tag_generation.get(tag, 0) for tag in tags)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._expiry_heap.clear()
+            for tag in self._tag_generation:
+                self._tag_generation[tag] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
 
-_CacheValue = Tuple[Optional[float], Any]
-_CACHE: Dict[str, _CacheValue] = {}
-_LOCK = threading.RLock()
+    # ------------------------------------------------------------------ #
+    # expiry
+    # ------------------------------------------------------------------ #
+    def purge_expired(self) -> int:
+        """Remove entries whose TTL has passed; returns the number removed."""
+        now = self._clock()
+        purged = 0
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                expires_at, key = heapq.heappop(heap)
+                entry = self._entries.get(key)
+                # heap entries of overwritten/removed keys are stale and skipped
+                if entry is not None and entry.expires_at == expires_at:
+                    self._remove(key)
+                    purged += 1
+            self._compact_heap()
+            self.expirations += purged
+        return purged
+
+    def _compact_heap(self) -> None:
+        # overwritten, evicted and invalidated keys leave stale heap entries behind
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [
+                (e.expires_at, k) for k, e in self._entries.items() if e.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def start_sweeper(self) -> None:
+        """Start the daemon thread that purges expired entries every ``sweep_interval`` seconds."""
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="l1-cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            sweeper.join(timeout=1.0)
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.purge_expired()
+
+    # ------------------------------------------------------------------ #
+    # single-flight loading
+    # ------------------------------------------------------------------ #
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Return the cached value or run ``loader`` once for all concurrent callers.
+
+        If one of ``tags`` is invalidated while the loader runs, the result is
+        returned to the waiting callers but not cached, so a write that raced
+        with the load is not masked until the TTL expires.  If the caller
+        running the loader is cancelled, the waiters retry instead of being
+        cancelled with it; the first of them becomes the new loader.
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except _LoaderCancelled:
+                continue
+
+        tags = tuple(tags)
+        generations = self.tag_generations(tags)
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.loads += 1
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(_LoaderCancelled())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # the exception is re-raised here; waiters (if any) retrieve it from the future
+            future.exception()
+            raise
+        else:
+            with self._lock:
+                if self.tag_generations(tags) == generations:
+                    self.set(key, value, ttl, tags)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    # ------------------------------------------------------------------ #
+    # metrics
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "tags": len(self._tags),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+            }
+
+
+_MISSING = object()
+
+
+class _LoaderCancelled(Exception):
+    """Set on a single-flight future when the caller running the loader is cancelled."""
+
+
+l1_cache = L1Cache()
 
 
 def cache_get(key: str) -> Any:
     """Return a cached value if it exists and has not expired."""
-    with _LOCK:
-        entry = _CACHE.get(key)
-        if not entry:
-            return None
-        expires_at, value = entry
-        if expires_at is not None and expires_at < time.monotonic():
-            _CACHE.pop(key, None)
-            return None
-        return value
+    return l1_cache.get(key)
 
 
-def cache_set(key: str, value: Any, ttl: int) -> None:
-    """Store ``value`` under ``key`` with an optional TTL (seconds)."""
-    expires_at = time.monotonic() + ttl if ttl > 0 else None
-    with _LOCK:
-        _CACHE[key] = (expires_at, value)
+def cache_set(key: str, value: Any, ttl: int, tags: Iterable[str] = ()) -> None:
+    """Store ``value`` under ``key`` with an optional TTL (seconds) and tags."""
+    l1_cache.set(key, value, ttl, tags)
 
 
-def cache_invalidate(prefix: str) -> None:
-    """Invalidate every cache entry that starts with ``prefix``."""
-    with _LOCK:
-        for key in list(_CACHE.keys()):
-            if key.startswith(prefix):
-                _CACHE.pop(key, None)
+async def cache_get_or_load(
+    key: str, loader: Callable[[], Awaitable[Any]], ttl: int, tags: Iterable[str] = ()
+) -> Any:
+    """Single-flight read-through helper around ``l1_cache.get_or_load``."""
+    return await l1_cache.get_or_load(key, loader, ttl, tags)
+
+
+def cache_invalidate_tags(*tags: str) -> int:
+    """Invalidate every cache entry carrying one of ``tags``."""
+    return l1_cache.invalidate_tags(*tags)
 
 
 def cache_clear() -> None:
     """Remove all cached entries (primarily for tests)."""
-    with _LOCK:
-        _CACHE.clear()
+    l1_cache.clear()
+
+
+def render_prometheus(name: str = "l1") -> str:
+    """Cache counters in Prometheus text format."""
+    stats = l1_cache.stats()
+    lines = []
+    for metric, kind, key in (
+        ("cache_hits_total", "counter", "hits"),
+        ("cache_misses_total", "counter", "misses"),
+        ("cache_evictions_total", "counter", "evictions"),
+        ("cache_expirations_total", "counter", "expirations"),
+        ("cache_invalidations_total", "counter", "invalidations"),
+        ("cache_loads_total", "counter", "loads"),
+        ("cache_coalesced_loads_total", "counter", "coalesced"),
+        ("cache_entries", "gauge", "entries"),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f'{metric}{{cache="{name}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
 
 
-__all__ = ["cache_get", "cache_set", "cache_invalidate", "cache_clear"]
+__all__ = [
+    "L1Cache",
+    "l1_cache",
+    "cache_get",
+    "cache_set",
+    "cache_get_or_load",
+    "cache_invalidate_tags",
+    "cache_clear",
+    "render_prometheus",
+]
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+知识点闭包表维护基准
+
+在独立的基准表（knowledge_points 的 id / parent_id / depth / path 列 + 闭包表）中生成一棵
+合成知识点树，对比：
+  - legacy：旧实现，移动后清空闭包表并按节点逐个写入祖先关系
+  - rebuild：rebuild_closure 使用的递归 CTE，一条 INSERT ... SELECT 重建
+  - move：move_knowledge_point 使用的子树断开/重接语句，只改动被移动子树相关的行
+
+移动分别测试叶子节点、小子树与大子树，报告 p50/p95 延迟。
+
+用法（在 backend 目录下，需要可连接的 PostgreSQL）：
+    python benchmarks/bench_closure_move.py --nodes 50000
+
+基准表 bench_kp / bench_kp_closure 会在结束时删除（--keep 保留）。
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services.knowledge_point_service import closure_sql  # noqa: E402
+
+NODES = "bench_kp"
+CLOSURE = "bench_kp_closure"
+
+
+def generate_tree(nodes: int, branching: int, seed: int) -> Dict[int, Optional[int]]:
+    """按层生成树：每个节点的子节点数在 1..2*branching-1 之间随机"""
+    rng = random.Random(seed)
+    parents: Dict[int, Optional[int]] = {1: None}
+    frontier = [1]
+    next_id = 2
+    while next_id <= nodes:
+        new_frontier = []
+        for parent in frontier:
+            for _ in range(rng.randint(1, 2 * branching - 1)):
+                if next_id > nodes:
+                    break
+                parents[next_id] = parent
+                new_frontier.append(next_id)
+                next_id += 1
+        frontier = new_frontier or [rng.randint(1, next_id - 1)]
+    return parents
+
+
+async def load_tree(engine, parents: Dict[int, Optional[int]]) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {CLOSURE}"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {NODES}"))
+        await conn.execute(text(
+            f"""
+            CREATE TABLE {NODES} (
+                id integer PRIMARY KEY, parent_id integer REFERENCES {NODES}(id),
+                depth integer DEFAULT 1, path varchar(1024)
+            )
+            """
+        ))
+        await conn.execute(text(
+            f"""
+            CREATE TABLE {CLOSURE} (
+                ancestor_id integer REFERENCES {NODES}(id) ON DELETE CASCADE,
+                descendant_id integer REFERENCES {NODES}(id) ON DELETE CASCADE,
+                depth integer NOT NULL DEFAULT 0,
+                PRIMARY KEY (ancestor_id, descendant_id)
+            )
+            """
+        ))
+        await conn.execute(text(f"CREATE INDEX ON {CLOSURE} (ancestor_id)"))
+        await conn.execute(text(f"CREATE INDEX ON {CLOSURE} (descendant_id)"))
+        await conn.execute(text(f"CREATE INDEX ON {NODES} (parent_id)"))
+    rows = [{"id": node, "parent_id": parent} for node, parent in sorted(parents.items())]
+    for start in range(0, len(rows), 5000):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(f"INSERT INTO {NODES} (id, parent_id) VALUES (:id, :parent_id)"), rows[start:start + 5000]
+            )
+
+
+async def rebuild(conn) -> None:
+    sql = closure_sql(NODES, CLOSURE)
+    await conn.execute(sql["clear"])
+    await conn.execute(sql["rebuild"])
+    await conn.execute(sql["all_paths"])
+
+
+async def legacy_rebuild(conn) -> None:
+    """旧版 rebuild_closure：Python 中沿 parent 链展开，每个节点一次批量写入"""
+    await conn.execute(text(f"DELETE FROM {CLOSURE}"))
+    await conn.execute(text(f"INSERT INTO {CLOSURE} (ancestor_id, descendant_id, depth) SELECT id, id, 0 FROM {NODES}"))
+    id_parent = {row[0]: row[1] for row in (await conn.execute(text(f"SELECT id, parent_id FROM {NODES}"))).fetchall()}
+    stmt = text(f"INSERT INTO {CLOSURE} (ancestor_id, descendant_id, depth) VALUES (:ancestor_id, :descendant_id, :depth)")
+    for node_id, parent_id in id_parent.items():
+        values = []
+        depth = 1
+        while parent_id is not None:
+            values.append({"ancestor_id": parent_id, "descendant_id": node_id, "depth": depth})
+            depth += 1
+            parent_id = id_parent.get(parent_id)
+        if values:
+            await conn.execute(stmt, values)
+
+
+async def move(conn, node_id: int, parent_id: int) -> None:
+    sql = closure_sql(NODES, CLOSURE)
+    await conn.execute(text(f"UPDATE {NODES} SET parent_id = :parent_id WHERE id = :id"), {"id": node_id, "parent_id": parent_id})
+    await conn.execute(sql["detach"], {"node_id": node_id})
+    await conn.execute(sql["attach"], {"node_id": node_id, "parent_id": parent_id})
+    await conn.execute(sql["subtree_paths"], {"node_id": node_id})
+
+
+async def pick_moves(conn, size_range: Tuple[int, int], count: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """挑选子树大小落在区间内的节点，以及一个不在其子树内的新父节点"""
+    rows = (await conn.execute(
+        text(
+            f"SELECT ancestor_id FROM {CLOSURE} GROUP BY ancestor_id "
+            "HAVING count(*) BETWEEN :low AND :high"
+        ),
+        {"low": size_range[0], "high": size_range[1]},
+    )).fetchall()
+    candidates = [row[0] for row in rows if row[0] != 1]
+    total = (await conn.execute(text(f"SELECT max(id) FROM {NODES}"))).scalar()
+    moves = []
+    for node_id in rng.sample(candidates, min(count, len(candidates))):
+        subtree = {row[0] for row in (await conn.execute(
+            text(f"SELECT descendant_id FROM {CLOSURE} WHERE ancestor_id = :id"), {"id": node_id}
+        )).fetchall()}
+        parent_id = rng.randint(1, total)
+        while parent_id in subtree:
+            parent_id = rng.randint(1, total)
+        moves.append((node_id, parent_id))
+    return moves
+
+
+async def verify(conn) -> bool:
+    """增量维护后的闭包表应与递归 CTE 重建的结果一致"""
+    sql = f"""
+        WITH RECURSIVE chain (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM {NODES}
+            UNION ALL
+            SELECT n.parent_id, chain.descendant_id, chain.depth + 1
+            FROM chain JOIN {NODES} AS n ON n.id = chain.ancestor_id WHERE n.parent_id IS NOT NULL
+        )
+        SELECT count(*) FROM (
+            (SELECT * FROM chain EXCEPT SELECT * FROM {CLOSURE})
+            UNION ALL
+            (SELECT * FROM {CLOSURE} EXCEPT SELECT * FROM chain)
+        ) AS diff
+    """
+    return (await conn.execute(text(sql))).scalar() == 0
+
+
+def percentiles(latencies: List[float]) -> Tuple[float, float]:
+    ordered = sorted(latencies)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="知识点闭包表维护基准")
+    parser.add_argument("--dsn", default=str(settings.DATABASE_URL), help="asyncpg 数据库 URL")
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--branching", type=int, default=6, help="平均子节点数，决定树高")
+    parser.add_argument("--moves", type=int, default=50, help="每类子树的移动次数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-legacy", action="store_true", help="跳过旧实现（节点多时耗时较长）")
+    parser.add_argument("--keep", action="store_true", help="保留基准表")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_async_engine(args.dsn)
+    try:
+        started = time.perf_counter()
+        await load_tree(engine, generate_tree(args.nodes, args.branching, args.seed))
+        print(f"== {args.nodes} 个节点（写入 {time.perf_counter() - started:.1f}s）")
+
+        async with engine.connect() as conn:
+            if not args.skip_legacy:
+                started = time.perf_counter()
+                async with conn.begin():
+                    await legacy_rebuild(conn)
+                print(f"legacy 重建: {time.perf_counter() - started:.2f}s")
+            started = time.perf_counter()
+            async with conn.begin():
+                await rebuild(conn)
+            rows = (await conn.execute(text(f"SELECT count(*) FROM {CLOSURE}"))).scalar()
+            await conn.commit()
+            print(f"递归 CTE 重建: {time.perf_counter() - started:.2f}s（{rows} 行闭包关系）")
+            async with conn.begin():
+                await conn.execute(text(f"ANALYZE {NODES}"))
+                await conn.execute(text(f"ANALYZE {CLOSURE}"))
+
+            print(f"{'子树大小':<14}{'次数':>6}{'p50(ms)':>10}{'p95(ms)':>10}")
+            for low, high in ((1, 1), (2, 50), (51, 1000), (1001, args.nodes)):
+                async with conn.begin():
+                    moves = await pick_moves(conn, (low, high), args.moves, rng)
+                latencies = []
+                for node_id, parent_id in moves:
+                    started = time.perf_counter()
+                    async with conn.begin():
+                        await move(conn, node_id, parent_id)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                if latencies:
+                    p50, p95 = percentiles(latencies)
+                    print(f"{f'{low}-{high}':<14}{len(latencies):>6}{p50:>10.2f}{p95:>10.2f}")
+            async with conn.begin():
+                print(f"增量结果与重建一致: {await verify(conn)}")
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {CLOSURE}"))
+                await conn.execute(text(f"DROP TABLE IF EXISTS {NODES}"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
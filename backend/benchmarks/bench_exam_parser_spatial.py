@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+exam_parser 空间索引微基准
+
+在合成的高密度页面（数百行文本、数十个版面块/配图）上，对比线性扫描与按 y 排序的区间索引（SpatialIndex / RegionIndex）：
+order_page_lines、assign_image_by_region、_match_marker。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_exam_parser_spatial.py --lines 400 --images 40 --pages 50
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.exam_parser.parsers.pdf import (  # noqa: E402
+    RegionIndex,
+    _match_marker,
+    assign_image_by_region,
+    compute_question_regions,
+    order_page_lines,
+)
+from app.services.exam_parser.spatial import SpatialIndex  # noqa: E402
+
+PAGE_W, PAGE_H = 1700.0, 2400.0
+
+
+def order_page_lines_linear(lines, layout_blocks=None):
+    """order_page_lines 引入空间索引之前的 O(blocks × lines) 实现，作为基线。"""
+    if not lines:
+        return []
+    sorted_lines = sorted(lines, key=lambda item: (item[1][1], item[1][0]))
+    if not layout_blocks:
+        return sorted_lines
+    allowed_types = {"text", "title", "list", "paragraph"}
+    ordered: List[Any] = []
+    used: Set[int] = set()
+    textual_blocks = [b for b in layout_blocks if str(b.get("type", "")).lower() in allowed_types]
+    textual_blocks.sort(key=lambda blk: (blk["bbox"][1], blk["bbox"][0]))
+    margin = 12.0
+    for block in textual_blocks:
+        bx0, by0, bx1, by1 = block["bbox"]
+        candidate_indices: List[int] = []
+        for idx, (_, bbox) in enumerate(sorted_lines):
+            if idx in used:
+                continue
+            x0, y0, x1, y1 = bbox
+            cx = (x0 + x1) / 2.0
+            cy = (y0 + y1) / 2.0
+            if (bx0 - margin) <= cx <= (bx1 + margin) and (by0 - margin) <= cy <= (by1 + margin):
+                candidate_indices.append(idx)
+        candidate_indices.sort(key=lambda i: (sorted_lines[i][1][1], sorted_lines[i][1][0]))
+        for idx in candidate_indices:
+            ordered.append(sorted_lines[idx])
+            used.add(idx)
+    if len(used) != len(sorted_lines):
+        leftovers = [sorted_lines[i] for i in range(len(sorted_lines)) if i not in used]
+        leftovers.sort(key=lambda item: (item[1][1], item[1][0]))
+        ordered.extend(leftovers)
+    remaining = [sorted_lines[i] for i in range(len(sorted_lines)) if i not in used]
+    ordered.extend(remaining)
+    ordered.sort(key=lambda item: (item[1][1], item[1][0]))
+    return ordered
+
+
+def make_page(rng: random.Random, n_lines: int, n_images: int) -> Dict[str, Any]:
+    """两栏答题卡式页面：题干行、选项行、题号行，外加版面块与配图。"""
+    lines = []
+    col_w = PAGE_W / 2
+    qn = 1
+    per_col = n_lines // 2
+    line_h = (PAGE_H - 200) / max(per_col, 1)
+    for i in range(n_lines):
+        col = i // max(per_col, 1) % 2
+        y = 100 + (i % max(per_col, 1)) * line_h
+        x = 60 + col * col_w + rng.uniform(0, 20)
+        if i % 8 == 0:
+            text = f"{qn}. 如第{qn}题图所示，求解下列问题"
+            qn += 1
+        else:
+            text = rng.choice(["A. 选项", "B. 选项", "见图1", "计算过程", "第3题图"])
+        lines.append((text, (x, y, x + rng.uniform(200, col_w - 100), y + line_h * 0.8)))
+    blocks = []
+    for col in range(2):
+        y = 90.0
+        while y < PAGE_H - 100:
+            h = rng.uniform(80, 300)
+            blocks.append({"bbox": (50 + col * col_w, y, (col + 1) * col_w - 30, y + h), "type": "text"})
+            y += h + rng.uniform(5, 30)
+    images = []
+    for _ in range(n_images):
+        x = rng.uniform(0, PAGE_W - 200)
+        y = rng.uniform(0, PAGE_H - 200)
+        images.append((x, y, x + rng.uniform(60, 300), y + rng.uniform(60, 300)))
+    markers = [(rng.randint(1, qn), bbox) for text, bbox in lines if "题图" in text]
+    return {"lines": lines, "blocks": blocks, "images": images, "markers": markers}
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="exam_parser 空间索引微基准")
+    parser.add_argument("--lines", type=int, default=400, help="每页文本行数")
+    parser.add_argument("--images", type=int, default=40, help="每页配图数")
+    parser.add_argument("--pages", type=int, default=30, help="合成页数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项取最优的重复次数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [make_page(rng, args.lines, args.images) for _ in range(args.pages)]
+
+    def run_order(fn):
+        return [fn(p["lines"], p["blocks"]) for p in pages]
+
+    def run_assign(use_index: bool):
+        out = []
+        for p in pages:
+            regions = compute_question_regions(p["lines"])
+            index: Optional[RegionIndex] = RegionIndex(regions) if use_index else None
+            for x0, y0, x1, y1 in p["images"]:
+                out.append(assign_image_by_region((x0 + x1) / 2, (y0 + y1) / 2, regions, index))
+        return out
+
+    def run_markers(use_index: bool):
+        out = []
+        for p in pages:
+            index = SpatialIndex(bbox for _, bbox in p["markers"]) if use_index else None
+            for bbox in p["images"]:
+                out.append(_match_marker(bbox, p["markers"], 200.0, index))
+        return out
+
+    cases = [
+        ("order_page_lines", lambda: run_order(order_page_lines_linear), lambda: run_order(order_page_lines)),
+        ("assign_image_by_region", lambda: run_assign(False), lambda: run_assign(True)),
+        ("_match_marker", lambda: run_markers(False), lambda: run_markers(True)),
+    ]
+    print(f"{args.pages} 页 × {args.lines} 行 × {args.images} 图")
+    print(f"{'函数':<26}{'线性(ms)':>12}{'索引(ms)':>12}{'加速':>8}")
+    for name, linear, indexed in cases:
+        t_linear, r_linear = timed(linear, args.repeat)
+        t_indexed, r_indexed = timed(indexed, args.repeat)
+        if r_linear != r_indexed:
+            raise SystemExit(f"{name}: 索引结果与线性扫描不一致")
+        print(f"{name:<26}{t_linear * 1000:>12.1f}{t_indexed * 1000:>12.1f}{t_linear / t_indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
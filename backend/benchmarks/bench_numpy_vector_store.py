@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+NumPy 向量后端基准
+
+在临时目录中写入合成语料（带聚类结构的单位向量），测量：
+  - 批量追加的吞吐
+  - 单查询 / 批量查询的 p50/p95 延迟
+  - float16 存储相对 float32 的 recall@k
+
+结果可与 bench_vector_index.py 的 pgvector 顺序扫描 / HNSW 数据对照。
+
+用法（在 backend 目录下，无需数据库）：
+    python benchmarks/bench_numpy_vector_store.py --rows 10000 100000 --dim 1024
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.numpy_vector_store import NumpyVectorStore  # noqa: E402
+
+
+def make_corpus(rows: int, dim: int, queries: int, clusters: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows + queries)
+    data = centers[labels] + 0.6 * rng.standard_normal((rows + queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:rows], data[rows:]
+
+
+def load(store: NumpyVectorStore, corpus: np.ndarray, batch: int = 5000) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(corpus), batch):
+        chunk = corpus[start:start + batch]
+        rows = [
+            {"id": start + i + 1, "content": "", "user_id": 1, "subject_id": None}
+            for i in range(len(chunk))
+        ]
+        store.append(rows, chunk)
+    return time.perf_counter() - started
+
+
+def latencies(store: NumpyVectorStore, queries: np.ndarray, k: int, batch: int) -> List[float]:
+    store.search(queries[0], user_id=1, limit=k)  # 首次查询加载文件
+    result = []
+    for start in range(0, len(queries), batch):
+        started = time.perf_counter()
+        store.search_batch(queries[start:start + batch], user_id=1, limit=k)
+        result.append((time.perf_counter() - started) * 1000 / len(queries[start:start + batch]))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NumPy 向量后端基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'行数':<10}{'精度':<10}{'批量':>6}{'写入(s)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'recall':>10}")
+    for rows in args.rows:
+        corpus, queries = make_corpus(rows, args.dim, args.queries, args.clusters, args.seed)
+        truth = [set(ids) for ids in np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k] + 1]
+        for dtype in ("float32", "float16"):
+            with tempfile.TemporaryDirectory() as tmp:
+                store = NumpyVectorStore(tmp, dim=args.dim, dtype=dtype)
+                load_seconds = load(store, corpus)
+                hits = store.search_batch(queries, user_id=1, limit=args.k)
+                recall = statistics.mean(
+                    len(t & {hit["id"] for hit in found}) / args.k for t, found in zip(truth, hits)
+                )
+                for batch in (1, 32):
+                    ordered = sorted(latencies(store, queries, args.k, batch))
+                    p50 = ordered[len(ordered) // 2]
+                    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                    print(f"{rows:<10}{dtype:<10}{batch:>6}{load_seconds:>10.2f}{p50:>10.2f}{p95:>10.2f}{recall:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+pgvector HNSW 召回率 / 延迟基准
+
+在独立的基准表中写入合成语料（带聚类结构的单位向量），用 NumPy 精确计算
+top-k 真值，然后对比：
+  - 顺序扫描（无索引）的延迟
+  - 不同 m / ef_construction 的 HNSW 建索引耗时
+  - 不同 ef_search 下的 recall@k 与 p50/p95 延迟
+
+用法（在 backend 目录下，需要可连接的 PostgreSQL + pgvector）：
+    python benchmarks/bench_vector_index.py --rows 50000 --dim 1024 \\
+        --m 16 32 --ef-construction 64 128 --ef-search 20 40 80 160
+
+基准表 bench_vector_index 会在结束时删除（--keep 保留）。
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector_index import hnsw_index_sql  # noqa: E402
+
+TABLE = "bench_vector_index"
+INDEX = "ix_bench_vector_index_hnsw"
+
+
+def make_corpus(rows: int, dim: int, queries: int, clusters: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """聚类中心 + 高斯噪声，模拟同一学科试题向量彼此接近的分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows + queries)
+    data = centers[labels] + 0.6 * rng.standard_normal((rows + queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:rows], data[rows:]
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    truth = []
+    for start in range(0, len(queries), 64):
+        sims = queries[start:start + 64] @ corpus.T
+        top = np.argpartition(-sims, k, axis=1)[:, :k]
+        truth.extend(set((idx + 1).tolist()) for idx in top)  # id 从 1 开始
+    return truth
+
+
+def to_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{v:.6f}" for v in vector) + "]"
+
+
+async def load_corpus(engine, corpus: np.ndarray) -> None:
+    dim = corpus.shape[1]
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await conn.execute(text(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, embedding vector({dim}) NOT NULL)"))
+    batch = 1000
+    for start in range(0, len(corpus), batch):
+        rows = [
+            {"id": start + i + 1, "embedding": to_literal(vec)}
+            for i, vec in enumerate(corpus[start:start + batch])
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(f"INSERT INTO {TABLE} (id, embedding) VALUES (:id, CAST(:embedding AS vector))"),
+                rows,
+            )
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+async def run_queries(engine, queries: np.ndarray, k: int, setup: List[str]) -> Tuple[List[set], List[float]]:
+    results: List[set] = []
+    latencies: List[float] = []
+    sql = text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+    async with engine.connect() as conn:
+        for stmt in setup:
+            await conn.execute(text(stmt))
+        for query in queries:
+            literal = to_literal(query)
+            started = time.perf_counter()
+            rows = (await conn.execute(sql, {"q": literal, "k": k})).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append({row[0] for row in rows})
+        await conn.rollback()
+    return results, latencies
+
+
+def summarize(label: str, truth: List[set], found: List[set], latencies: List[float], k: int) -> None:
+    recall = statistics.mean(len(t & f) / k for t, f in zip(truth, found))
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<36}{recall:>10.4f}{p50:>10.2f}{p95:>10.2f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="pgvector HNSW 召回率/延迟基准")
+    parser.add_argument("--dsn", default=str(settings.DATABASE_URL), help="asyncpg 数据库 URL")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="保留基准表")
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.rows, args.dim, args.queries, args.clusters, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+    engine = create_async_engine(args.dsn)
+    try:
+        started = time.perf_counter()
+        await load_corpus(engine, corpus)
+        print(f"写入 {args.rows} 条 {args.dim} 维向量: {time.perf_counter() - started:.1f}s")
+        print(f"{'配置':<36}{'recall@' + str(args.k):>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+
+        found, latencies = await run_queries(engine, queries, args.k, ["SET enable_indexscan = off"])
+        summarize("顺序扫描", truth, found, latencies, args.k)
+
+        for m in args.m:
+            for ef_construction in args.ef_construction:
+                async with engine.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await conn.execute(text(f"DROP INDEX IF EXISTS {INDEX}"))
+                    await conn.execute(text(f"SET maintenance_work_mem = '{args.maintenance_work_mem}'"))
+                    started = time.perf_counter()
+                    await conn.execute(text(hnsw_index_sql(TABLE, INDEX, "embedding", m, ef_construction, concurrently=False)))
+                    build_seconds = time.perf_counter() - started
+                print(f"-- HNSW m={m} ef_construction={ef_construction} 建索引 {build_seconds:.1f}s")
+                for ef_search in args.ef_search:
+                    found, latencies = await run_queries(
+                        engine, queries, args.k, [f"SET hnsw.ef_search = {int(ef_search)}"]
+                    )
+                    summarize(f"   ef_search={ef_search}", truth, found, latencies, args.k)
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
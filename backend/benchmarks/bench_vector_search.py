@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+试题向量搜索延迟基准
+
+在独立的基准表（结构与 question_vectors 的搜索相关列一致）中写入合成语料，
+对比：
+  - literal：旧实现，向量以字面量拼进 SQL，且在 ORDER BY / SELECT 中出现两次
+  - pre / post：search_similar_questions 使用的绑定参数语句（auto 在两者之间按计数选择）
+
+每种规模下分别测试宽过滤（仅 user_id）与窄过滤（user_id + subject_id）的 p50/p95 延迟。
+
+用法（在 backend 目录下，需要可连接的 PostgreSQL + pgvector）：
+    python benchmarks/bench_vector_search.py --sizes 10000 100000 1000000
+
+基准表 bench_vector_search 会在结束时删除（--keep 保留）。
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector_index import hnsw_index_sql  # noqa: E402
+from app.services.vector_backends import VECTOR_SEARCH_COLUMNS, vector_search_sql  # noqa: E402
+
+TABLE = "bench_vector_search"
+USERS = 4
+
+
+def to_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{v:.6f}" for v in vector) + "]"
+
+
+def unit_vectors(rng: np.random.Generator, rows: int, dim: int) -> np.ndarray:
+    data = rng.standard_normal((rows, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data
+
+
+async def load_corpus(engine, rows: int, dim: int, subjects: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await conn.execute(text(
+            f"""
+            CREATE TABLE {TABLE} (
+                id integer PRIMARY KEY, content text NOT NULL, embedding vector({dim}) NOT NULL,
+                title varchar(255), question_type varchar(50), difficulty integer, source varchar(255),
+                subject_id integer, user_id integer NOT NULL, tags varchar(500), created_at varchar(50)
+            )
+            """
+        ))
+    batch = 2000
+    for start in range(0, rows, batch):
+        vectors = unit_vectors(rng, min(batch, rows - start), dim)
+        subject_ids = rng.integers(1, subjects + 1, len(vectors))
+        values = [
+            {
+                "id": start + i + 1,
+                "content": f"题目 {start + i + 1}",
+                "embedding": to_literal(vec),
+                "subject_id": int(subject_ids[i]),
+                "user_id": (start + i) % USERS + 1,
+            }
+            for i, vec in enumerate(vectors)
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {TABLE} (id, content, embedding, subject_id, user_id) "
+                    "VALUES (:id, :content, CAST(:embedding AS vector), :subject_id, :user_id)"
+                ),
+                values,
+            )
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"CREATE INDEX ON {TABLE} (user_id, subject_id)"))
+        await conn.execute(text(hnsw_index_sql(TABLE, f"ix_{TABLE}_hnsw", concurrently=False)))
+        await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def literal_sql(query: np.ndarray, user_id: int, subject_id, limit: int) -> str:
+    """旧实现：每次查询生成不同的 SQL 文本，无法复用预编译语句"""
+    embedding_str = to_literal(query)
+    where = f"user_id = {user_id}" + (f" AND subject_id = {subject_id}" if subject_id else "")
+    return f"""
+        SELECT {VECTOR_SEARCH_COLUMNS}, embedding, 1 - (embedding <=> '{embedding_str}') AS similarity
+        FROM {TABLE} WHERE {where}
+        ORDER BY embedding <=> '{embedding_str}' LIMIT {limit}
+    """
+
+
+async def time_queries(engine, queries: np.ndarray, strategy: str, filters: Dict[str, int], limit: int) -> List[float]:
+    latencies: List[float] = []
+    names = tuple(column for column in ("subject_id",) if column in filters)
+    async with engine.connect() as conn:
+        for query in queries:
+            started = time.perf_counter()
+            async with conn.begin():
+                if strategy == "literal":
+                    await conn.execute(text(f"SET LOCAL hnsw.ef_search = {settings.VECTOR_EF_SEARCH}"))
+                    sql = literal_sql(query, filters["user_id"], filters.get("subject_id"), limit)
+                    (await conn.execute(text(sql))).fetchall()
+                else:
+                    if strategy == "post":
+                        ef = max(settings.VECTOR_EF_SEARCH, limit * settings.VECTOR_POSTFILTER_OVERFETCH)
+                        await conn.execute(text(f"SET LOCAL hnsw.ef_search = {ef}"))
+                    stmt = vector_search_sql(strategy, names, TABLE)
+                    (await conn.execute(stmt, {**filters, "q": query.tolist(), "limit": limit})).fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def percentiles(latencies: List[float]) -> Tuple[float, float]:
+    ordered = sorted(latencies)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="试题向量搜索延迟基准")
+    parser.add_argument("--dsn", default=str(settings.DATABASE_URL), help="asyncpg 数据库 URL")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--subjects", type=int, default=200, help="学科数量，决定窄过滤的选择性")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="保留基准表")
+    args = parser.parse_args()
+
+    if args.dim != 1024:
+        print("vector_search_sql 按 Vector(1024) 绑定查询向量，--dim 只能为 1024")
+        return
+    queries = unit_vectors(np.random.default_rng(args.seed + 1), args.queries, args.dim)
+    engine = create_async_engine(args.dsn)
+    try:
+        for rows in args.sizes:
+            started = time.perf_counter()
+            await load_corpus(engine, rows, args.dim, args.subjects, args.seed)
+            print(f"\n== {rows} 行（写入 + 建索引 {time.perf_counter() - started:.1f}s）")
+            print(f"{'过滤':<12}{'策略':<10}{'p50(ms)':>10}{'p95(ms)':>10}")
+            for label, filters in (("user", {"user_id": 1}), ("user+subject", {"user_id": 1, "subject_id": 1})):
+                for strategy in ("literal", "pre", "post"):
+                    p50, p95 = percentiles(await time_queries(engine, queries, strategy, filters, args.limit))
+                    print(f"{label:<12}{strategy:<10}{p50:>10.2f}{p95:>10.2f}")
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+"""Add (created_at, id) index for question keyset pagination
+
+Revision ID: 5d0b8f3e6a14
+Revises: c41d7e9a2b63
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0b8f3e6a14'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e9a2b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_questions_created_at_id', 'questions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_created_at_id', table_name='questions')
@@ -0,0 +1,32 @@
+"""Add filter index for question vector search
+
+Revision ID: 8b2e4d7c1a05
+Revises: 3f6a2c1d9b47
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d7c1a05'
+down_revision: Union[str, Sequence[str], None] = '3f6a2c1d9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_question_vectors_user_subject',
+        'question_vectors',
+        ['user_id', 'subject_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_question_vectors_user_subject', table_name='question_vectors')
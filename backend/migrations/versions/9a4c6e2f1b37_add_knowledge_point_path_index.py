@@ -0,0 +1,32 @@
+"""Add path and parent_id indexes for knowledge point tree queries
+
+Revision ID: 9a4c6e2f1b37
+Revises: 5d0b8f3e6a14
+Create Date: 2026-10-17 18:00:00.000000
+
+Paths written before moves maintained them incrementally may be stale; refresh them with
+rebuild_closure() after upgrading.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c6e2f1b37'
+down_revision: Union[str, Sequence[str], None] = '5d0b8f3e6a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_kp_path', 'knowledge_points', [sa.text('path COLLATE "C"')], unique=False)
+    op.create_index('idx_kp_parent_id', 'knowledge_points', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_kp_parent_id', table_name='knowledge_points')
+    op.drop_index('idx_kp_path', table_name='knowledge_points')
@@ -0,0 +1,42 @@
+"""Add jieba full-text search columns for questions
+
+Revision ID: c41d7e9a2b63
+Revises: 8b2e4d7c1a05
+Create Date: 2026-10-17 14:00:00.000000
+
+Existing rows need their search_tokens backfilled after upgrading:
+    python -m app.services.text_search backfill
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a2b63'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d7c1a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(search_tokens, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('questions', 'question_vectors'):
+        op.add_column(table, sa.Column('search_tokens', sa.Text(), nullable=True))
+        op.add_column(
+            table,
+            sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True),
+        )
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('question_vectors', 'questions'):
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
+        op.drop_column(table, 'search_tokens')